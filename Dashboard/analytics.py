@@ -0,0 +1,169 @@
+import math
+from collections import deque
+
+STATS = ('mean', 'std', 'ewma', 'slope')
+REBASE_EVERY = 10000  # Jumlah sampel sebelum jumlah berjalan dihitung ulang (buang galat akumulasi)
+
+
+def stat_columns(sensors):
+    """Ring buffer columns written by KitAnalytics: '<sensor>_<stat>' plus 'steady'."""
+    columns = {f'{sensor}_{stat}': 'f8' for sensor in sensors for stat in STATS}
+    columns['steady'] = '?'
+    return columns
+
+
+# ====== STATISTIK BERGULIR ======
+class RollingWindow:
+    """Mean, variance and least-squares slope of the last `size` (t, y) points.
+
+    Setiap push() hanya menambah titik baru dan mengurangi titik yang
+    keluar dari jendela pada jumlah berjalan (Σy, Σy², Σt, Σt², Σty),
+    jadi biayanya O(1) berapa pun ukuran jendelanya. Waktu disimpan
+    relatif terhadap titik acuan agar Σt² tetap presisi.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._points = deque()
+        self._t0 = None
+        self._pushes = 0
+        self._sum_y = self._sum_yy = self._sum_t = self._sum_tt = self._sum_ty = 0.0
+
+    def __len__(self):
+        return len(self._points)
+
+    def push(self, t, y):
+        if self._t0 is None:
+            self._t0 = t
+        points = self._points
+        points.append((t, y))
+        self._add(t - self._t0, y, 1.0)
+        if len(points) > self.size:
+            t_old, y_old = points.popleft()
+            self._add(t_old - self._t0, y_old, -1.0)
+        self._pushes += 1
+        if self._pushes >= REBASE_EVERY:
+            self._rebase()
+
+    def _add(self, x, y, sign):
+        self._sum_y += sign * y
+        self._sum_yy += sign * y * y
+        self._sum_t += sign * x
+        self._sum_tt += sign * x * x
+        self._sum_ty += sign * x * y
+
+    def _rebase(self):
+        self._t0 = self._points[0][0]
+        self._pushes = 0
+        self._sum_y = self._sum_yy = self._sum_t = self._sum_tt = self._sum_ty = 0.0
+        for t, y in self._points:
+            self._add(t - self._t0, y, 1.0)
+
+    def mean(self):
+        n = len(self._points)
+        return self._sum_y / n if n else 0.0
+
+    def variance(self):
+        n = len(self._points)
+        if n < 2:
+            return 0.0
+        return max(0.0, (self._sum_yy - self._sum_y * self._sum_y / n) / (n - 1))
+
+    def std(self):
+        return math.sqrt(self.variance())
+
+    def slope(self):
+        """dy/dt of the least-squares line through the window (per second)."""
+        n = len(self._points)
+        denom = n * self._sum_tt - self._sum_t * self._sum_t
+        if n < 2 or denom <= 1e-12:
+            return 0.0
+        return (n * self._sum_ty - self._sum_t * self._sum_y) / denom
+
+    def summary(self):
+        """(mean, std, slope) in one pass over the running sums."""
+        n = len(self._points)
+        if n < 2:
+            return (self._sum_y / n if n else 0.0), 0.0, 0.0
+        sum_y, sum_t = self._sum_y, self._sum_t
+        variance = max(0.0, (self._sum_yy - sum_y * sum_y / n) / (n - 1))
+        denom = n * self._sum_tt - sum_t * sum_t
+        slope = (n * self._sum_ty - sum_t * sum_y) / denom if denom > 1e-12 else 0.0
+        return sum_y / n, math.sqrt(variance), slope
+
+
+class EWMA:
+    """Exponentially weighted moving average, seeded with the first value."""
+
+    def __init__(self, alpha):
+        self.alpha = alpha
+        self.value = None
+
+    def push(self, y):
+        self.value = y if self.value is None else self.value + self.alpha * (y - self.value)
+        return self.value
+
+
+# ====== ANALITIK PER KIT ======
+class KitAnalytics:
+    """Streaming statistics for one kit's sensors and steady-state detection.
+
+    Kesetimbangan (steady) = jendela sensor `steady_sensor` sudah penuh,
+    |slope| < `steady_slope` °C/s dan simpangan baku < `steady_std` °C,
+    bertahan `hold` sampel berturut-turut.
+    """
+
+    def __init__(self, sensors, window=30, alpha=0.2, steady_sensor='campuran',
+                 steady_slope=0.005, steady_std=0.1, hold=10):
+        self.sensors = tuple(sensors)
+        self.windows = {sensor: RollingWindow(window) for sensor in self.sensors}
+        self.ewmas = {sensor: EWMA(alpha) for sensor in self.sensors}
+        self.steady_sensor = steady_sensor
+        self.steady_slope = steady_slope
+        self.steady_std = steady_std
+        self.hold = hold
+        self._calm = 0  # Sampel berturut-turut yang memenuhi syarat kesetimbangan
+        # Nama kolom dihitung sekali; update() dipanggil untuk setiap pesan
+        self._plan = [
+            (sensor, self.windows[sensor], self.ewmas[sensor].push,
+             *(f'{sensor}_{stat}' for stat in STATS))
+            for sensor in self.sensors
+        ]
+
+    def update(self, t, values):
+        """Add one sample (epoch seconds, {sensor: °C}); return the stat columns for it."""
+        stats = {}
+        steady_win = self.windows[self.steady_sensor]
+        for sensor, win, ewma_push, k_mean, k_std, k_ewma, k_slope in self._plan:
+            y = values[sensor]
+            win.push(t, y)
+            mean, std, slope = win.summary()
+            stats[k_mean] = mean
+            stats[k_std] = std
+            stats[k_ewma] = ewma_push(y)
+            stats[k_slope] = slope
+            if win is steady_win:
+                calm = len(win) == win.size and abs(slope) < self.steady_slope and std < self.steady_std
+        self._calm = self._calm + 1 if calm else 0
+        stats['steady'] = self._calm >= self.hold
+        return stats
+
+
+class StreamAnalytics:
+    """KitAnalytics per kit id, created on a kit's first sample.
+
+    Hanya thread ingest yang memanggil update(); hasilnya ditulis ke
+    ring buffer kit bersama sampel mentah, jadi pembaca (callback Dash,
+    worker lain lewat shared memory) tidak perlu menghitung ulang.
+    """
+
+    def __init__(self, sensors, **params):
+        self.sensors = tuple(sensors)
+        self.params = params
+        self._kits = {}
+
+    def update(self, kit_id, t, values):
+        kit = self._kits.get(kit_id)
+        if kit is None:
+            kit = self._kits[kit_id] = KitAnalytics(self.sensors, **self.params)
+        return kit.update(t, values)
@@ -0,0 +1,24 @@
+// Push mode: buka EventSource ke /stream untuk kit terpilih dan picu
+// callback Dash (n_intervals 'update') setiap ada data baru dari server.
+(function () {
+    window.dash_clientside = Object.assign({}, window.dash_clientside);
+    window.dash_clientside.blacksense = Object.assign({}, window.dash_clientside.blacksense, {
+        connectPush: function (kitId, streamUrl) {
+            // Satu koneksi per tab; ditutup dan dibuka ulang saat kit berganti
+            if (window.blacksensePush) {
+                window.blacksensePush.close();
+                window.blacksensePush = null;
+            }
+            // Belum ada kit terpilih (mis. halaman dibuka sebelum pesan MQTT pertama):
+            // dengarkan semua kit agar update_kit_options tetap terpicu (Interval mati)
+            var url = kitId ? streamUrl + '?kit=' + encodeURIComponent(kitId) : streamUrl;
+            var source = new EventSource(url);
+            source.onmessage = function () {
+                window.blacksenseTicks = (window.blacksenseTicks || 0) + 1;
+                window.dash_clientside.set_props('update', {n_intervals: window.blacksenseTicks});
+            };
+            window.blacksensePush = source;
+            return kitId || null;
+        }
+    });
+})();
@@ -0,0 +1,64 @@
+// GRAPH_WIRE = "celsius": server hanya mengirim deret °C (dcc.Store 'graph-series');
+// °F, K dan °R diturunkan di sini dan keempat grafik diperbarui di browser.
+// Rumus konversi sama dengan units.convert di server.
+(function () {
+    var CONVERT = {
+        c: function (v) { return v; },
+        f: function (v) { return v * 9 / 5 + 32; },
+        k: function (v) { return v + 273.15; },
+        r: function (v) { return v * 4 / 5; }
+    };
+
+    function convert(values, suffix) {
+        return suffix === 'c' ? values : values.map(CONVERT[suffix]);
+    }
+
+    // Figure penuh dari kerangka server (layout, template, gaya trace) + data terbaru.
+    // Layout disalin: Plotly menyimpan dan mengubah objek layout milik grafik.
+    function fullFigure(skeleton, payload, suffix) {
+        return {
+            data: skeleton.data.map(function (trace, i) {
+                return Object.assign({}, trace, {
+                    x: payload.xs ? payload.xs[i] : payload.x,
+                    y: convert(payload.y[i], suffix)
+                });
+            }),
+            layout: JSON.parse(JSON.stringify(skeleton.layout))
+        };
+    }
+
+    function extendData(payload, suffix) {
+        var traces = payload.y.map(function (_, i) { return i; });
+        return [{
+            x: traces.map(function () { return payload.x; }),
+            y: payload.y.map(function (values) { return convert(values, suffix); })
+        }, traces, payload.max_points];
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside);
+    window.dash_clientside.blacksense = Object.assign({}, window.dash_clientside.blacksense, {
+        // Output: figure tiap satuan, lalu extendData tiap satuan (urutan GRAPH_UNITS)
+        renderSeries: function (payload, meta) {
+            var noUpdate = window.dash_clientside.no_update;
+            var skip = meta ? meta.suffixes.map(function () { return noUpdate; }) : [];
+            if (!payload || !meta) {
+                return skip.concat(skip);
+            }
+            if (payload.kind === 'empty') {
+                var empty = meta.suffixes.map(function () {
+                    return {data: [], layout: {title: {text: meta.empty_title}}};
+                });
+                return empty.concat(skip);
+            }
+            if (payload.kind === 'full') {
+                var figures = meta.suffixes.map(function (suffix, i) {
+                    return fullFigure(meta.figures[i], payload, suffix);
+                });
+                return figures.concat(skip);
+            }
+            return skip.concat(meta.suffixes.map(function (suffix) {
+                return extendData(payload, suffix);
+            }));
+        }
+    });
+})();
@@ -0,0 +1,34 @@
+"""Decode throughput: JSON payload (firmware lama) vs biner ringkas v1.
+
+Jalankan dari folder Dashboard:  python bench/bench_payload.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from payload import decode_payload, encode_binary, encode_json
+
+
+def bench(name, payloads, repeat=5):
+    n = len(payloads)
+    run = lambda: [decode_payload(p) for p in payloads]
+    best = min(timeit.repeat(run, number=1, repeat=repeat))
+    print(f"{name:<8} {len(payloads[0]):>4} B/pesan  {n / best:>12,.0f} pesan/s  ({best / n * 1e6:.2f} µs/pesan)")
+    return n / best
+
+
+def main(n=100_000):
+    readings = [(random.uniform(5, 30), random.uniform(40, 90), random.uniform(20, 60)) for _ in range(n)]
+    json_payloads = [encode_json(*r) for r in readings]
+    binary_payloads = [encode_binary(*r) for r in readings]
+    print(f"Decode {n:,} pesan")
+    json_rate = bench("json", json_payloads)
+    binary_rate = bench("binary", binary_payloads)
+    print(f"Biner {binary_rate / json_rate:.1f}x lebih cepat")
+
+
+if __name__ == "__main__":
+    main()
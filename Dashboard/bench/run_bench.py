@@ -0,0 +1,257 @@
+"""Benchmark jalur panas ingest & render, dibandingkan dengan baseline JSON.
+
+Mengukur:
+  - on_message          : throughput pesan/s (JSON firmware dan biner v1)
+  - storage             : latensi append batch writer vs jumlah baris di log
+  - update_graph        : latensi (cache dingin/hangat) dan ukuran JSON vs panjang buffer
+  - stream_graphs       : latensi dan ukuran figure penuh serta extendData untuk kedua
+                          GRAPH_WIRE ("per_unit" juga vs jumlah satuan)
+  - export              : export_table_to_excel dan /export CSV seluruh riwayat
+
+Jalankan dari folder Dashboard:
+  python bench/run_bench.py                # bandingkan dengan bench/baseline.json
+  python bench/run_bench.py --save         # simpan hasil sebagai baseline baru
+  python bench/run_bench.py --check        # exit code 1 jika ada regresi
+  python bench/run_bench.py --quick        # ukuran kecil, untuk cek cepat
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+DASHBOARD_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DASHBOARD_DIR)
+
+BASELINE_FILE = os.path.join(DASHBOARD_DIR, "bench", "baseline.json")
+TOLERANCE = 0.5  # Regresi jika >50% lebih buruk dari baseline (mesin bersama cukup bising)
+# Selisih absolut di bawah ini dianggap noise (metrik sub-milidetik sangat bergoyang)
+NOISE_FLOOR = {"ms": 0.5, "µs/baris": 3.0, "KiB": 0.5}
+
+
+def timed(fn, repeat=5):
+    """Median wall time of `repeat` calls, in seconds."""
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return statistics.median(times)
+
+
+def json_size(value):
+    from plotly.utils import PlotlyJSONEncoder
+    return len(json.dumps(value, cls=PlotlyJSONEncoder))
+
+
+class Results:
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, name, value, unit, better="lower"):
+        self.metrics[name] = {"value": value, "unit": unit, "better": better}
+        print(f"  {name:<52} {value:>14,.2f} {unit}")
+
+
+# ====== BENCHMARK ======
+def bench_on_message(main, simulator, res, n):
+    print("on_message")
+    for fmt, binary in (("json", False), ("binary", True)):
+        messages = [simulator.FakeMessage(topic, payload)
+                    for _, topic, payload in simulator.generate(10, 1.0, count=n, binary=binary, seed=1)]
+        with quiet():
+            t = timed(lambda: [main.on_message(None, None, m) for m in messages], repeat=1)
+        res.add(f"on_message.{fmt}.throughput", n / t, "pesan/s", better="higher")
+
+
+def bench_storage(main, res, sizes):
+    from storage import SampleStore
+    print("storage (batch writer append vs jumlah baris)")
+    row = lambda i: ["2026-01-01 00:00:00", "kit01", 20.0, 60.0, 40.0, time.time() - 3600 + i * 1e-3]
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SampleStore(os.path.join(tmp, "bench.db"), main.STORAGE_HEADERS,
+                            tiers=main.RETENTION_TIERS, prune_interval=3600)
+        filled = 0
+        for size in sizes:
+            while filled < size:
+                step = min(10000, size - filled)
+                store.append_many([row(filled + i) for i in range(step)])
+                filled += step
+            batch = [row(filled + i) for i in range(main.WRITER_BATCH_SIZE)]
+            t = timed(lambda: store.append_many(batch), repeat=5)
+            filled += 5 * len(batch)
+            res.add(f"storage.append_batch.rows_{size}", t / len(batch) * 1e6, "µs/baris")
+        store.close()
+
+
+def fill_kit(main, capacity, kit_id="bench"):
+    """Fresh registry/session manager with `capacity` samples for one kit."""
+    from kits import KitRegistry
+    from sessions import SessionManager
+    import simulator
+    main.kits = KitRegistry(capacity, main.SAMPLE_COLUMNS, max_kits=main.MAX_KITS)
+    main.sessions = SessionManager(main.C_AIR)
+    main.render_cache.clear()
+    topic = simulator.topic_for(kit_id)
+    with quiet():
+        for _, _, payload in simulator.generate(1, 1.0, count=capacity, seed=2):
+            main.on_message(None, None, simulator.FakeMessage(topic, payload))
+    return kit_id
+
+
+def bench_render(main, res, lengths):
+    print("update_graph / stream_graphs")
+    all_units = list(main.GRAPH_UNITS)
+    wire_default = main.GRAPH_WIRE
+    for length in lengths:
+        kit_id = fill_kit(main, length)
+        args = (1, 250, 250, None, None, kit_id, 0, main.TABLE_PAGE_SIZE, "bench-session")
+
+        def cold():
+            main.render_cache.clear()
+            return main.update_graph(*args)
+        res.add(f"update_graph.cold.len_{length}", timed(cold) * 1e3, "ms")
+        res.add(f"update_graph.warm.len_{length}", timed(lambda: main.update_graph(*args)) * 1e3, "ms")
+        res.add(f"update_graph.json.len_{length}", json_size(cold()) / 1024, "KiB")
+
+        seq = main.kits.get(kit_id).samples.seq
+        cursor = {'kit': kit_id, 'seq': seq - 1, 'generation': 0}
+
+        def full():
+            main.render_cache.clear()
+            return main.stream_graphs(1, kit_id, None, "bench-session")
+
+        def extend():
+            main.render_cache.clear()
+            return main.stream_graphs(1, kit_id, cursor, "bench-session")
+
+        # "celsius": satu deret °C untuk semua grafik, jumlah satuan tidak berpengaruh di server;
+        # "per_unit": satu figure per satuan, jadi jumlah satuan ikut diukur
+        for wire, unit_counts in (("celsius", (None,)), ("per_unit", (1, len(all_units)))):
+            main.GRAPH_WIRE = wire
+            for n_units in unit_counts:
+                suffix = f"len_{length}.{wire}" + ("" if n_units is None else f".units_{n_units}")
+                main.GRAPH_UNITS = all_units[:n_units]
+                res.add(f"stream_graphs.full.{suffix}", timed(full) * 1e3, "ms")
+                res.add(f"stream_graphs.full_json.{suffix}", json_size(full()) / 1024, "KiB")
+            main.GRAPH_UNITS = all_units
+            res.add(f"stream_graphs.extend.len_{length}.{wire}", timed(extend) * 1e3, "ms")
+            res.add(f"stream_graphs.extend_json.len_{length}.{wire}", json_size(extend()) / 1024, "KiB")
+        main.GRAPH_WIRE = wire_default
+
+
+def bench_export(main, res, lengths):
+    print("export")
+    for length in lengths:
+        kit_id = fill_kit(main, length)
+        try:
+            t = timed(lambda: main.export_table_to_excel(1, kit_id, "bench-session"), repeat=3)
+            res.add(f"export_table_to_excel.len_{length}", t * 1e3, "ms")
+        except ImportError as e:
+            print(f"  export_table_to_excel dilewati: {e}")
+    if main.storage_writer is not None:
+        main.storage_writer.close()
+    rows = main.sample_store.count()
+    client = main.app.server.test_client()
+
+    def export_csv():
+        response = client.get("/export?format=csv", buffered=False)
+        for _ in response.response:
+            pass
+        response.close()
+    t = timed(export_csv, repeat=3)
+    res.add("export.csv.throughput", rows / t, "baris/s", better="higher")
+
+
+@contextlib.contextmanager
+def quiet():
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+# ====== BASELINE ======
+def compare(current, baseline, tolerance=TOLERANCE):
+    """Print current vs baseline; return the names of regressed metrics."""
+    regressions = []
+    print(f"\n{'metrik':<52} {'baseline':>12} {'sekarang':>12}  perubahan")
+    for name, cur in current.items():
+        base = baseline.get(name)
+        if base is None or not base["value"]:
+            continue
+        ratio = cur["value"] / base["value"]
+        worse = ratio > 1 + tolerance if cur["better"] == "lower" else ratio < 1 / (1 + tolerance)
+        if abs(cur["value"] - base["value"]) < NOISE_FLOOR.get(cur["unit"], 0):
+            worse = False
+        flag = "  REGRESI" if worse else ""
+        print(f"{name:<52} {base['value']:>12,.2f} {cur['value']:>12,.2f}  {ratio - 1:+.0%}{flag}")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--save", action="store_true", help="simpan hasil sebagai baseline")
+    parser.add_argument("--check", action="store_true", help="exit code 1 jika ada regresi")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="batas regresi relatif (0.5 = 50%%)")
+    parser.add_argument("--output", help="tulis hasil ke file JSON ini")
+    parser.add_argument("--quick", action="store_true", help="ukuran kecil")
+    args = parser.parse_args(argv)
+
+    n_messages = 2000 if args.quick else 20000
+    storage_sizes = (0, 10000) if args.quick else (0, 100000, 500000)
+    lengths = (100, 1000) if args.quick else (100, 1000, 10000)
+
+    # main diimpor tanpa MQTT, di folder sementara agar log asli tidak tersentuh
+    workdir = tempfile.mkdtemp(prefix="edukit-bench-")
+    os.environ["EDUKIT_MQTT"] = "0"
+    os.chdir(workdir)
+    with quiet():
+        import main as dashboard
+    import simulator
+
+    res = Results()
+    bench_on_message(dashboard, simulator, res, n_messages)
+    bench_storage(dashboard, res, storage_sizes)
+    bench_render(dashboard, res, lengths)
+    bench_export(dashboard, res, lengths[:2])
+    # Jangan ekspor log benchmark ke .xlsx saat keluar
+    dashboard.sample_store = None
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "quick": args.quick,
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "metrics": res.metrics,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline disimpan ke {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"\nBelum ada baseline ({args.baseline}); jalankan dengan --save")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline["meta"].get("quick") != args.quick:
+        print("\nPeringatan: baseline dibuat dengan ukuran berbeda (--quick)")
+    regressions = compare(res.metrics, baseline["metrics"], args.tolerance)
+    print(f"\n{len(regressions)} regresi" if regressions else "\nTidak ada regresi")
+    return 1 if regressions and args.check else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+import threading
+from collections import OrderedDict
+
+# ====== CACHE RENDER ======
+class RenderCache:
+    """Bounded LRU of rendered callback outputs, shared by all clients.
+
+    Kunci cache memuat versi data (generation, seq) kit, jadi entri lama
+    tidak perlu di-invalidate: begitu ada sampel baru, kuncinya berubah
+    dan entri lama tergeser keluar oleh LRU.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        # Render di luar lock; dua klien yang miss bersamaan bisa render dua kali
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,66 @@
+import numpy as np
+
+# ====== DOWNSAMPLING UNTUK GRAFIK ======
+# Mengembalikan indeks titik yang dipertahankan, sehingga x (mis. cap waktu)
+# dan y bisa dipotong dengan indeks yang sama.
+
+METHODS = ("lttb", "minmax")
+
+
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: indices of `n_out` points that keep the shape of y(x).
+
+    Titik pertama dan terakhir selalu dipertahankan; di setiap bucket dipilih
+    titik yang membentuk segitiga terbesar dengan titik terpilih sebelumnya
+    dan rata-rata bucket berikutnya, sehingga puncak (mis. lonjakan saat
+    pencampuran) tidak hilang. Luas segitiga dihitung vektor per bucket.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # n_out - 2 bucket di antara titik pertama dan terakhir
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[:n - 1], edges[:-1]) / counts
+    avg_y = np.add.reduceat(y[:n - 1], edges[:-1]) / counts
+    # Jangkar kanan tiap bucket: rata-rata bucket berikutnya (titik terakhir untuk bucket akhir)
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    out = np.empty(n_out, dtype=np.intp)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        area = np.abs(
+            (x[a] - next_x[b]) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (next_y[b] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        out[b + 1] = a
+    return out
+
+
+def minmax_indices(y, n_out):
+    """Min and max of each of n_out/2 buckets (fully vectorized), in original order."""
+    n = len(y)
+    n_buckets = n_out // 2
+    if n_out >= n or n_buckets < 1:
+        return np.arange(n)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.intp)
+    bucket = np.repeat(np.arange(n_buckets), np.diff(edges))
+    # Urut per (bucket, y): elemen pertama tiap bucket = min, terakhir = max
+    order = np.lexsort((y, bucket))
+    return np.unique(np.concatenate([order[edges[:-1]], order[edges[1:] - 1]]))
+
+
+def downsample_indices(x, y, n_out, method="lttb"):
+    """Indices of at most ~n_out points of y(x) using `method` ('lttb' or 'minmax')."""
+    if method == "lttb":
+        return lttb_indices(x, y, n_out)
+    if method == "minmax":
+        return minmax_indices(y, n_out)
+    raise ValueError(f"Metode downsampling tidak dikenal: {method}")
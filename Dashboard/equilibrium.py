@@ -0,0 +1,86 @@
+import math
+from collections import namedtuple
+
+import numpy as np
+
+CI_Z = 1.96  # Kuantil normal untuk selang kepercayaan 95%
+MIN_SAMPLES = 5  # Dengan lebih sedikit pasangan, variansi residu belum bisa dipercaya
+
+# t_eq: suhu keseimbangan prediksi (°C), half_width: ± selang kepercayaan (°C),
+# tau: konstanta waktu (dalam sampel), n: jumlah pasangan sampel yang di-fit
+Prediction = namedtuple('Prediction', 't_eq half_width tau n')
+
+
+# ====== FIT HUKUM NEWTON ======
+class NewtonFit:
+    """Online fit of the mixed temperature's exponential approach to equilibrium.
+
+    Hukum pendinginan Newton T(t) = T_eq + (T0 - T_eq)·e^(-t/τ) yang
+    disampel berjarak sama menjadi T[n+1] = a·T[n] + b, dengan a = e^(-1/τ)
+    dan T_eq = b / (1 - a). a dan b diperoleh dari regresi linear yang
+    jumlah berjalannya diperbarui O(1) per sampel; selang kepercayaan T_eq
+    dihitung dari kovarians (a, b) dengan metode delta. Nilai disimpan
+    relatif terhadap sampel pertama agar jumlah kuadrat tetap presisi.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self._ref = None
+        self._last = None
+        self._sx = self._sy = self._sxx = self._sxy = self._syy = 0.0
+
+    def push(self, value):
+        self.push_many((value,))
+
+    def push_many(self, values):
+        """Add consecutive samples (°C, oldest first)."""
+        values = np.asarray(values, dtype=float)
+        if not len(values):
+            return
+        if self._ref is None:
+            self._ref = values[0].item()
+        v = values - self._ref
+        if self._last is not None:
+            v = np.concatenate(([self._last], v))
+        x, y = v[:-1], v[1:]
+        self.n += len(x)
+        self._sx += x.sum().item()
+        self._sy += y.sum().item()
+        self._sxx += (x * x).sum().item()
+        self._sxy += (x * y).sum().item()
+        self._syy += (y * y).sum().item()
+        self._last = v[-1].item()
+
+    def estimate(self, min_samples=MIN_SAMPLES):
+        """Prediction for the current fit, or None while the data is not yet converging."""
+        n = self.n
+        if n < max(min_samples, 3):
+            return None
+        x_mean = self._sx / n
+        sxx = self._sxx - self._sx * x_mean
+        sxy = self._sxy - self._sy * x_mean
+        syy = self._syy - self._sy * self._sy / n
+        if sxx <= 1e-12:
+            return None
+        a = sxy / sxx
+        if not 0.0 < a < 1.0:
+            # a >= 1: belum ada pendekatan eksponensial yang terlihat
+            return None
+        b = (self._sy - a * self._sx) / n
+        s2 = max(0.0, syy - a * sxy) / (n - 2)
+        var_a = s2 / sxx
+        var_b = s2 * (1.0 / n + x_mean * x_mean / sxx)
+        cov_ab = -x_mean * s2 / sxx
+        # Turunan T_eq = b / (1 - a) terhadap a dan b
+        d_a = b / (1.0 - a) ** 2
+        d_b = 1.0 / (1.0 - a)
+        var = d_a * d_a * var_a + d_b * d_b * var_b + 2.0 * d_a * d_b * cov_ab
+        return Prediction(
+            t_eq=self._ref + b / (1.0 - a),
+            half_width=CI_Z * math.sqrt(max(var, 0.0)),
+            tau=-1.0 / math.log(a),
+            n=n,
+        )
@@ -0,0 +1,90 @@
+import csv
+import io
+
+# Optional dependencies untuk format selain CSV
+try:
+    from openpyxl import Workbook
+except ImportError:
+    Workbook = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+FORMATS = {
+    # format: (mimetype, ekstensi file)
+    "csv": ("text/csv", "csv"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+# ====== EXPORT STREAMING ======
+# Semua writer menerima iterator chunk (list baris) dari SampleStore.iter_range(),
+# jadi memori yang dipakai sebesar satu chunk, berapa pun panjang riwayatnya.
+
+def available_formats():
+    """Export formats whose optional dependency is installed."""
+    formats = ["csv"]
+    if Workbook is not None:
+        formats.append("xlsx")
+    if pq is not None:
+        formats.append("parquet")
+    return formats
+
+
+def iter_csv(chunks, headers, row_fn=None):
+    """Yield CSV text one chunk at a time (for a streamed HTTP response)."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(headers)
+    for chunk in chunks:
+        if row_fn:
+            writer.writerows(row_fn(row) for row in chunk)
+        else:
+            writer.writerows(chunk)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    tail = buf.getvalue()
+    if tail:
+        yield tail
+
+
+def write_xlsx(path, chunks, headers, row_fn=None):
+    """Write chunks to .xlsx (path or file object) with a write_only (streaming) workbook."""
+    if Workbook is None:
+        raise RuntimeError("openpyxl tidak tersedia. Install: pip install openpyxl")
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("DataSuhu")
+    ws.append(headers)
+    for chunk in chunks:
+        for row in chunk:
+            ws.append(row_fn(row) if row_fn else list(row))
+    wb.save(path)
+
+
+def write_parquet(path, chunks, headers, row_fn=None):
+    """Write chunks to Parquet (path or file object), one row group per chunk."""
+    if pq is None:
+        raise RuntimeError("pyarrow tidak tersedia. Install: pip install pyarrow")
+    writer = None
+    try:
+        for chunk in chunks:
+            rows = [row_fn(row) for row in chunk] if row_fn else chunk
+            arrays = [pa.array(col) for col in zip(*rows)]
+            # Kolom yang seluruhnya kosong di chunk pertama dianggap angka
+            arrays = [a.cast(pa.float64()) if pa.types.is_null(a.type) else a for a in arrays]
+            table = pa.Table.from_arrays(arrays, names=headers)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table.cast(writer.schema))
+        if writer is None:
+            # Rentang kosong: tetap tulis file dengan header saja
+            pq.write_table(pa.table({h: pa.array([], pa.string()) for h in headers}), path)
+    finally:
+        if writer is not None:
+            writer.close()
@@ -0,0 +1,31 @@
+"""Konfigurasi gunicorn untuk worker Dash (EDUKIT_ROLE=web).
+
+gunicorn membaca file ini otomatis jika dijalankan dari folder Dashboard:
+
+  EDUKIT_ROLE=web gunicorn main:server
+
+Setiap tab yang terbuka menahan satu koneksi /stream (Server-Sent Events)
+selama tab itu hidup. Worker "sync" hanya melayani satu request dalam satu
+waktu dan dibunuh setelah `timeout` detik, jadi beberapa tab saja sudah
+menghabiskan semua worker. Karena itu worker wajib "gthread" (satu thread per
+koneksi); heartbeat worker dijalankan thread utama sehingga stream yang lama
+tidak memicu timeout.
+
+State sesi eksperimen (kunci/pencampuran, sessions.SessionManager) hanya ada
+di memori worker yang melayaninya, jadi default-nya satu worker: semua
+callback dan tab melihat sesi yang sama. Konkurensi datang dari thread.
+"""
+import os
+
+bind = os.environ.get("EDUKIT_BIND", "0.0.0.0:8050")
+workers = 1  # Sesi per proses: worker kedua tidak melihat kunci/pencampuran worker pertama
+worker_class = "gthread"
+# Jumlah tab (koneksi /stream) + callback Dash yang berjalan bersamaan
+threads = int(os.environ.get("EDUKIT_THREADS", "64"))
+timeout = 30
+
+
+def post_worker_init(worker):
+    # -k sync dari command line menimpa file ini; /stream tidak bisa jalan di sana
+    if worker.cfg.worker_class_str == "sync":
+        raise RuntimeError("Worker Dash butuh -k gthread (atau gevent) untuk push /stream")
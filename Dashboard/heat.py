@@ -0,0 +1,60 @@
+"""Perhitungan kalor Asas Black, tervektorisasi atas riwayat suhu.
+
+Q tidak disimpan per sampel. Setiap kali diperlukan, Q dihitung ulang
+untuk seluruh jendela dari kolom suhu dan metadata fase (rentang seq
+pencampuran dan hasil beku) dengan massa saat ini. Jadi mengubah volume
+langsung berlaku untuk seluruh riwayat. Modul ini hanya bergantung pada
+NumPy agar bisa diuji tanpa Dash/MQTT:
+
+  >>> seqs = np.arange(4)
+  >>> t = np.array([20.0, 20.0, 20.0, 20.0]), np.array([60.0] * 4), np.array([20.0, 40.0, 41.0, 50.0])
+  >>> heat_series(seqs, *t, mix_ranges=[[1, 3]], finish_ranges=[[3, None, 41.0, 20.0, 60.0]],
+  ...             massa_dingin=0.1, massa_panas=0.1, c_air=4200)[0].tolist()
+  [0.0, 8400.0, 7980.0, 7980.0]
+"""
+import numpy as np
+
+from timeindex import index_slice
+
+
+def asas_black(dingin, panas, campuran, massa_dingin, massa_panas, c_air):
+    """(Q lepas air panas, Q terima air dingin) in J, elementwise."""
+    q_lepas = np.abs(massa_panas * c_air * (panas - campuran))
+    q_terima = np.abs(massa_dingin * c_air * (campuran - dingin))
+    return q_lepas, q_terima
+
+
+def phase_temperatures(seqs, dingin, panas, campuran, mix_ranges, finish_ranges):
+    """Temperatures that define each sample's Q, plus the mask of samples that have heat.
+
+    mix_ranges    : [start, end] per pencampuran; Q dari suhu sampel itu sendiri.
+    finish_ranges : [start, end, campuran, dingin, panas] per hasil beku; Q tetap
+                    memakai suhu saat pencampuran dihentikan (nilai yang dibekukan).
+    Di luar kedua rentang (sebelum pencampuran / setelah reset) Q = 0.
+    `seqs` terurut, jadi setiap rentang cukup dicari dengan binary search.
+    """
+    active = np.zeros(len(seqs), dtype=bool)
+    for start, end in mix_ranges:
+        active[index_slice(seqs, start, end)] = True
+    if finish_ranges:
+        # Salinan: input bisa berupa view ring buffer
+        dingin, panas, campuran = np.array(dingin, float), np.array(panas, float), np.array(campuran, float)
+    for start, end, val_campuran, val_dingin, val_panas in finish_ranges:
+        frozen = index_slice(seqs, start, end)
+        dingin[frozen] = val_dingin
+        panas[frozen] = val_panas
+        campuran[frozen] = val_campuran
+        active[frozen] = True
+    return dingin, panas, campuran, active
+
+
+def heat_series(seqs, dingin, panas, campuran, mix_ranges, finish_ranges, massa_dingin, massa_panas, c_air):
+    """(q_lepas, q_terima) arrays for the whole window at the given masses.
+
+    `dingin`/`panas`/`campuran` adalah suhu tampilan (kunci suhu awal sudah
+    diterapkan), sejajar dengan `seqs`.
+    """
+    dingin, panas, campuran, active = phase_temperatures(
+        seqs, dingin, panas, campuran, mix_ranges, finish_ranges)
+    q_lepas, q_terima = asas_black(dingin, panas, campuran, massa_dingin, massa_panas, c_air)
+    return np.where(active, q_lepas, 0.0), np.where(active, q_terima, 0.0)
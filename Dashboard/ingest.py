@@ -0,0 +1,70 @@
+"""Proses ingest tunggal untuk deployment multi-worker.
+
+Menjalankan klien MQTT, writer storage dan ring buffer setiap kit di shared
+memory. Worker Dash memetakan ring buffer yang sama dan membacanya tanpa
+salinan, sehingga data hanya di-ingest sekali berapa pun jumlah worker:
+
+  python ingest.py
+  EDUKIT_ROLE=web gunicorn main:server
+
+Jumlah worker/thread dan alasannya: lihat gunicorn.conf.py.
+
+Metrik ingest (pesan diterima/ditolak, antrean writer, ...) ada di
+http://<host>:9108/metrics; metrik callback ada di /metrics tiap worker.
+"""
+import os
+import signal
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PORT = int(os.environ.get("EDUKIT_INGEST_METRICS_PORT", "9108"))
+
+
+def serve_metrics(dashboard, port):
+    """Expose the ingest process's /metrics on a small background HTTP server."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != dashboard.METRICS_ROUTE:
+                self.send_error(404)
+                return
+            body = dashboard.metrics.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", dashboard.METRICS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("", port), Handler)
+    threading.Thread(target=httpd.serve_forever, name="ingest-metrics", daemon=True).start()
+    print(f"[Ingest] Metrik di http://0.0.0.0:{port}{dashboard.METRICS_ROUTE}")
+    return httpd
+
+
+def run():
+    os.environ["EDUKIT_ROLE"] = "ingest"
+    import main as dashboard
+    print(f"[Ingest] Ring buffer di shared memory '{dashboard.SHM_NAME}' "
+          f"({dashboard.MAX_KITS} kit x {dashboard.max_len} sampel)")
+    httpd = serve_metrics(dashboard, METRICS_PORT) if METRICS_PORT else None
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    try:
+        stop.wait()
+    except KeyboardInterrupt:
+        pass
+    print("[Ingest] Berhenti")
+    if httpd is not None:
+        httpd.shutdown()
+    dashboard.mqtt_client.loop_stop()
+    # atexit: flush writer, export Excel, lalu hapus segmen shared memory
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,288 @@
+import secrets
+import threading
+import time
+
+import numpy as np
+
+from ringbuffer import SampleRing
+
+DEFAULT_KIT = "default"  # Kit yang masih publish ke topic lama "edukit/suhu"
+
+
+def kit_id_from_topic(topic):
+    """'edukit/<kit>/suhu' -> '<kit>'; the legacy 'edukit/suhu' -> DEFAULT_KIT."""
+    parts = topic.split("/")
+    if len(parts) == 3 and parts[1]:
+        return parts[1]
+    return DEFAULT_KIT
+
+
+# ====== STATE PER KIT ======
+class KitState:
+    """Raw sample buffer and storage partition key for one kit.
+
+    State eksperimen (kunci, pencampuran, kalor) ada di sessions.py,
+    per browser, bukan per kit.
+    """
+
+    def __init__(self, kit_id, capacity, columns, samples=None):
+        self.kit_id = kit_id
+        self.samples = SampleRing(capacity, columns) if samples is None else samples
+        self.last_ingest = None  # Epoch detik sampel terakhir diterima (untuk metrik lag)
+
+
+class KitRegistry:
+    """Indexed registry of kits: O(1) dict lookup per message.
+
+    Kit baru dibuat otomatis saat pesan pertamanya tiba, dibatasi
+    `max_kits` agar topic liar tidak menghabiskan memori.
+    """
+
+    def __init__(self, capacity, columns, max_kits=64):
+        self.capacity = capacity
+        self.columns = columns
+        self.max_kits = max_kits
+        self._kits = {}
+        self._lock = threading.Lock()
+
+    def get(self, kit_id):
+        return self._kits.get(kit_id)
+
+    def get_or_create(self, kit_id):
+        """Return the kit, creating it on first use; None if the registry is full."""
+        kit = self._kits.get(kit_id)
+        if kit is not None:
+            return kit
+        with self._lock:
+            kit = self._kits.get(kit_id)
+            if kit is None and len(self._kits) < self.max_kits:
+                kit = KitState(kit_id, self.capacity, self.columns)
+                # Salin-lalu-ganti: pembaca tanpa lock selalu melihat dict yang utuh
+                kits = dict(self._kits)
+                kits[kit_id] = kit
+                self._kits = kits
+            return kit
+
+    def ids(self):
+        return sorted(self._kits)
+
+    def __iter__(self):
+        return iter(list(self._kits.values()))
+
+    def __len__(self):
+        return len(self._kits)
+
+
+# ====== REGISTRY DI SHARED MEMORY ======
+_MAGIC = 0x45444B54  # "EDKT"
+# Header int64: [magic, kapasitas, max_kits, jumlah kit, instance]. instance = token
+# acak proses ingest, ditulis terakhir (0 = header belum siap)
+_HEADER_LEN = 5
+_INSTANCE = 4
+_SEGMENT_CHECK_INTERVAL = 1.0  # detik antar pemeriksaan restart proses ingest
+KIT_ID_DTYPE = np.dtype('U32')
+
+
+class _SharedKitState(KitState):
+    """KitState whose ring and last-ingest time live in a shared segment."""
+
+    def __init__(self, kit_id, samples, ingest_ts, slot):
+        # Tanpa KitState.__init__: pembaca tidak boleh mereset last_ingest bersama
+        self.kit_id = kit_id
+        self.samples = samples
+        self._ingest_ts = ingest_ts
+        self._slot = slot
+
+    @property
+    def last_ingest(self):
+        ts = self._ingest_ts[self._slot].item()
+        return ts if ts > 0 else None
+
+    @last_ingest.setter
+    def last_ingest(self, value):
+        self._ingest_ts[self._slot] = value or 0.0
+
+
+class SharedKitRegistry(KitRegistry):
+    """Kit registry in one multiprocessing.shared_memory segment.
+
+    Satu proses ingest (create=True) menulis; sejumlah worker Dash
+    (create=False) memetakan segmen yang sama dan membaca ring buffer
+    setiap kit tanpa salinan. Semua slot kit dialokasikan di depan:
+    [header | id kit x max_kits | waktu ingest x max_kits | ring x max_kits].
+    Kit baru dipublikasikan dengan menulis id-nya dulu, baru menaikkan
+    jumlah kit di header, jadi pembaca tidak pernah melihat slot setengah jadi.
+    Jika ingest di-restart, nama segmen menunjuk segmen baru dengan token
+    instance lain; pembaca memeriksanya berkala dan memetakan ulang.
+    """
+
+    def __init__(self, name, capacity, columns, max_kits=64, create=False, attach_timeout=30.0):
+        super().__init__(capacity, columns, max_kits=max_kits)
+        from multiprocessing import shared_memory
+        self.name = name
+        self.owner = create
+        self._ring_bytes = SampleRing.nbytes(capacity, columns)
+        self._names_offset = 64
+        self._ingest_offset = self._names_offset + -(-max_kits * KIT_ID_DTYPE.itemsize // 64) * 64
+        self._rings_offset = self._ingest_offset + -(-max_kits * 8 // 64) * 64
+        size = self._rings_offset + max_kits * self._ring_bytes
+        self._check_at = time.monotonic() + _SEGMENT_CHECK_INTERVAL
+        if create:
+            try:
+                # Segmen sisa proses ingest yang mati tidak dipakai ulang
+                stale = shared_memory.SharedMemory(name=name)
+                stale.close()
+                stale.unlink()
+            except FileNotFoundError:
+                pass
+            self._map(shared_memory.SharedMemory(name=name, create=True, size=size))
+            self._header[:3] = (_MAGIC, capacity, max_kits)
+            self.instance = secrets.randbits(62) + 1
+            self._header[_INSTANCE] = self.instance  # Terakhir: segmen siap dibaca
+        else:
+            self._map(self._attach(attach_timeout))
+            self.instance = int(self._header[_INSTANCE])
+
+    def _map(self, shm):
+        self._shm = shm
+        buf = shm.buf
+        self._header = np.ndarray(_HEADER_LEN, dtype=np.int64, buffer=buf)
+        self._ids = np.ndarray(self.max_kits, dtype=KIT_ID_DTYPE, buffer=buf, offset=self._names_offset)
+        self._ingest_ts = np.ndarray(self.max_kits, dtype=np.float64, buffer=buf, offset=self._ingest_offset)
+
+    def _open(self):
+        """Map the ingest segment if it exists and is ready, else None."""
+        from multiprocessing import shared_memory
+        try:
+            shm = shared_memory.SharedMemory(name=self.name)
+        except FileNotFoundError:
+            return None
+        # Python < 3.13 mendaftarkan segmen yang hanya dipetakan ke resource
+        # tracker, yang akan menghapusnya saat worker keluar; pemiliknya proses ingest
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        header = tuple(np.ndarray(_HEADER_LEN, dtype=np.int64, buffer=shm.buf).tolist())
+        if header[_INSTANCE] == 0:
+            # Proses ingest belum selesai menulis header
+            shm.close()
+            return None
+        if header[:3] != (_MAGIC, self.capacity, self.max_kits):
+            shm.close()
+            raise RuntimeError(
+                f"Segmen shared memory '{self.name}' tidak cocok (kapasitas/max_kits berbeda dengan proses ingest)")
+        return shm
+
+    def _attach(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            shm = self._open()
+            if shm is not None:
+                return shm
+            if time.monotonic() >= deadline:
+                raise RuntimeError(f"Segmen shared memory '{self.name}' tidak ditemukan; jalankan ingest.py dulu")
+            time.sleep(0.5)
+
+    def _check_segment(self):
+        """Re-map if the segment name now belongs to a restarted ingest process.
+
+        Segmen lama tetap terpetakan setelah di-unlink (oleh ingest baru atau
+        resource tracker saat ingest mati), jadi header kita sendiri tidak
+        pernah berubah; yang diperiksa token instance di balik nama segmen.
+        """
+        self._check_at = time.monotonic() + _SEGMENT_CHECK_INTERVAL
+        try:
+            shm = self._open()
+        except RuntimeError as e:
+            print(f"[SHM] {e}")
+            return
+        if shm is None:
+            return
+        instance = np.ndarray(_HEADER_LEN, dtype=np.int64, buffer=shm.buf)[_INSTANCE].item()
+        if instance == self.instance:
+            shm.close()
+            return
+        old = self._shm
+        self._kits = {}
+        self._map(shm)
+        self.instance = int(self._header[_INSTANCE])
+        print(f"[SHM] Proses ingest baru terdeteksi, segmen '{self.name}' dipetakan ulang")
+        try:
+            old.close()
+        except BufferError:
+            # Snapshot lama masih dipakai thread lain; dilepas GC
+            pass
+
+    def _slot_state(self, slot):
+        offset = self._rings_offset + slot * self._ring_bytes
+        ring = SampleRing(self.capacity, self.columns, buffer=self._shm.buf[offset:offset + self._ring_bytes])
+        return _SharedKitState(str(self._ids[slot]), ring, self._ingest_ts, slot)
+
+    def _refresh(self):
+        """Map kits published by the ingest process since the last call."""
+        if time.monotonic() >= self._check_at:
+            with self._lock:
+                if time.monotonic() >= self._check_at:
+                    self._check_segment()
+        published = int(self._header[3])
+        if published == len(self._kits):
+            return
+        with self._lock:
+            kits = dict(self._kits)
+            for slot in range(len(kits), published):
+                kit = self._slot_state(slot)
+                kits[kit.kit_id] = kit
+            self._kits = kits
+
+    def get(self, kit_id):
+        if not self.owner:
+            self._refresh()
+        return self._kits.get(kit_id)
+
+    def get_or_create(self, kit_id):
+        if not self.owner:
+            raise RuntimeError("Hanya proses ingest yang boleh menambah kit")
+        kit = self._kits.get(kit_id)
+        if kit is not None:
+            return kit
+        with self._lock:
+            kit = self._kits.get(kit_id)
+            slot = len(self._kits)
+            # Id kit lebih dari 32 karakter tidak muat di slot; diperlakukan seperti registry penuh
+            if kit is None and slot < self.max_kits and len(kit_id) <= KIT_ID_DTYPE.itemsize // 4:
+                self._ids[slot] = kit_id
+                kit = self._slot_state(slot)
+                kits = dict(self._kits)
+                kits[kit_id] = kit
+                self._kits = kits
+                self._header[3] = slot + 1  # Publikasi terakhir
+            return kit
+
+    def ids(self):
+        if not self.owner:
+            self._refresh()
+        return super().ids()
+
+    def __iter__(self):
+        if not self.owner:
+            self._refresh()
+        return super().__iter__()
+
+    def __len__(self):
+        if not self.owner:
+            self._refresh()
+        return super().__len__()
+
+    def close(self):
+        """Unmap the segment; the ingest process also removes it."""
+        self._kits = {}
+        self._header = self._ids = self._ingest_ts = None
+        try:
+            self._shm.close()
+        except BufferError:
+            # Masih ada view NumPy yang hidup (mis. snapshot di thread lain); biarkan GC
+            pass
+        if self.owner:
+            self._shm.unlink()
@@ -1,543 +1,947 @@
-import json
 import os
+import time
+import atexit
+import tempfile
 import dash
 from dash import dcc, html, dash_table
-from dash.dependencies import Output, Input, State
+from dash.dependencies import Output, Input, State, ClientsideFunction
+from flask import Response, jsonify, request, send_file, stream_with_context
 import plotly.graph_objs as go
 import paho.mqtt.client as mqtt
-from collections import deque
 from datetime import datetime
 import pandas as pd
-
-# Optional dependency for Excel writing
-try:
-    from openpyxl import Workbook, load_workbook
-except ImportError:
-    Workbook = None
-    load_workbook = None
+import numpy as np
+import uuid
+from kits import KitRegistry, SharedKitRegistry, kit_id_from_topic, DEFAULT_KIT
+from sessions import SessionManager
+from heat import asas_black
+from timeindex import epoch_ms, format_clock, local_ms
+from units import UNITS, convert, expand_celsius, format_celsius
+from payload import decode_payload, PayloadError
+from storage import SampleStore
+from writer import BatchWriter
+from notify import Notifier, SeqNotifier
+from cache import RenderCache
+from downsample import downsample_indices
+from analytics import StreamAnalytics, stat_columns
+from metrics import Registry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+import export
 
 # ====== MQTT CONFIG ======
-MQTT_BROKER = "broker.hivemq.com"
-MQTT_TOPIC = "edukit/suhu"
+MQTT_BROKER = os.environ.get("EDUKIT_MQTT_BROKER", "broker.hivemq.com")  # Broker lokal untuk simulator
+MQTT_PORT = int(os.environ.get("EDUKIT_MQTT_PORT", "1883"))
+MQTT_TOPIC_KITS = "edukit/+/suhu"  # Satu topic per kit: edukit/<kit_id>/suhu
+MQTT_TOPIC_LEGACY = "edukit/suhu"  # Firmware lama, dipetakan ke kit "default"
+MAX_KITS = 64
+
+# ====== DEPLOYMENT ======
+# EDUKIT_ROLE:
+#   "single": satu proses (python main.py) yang menerima MQTT dan melayani Dash
+#   "ingest": proses ingest tunggal (python ingest.py): MQTT, writer storage dan
+#             ring buffer per kit di shared memory
+#   "web"   : worker Dash (gunicorn main:server, konfigurasi di gunicorn.conf.py)
+#             yang memetakan ring buffer proses ingest tanpa salinan; tanpa MQTT
+#             dan writer storage
+DEPLOY_ROLES = ("single", "ingest", "web")
+DEPLOY_ROLE = os.environ.get("EDUKIT_ROLE", "single")
+if DEPLOY_ROLE not in DEPLOY_ROLES:
+    raise ValueError(f"EDUKIT_ROLE harus salah satu dari {DEPLOY_ROLES}")
+SHM_NAME = os.environ.get("EDUKIT_SHM_NAME", "edukit_samples")
+SHM_POLL_INTERVAL = 0.1  # detik, worker web memeriksa sampel baru untuk push
+# EDUKIT_MQTT=0: jangan konek saat import (simulator in-process / replay memanggil on_message langsung)
+MQTT_ENABLED = os.environ.get("EDUKIT_MQTT", "1") != "0" and DEPLOY_ROLE != "web"
 
 # ====== DATA BUFFER (3 SENSOR) ======
 max_len = 100
-timestamps = deque(maxlen=max_len)
-
-# Buffer untuk sensor Air Dingin
-data_dingin_c = deque(maxlen=max_len)
-data_dingin_f = deque(maxlen=max_len)
-data_dingin_k = deque(maxlen=max_len)
-data_dingin_r = deque(maxlen=max_len)
-
-# Buffer untuk sensor Air Panas
-data_panas_c = deque(maxlen=max_len)
-data_panas_f = deque(maxlen=max_len)
-data_panas_k = deque(maxlen=max_len)
-data_panas_r = deque(maxlen=max_len)
-
-# Buffer untuk sensor Air Campuran
-data_campuran_c = deque(maxlen=max_len)
-data_campuran_f = deque(maxlen=max_len)
-data_campuran_k = deque(maxlen=max_len)
-data_campuran_r = deque(maxlen=max_len)
+# Satu ring buffer kolumnar (NumPy) dengan satu write cursor untuk semua kolom.
+# Suhu hanya disimpan dalam °C; F/K/R diturunkan saat render/export (units.py)
+SAMPLE_COLUMNS = {
+    'ts': 'i8',  # Epoch milidetik, monoton per kit (indeks terurut; jam diformat saat tampil)
+    'dingin_c': 'f8',    # Sensor Air Dingin
+    'panas_c': 'f8',     # Sensor Air Panas
+    'campuran_c': 'f8',  # Sensor Air Campuran
+    # Statistik streaming per sensor (mean/std/ewma/slope bergulir) + flag kesetimbangan,
+    # dihitung sekali saat ingest oleh analytics.py
+    **stat_columns(('dingin', 'panas', 'campuran')),
+}
+STAT_COLUMNS = list(stat_columns(('dingin', 'panas', 'campuran')))
+# Setiap kit punya ring buffer dan partisi log sendiri (state eksperimen: sessions.py)
+if DEPLOY_ROLE == "single":
+    kits = KitRegistry(max_len, SAMPLE_COLUMNS, max_kits=MAX_KITS)
+else:
+    kits = SharedKitRegistry(SHM_NAME, max_len, SAMPLE_COLUMNS, max_kits=MAX_KITS,
+                             create=DEPLOY_ROLE == "ingest")
+    atexit.register(kits.close)
 
 # ====== WARNA UNTUK GRAFIK ======
 COLOR_DINGIN = '#1E90FF'   # Biru - Air Dingin
 COLOR_PANAS = '#FF4500'    # Merah - Air Panas
 COLOR_CAMPURAN = '#32CD32' # Hijau - Air Campuran
 
-# ====== STATUS PENCAMPURAN ======
-# Buffer untuk menyimpan nilai kalor secara permanen (tidak dihitung ulang)
-kalor_lepas_buffer = deque(maxlen=max_len)   # Nilai Q lepas per data point
-kalor_terima_buffer = deque(maxlen=max_len)  # Nilai Q terima per data point
+# ====== GRAFIK CONFIG ======
+# Mode streaming: klien hanya menerima titik baru lewat extendData,
+# figure penuh dikirim saat pertama kali dibuka atau setelah reset
+GRAPH_STREAMING = True
+# Format kirim data grafik:
+#   "celsius" : deret °C dikirim sekali per update lewat dcc.Store 'graph-series';
+#               assets/units.js menurunkan °F/K/°R dan memperbarui keempat grafik di browser
+#   "per_unit": server mengirim figure/extendData terpisah untuk setiap satuan
+GRAPH_WIRE = "celsius"
+GRAPH_UNITS = [
+    # (id grafik, suffix kolom, judul, label sumbu y)
+    ('graph-celsius', 'c', "Suhu Celsius (°C)", "°C"),
+    ('graph-fahrenheit', 'f', "Suhu Fahrenheit (°F)", "°F"),
+    ('graph-kelvin', 'k', "Suhu Kelvin (K)", "K"),
+    ('graph-reamur', 'r', "Suhu Reamur (°R)", "°R"),
+]
+# Jendela panjang (buffer besar / riwayat) dikurangi ke maksimal N titik per trace
+PLOT_POINT_BUDGET = 1000
+PLOT_DOWNSAMPLE = "lttb"  # "lttb" | "minmax"
+# Grafik streaming: extend menambah titik mentah di belakang figure yang sudah
+# di-downsample; setelah N titik mentah figure penuh dikirim ulang agar sumbu x
+# tidak bercampur rentang downsample dan mentah
+PLOT_FULL_REFRESH_POINTS = 100
+GRAPH_SENSORS = [
+    # (prefix kolom, nama trace, warna)
+    ('dingin', 'Air Dingin', COLOR_DINGIN),
+    ('panas', 'Air Panas', COLOR_PANAS),
+    ('campuran', 'Air Campuran', COLOR_CAMPURAN),
+]
+SENSOR_COLUMNS = [f'{prefix}_c' for prefix, _, _ in GRAPH_SENSORS]
+GRAPH_COLUMNS = ['ts'] + SENSOR_COLUMNS  # Kolom ring yang disalin untuk grafik
+
+# ====== PUSH CONFIG ======
+# Push mode: ingest MQTT memberi tahu browser lewat Server-Sent Events (/stream),
+# sehingga callback hanya jalan saat ada data baru. False = polling Interval lama.
+PUSH_MODE = True
+PUSH_ROUTE = "/stream"
+PUSH_POLL_INTERVAL = 2000   # ms, hanya dipakai jika PUSH_MODE = False
+PUSH_MIN_INTERVAL = 0.2     # detik, batas laju event per klien (data burst digabung)
+PUSH_KEEPALIVE = 15         # detik, komentar kosong agar proxy tidak memutus koneksi
+# Worker web tidak menerima MQTT: sampel baru dideteksi dari seq ring buffer bersama
+notifier = SeqNotifier(kits, SHM_POLL_INTERVAL) if DEPLOY_ROLE == "web" else Notifier()
+
+# ====== TABEL CONFIG ======
+TABLE_PAGE_SIZE = 15
+TABLE_TEMP_COLUMNS = [f'{prefix}_{unit}' for prefix, _, _ in GRAPH_SENSORS for unit in UNITS]
 
-# State pencampuran global (untuk diakses di MQTT callback)
-mixing_state_global = {'is_mixing': False, 'massa_dingin': 1.0, 'massa_panas': 1.0}
-lock_state_global = {'is_locked': False, 'locked_dingin': 0.0, 'locked_panas': 0.0}
+# ====== RENDER CACHE ======
+# Output callback di-memo per (versi data kit, volume, state sesi): N browser
+# yang melihat data yang sama cukup dirender sekali per sampel baru
+RENDER_CACHE_SIZE = 256
+render_cache = RenderCache(RENDER_CACHE_SIZE)
 
 # ====== KALOR CONFIG ======
 C_AIR = 4200  # Kalor jenis air dalam J/kg°C
 RHO_AIR_DINGIN = 1000  # kg/m^3
 RHO_AIR_PANAS = 480    # kg/m^3
 
+# ====== ANALITIK STREAMING ======
+# O(1) per sampel di jalur ingest; hasil ikut ditulis ke ring buffer (kolom STAT_COLUMNS)
+PUBLISH_INTERVAL = 2.0        # Detik antar pesan firmware (delay(2000) di sketch_nov2a.ino)
+ANALYTICS_WINDOW_S = 60       # Detik data untuk mean/variansi/slope bergulir
+ANALYTICS_WINDOW = round(ANALYTICS_WINDOW_S / PUBLISH_INTERVAL)  # = 30 sampel
+ANALYTICS_EWMA_ALPHA = 0.2
+STEADY_SLOPE = 0.005          # °C/s: |slope| sensor campuran di bawah ini...
+STEADY_STD = 0.1              # °C: ...dan simpangan baku di bawah ini...
+STEADY_HOLD = 10              # ...selama N sampel berturut-turut (±20 s) = kesetimbangan
+AUTO_FREEZE = True            # Bekukan hasil pencampuran otomatis saat kesetimbangan terdeteksi
+AUTO_FREEZE_MIN_SAMPLES = ANALYTICS_WINDOW  # Minimal sampel sejak tombol mulai pencampuran
+AUTO_FREEZE_RISE_SLOPE = 0.05  # °C/s: sensor campuran harus sempat bergerak secepat ini dulu
+analytics = StreamAnalytics(
+    ('dingin', 'panas', 'campuran'), window=ANALYTICS_WINDOW, alpha=ANALYTICS_EWMA_ALPHA,
+    steady_sensor='campuran', steady_slope=STEADY_SLOPE, steady_std=STEADY_STD, hold=STEADY_HOLD)
+
+# ====== PREDIKSI KESETIMBANGAN ======
+# Fit hukum Newton pada sensor campuran sejak mulai naik (equilibrium.py):
+# suhu akhir dan Q diprediksi jauh sebelum sensor benar-benar stabil
+EQ_PREDICT = True
+EQ_PREDICT_MIN_SAMPLES = 5   # Sampel sejak kenaikan sebelum prediksi pertama ditampilkan
+EQ_PREDICT_SHOW_CI = 2.0     # °C: selang lebih lebar dari ini ditampilkan "belum konvergen"
+EQ_PREDICT_READY_CI = 0.5    # °C: selang kepercayaan 95% sesempit ini = run boleh dihentikan
+
+# ====== SESI EKSPERIMEN ======
+# State kunci/pencampuran/kalor per browser (id di dcc.Store 'session-id') dan per kit
+MAX_SESSIONS = 500
+SESSION_IDLE_TIMEOUT = 6 * 3600  # detik
+sessions = SessionManager(C_AIR, max_sessions=MAX_SESSIONS, idle_timeout=SESSION_IDLE_TIMEOUT)
+
 # ====== STORAGE CONFIG ======
-EXCEL_FILE = "data_suhu.xlsx"
-EXCEL_HEADERS = ["Waktu", "Dingin_C", "Dingin_F", "Dingin_K", "Dingin_R", 
+DB_FILE = "data_suhu.db"      # Log append-only (SQLite WAL)
+EXCEL_FILE = "data_suhu.xlsx" # Log Excel lama: hanya diimpor sekali, tidak pernah ditimpa
+EXCEL_EXPORT_FILE = "data_suhu_%Y%m%d-%H%M%S.xlsx"  # Export akhir sesi (strftime), file baru tiap kali
+STORAGE_HEADERS = ["Waktu", "Kit", "Dingin_C", "Panas_C", "Campuran_C", "Ts"]  # Ts = epoch detik
+EXCEL_HEADERS = ["Waktu", "Kit", "Dingin_C", "Dingin_F", "Dingin_K", "Dingin_R", 
                  "Panas_C", "Panas_F", "Panas_K", "Panas_R",
                  "Campuran_C", "Campuran_F", "Campuran_K", "Campuran_R"]
 
+# ====== RETENSI ======
+# (lebar bucket detik, retensi detik); 0 = data mentah, None = simpan selamanya.
+# Rollup mean/min/max diperbarui inkremental saat insert; tiap tier dipangkas sendiri.
+RETENTION_TIERS = [
+    (0, 24 * 3600),          # Mentah: 24 jam
+    (10, 7 * 24 * 3600),     # Rollup 10 detik: 7 hari
+    (60, 365 * 24 * 3600),   # Rollup 1 menit: 1 tahun
+]
+RETENTION_PRUNE_INTERVAL = 60  # detik
+
+# ====== HISTORY CONFIG ======
+HISTORY_ROUTE = "/api/history"
+HISTORY_COLUMNS = ['dingin_c', 'panas_c', 'campuran_c']
+HISTORY_MAX_POINTS = 1000     # Titik per query; rentang panjang dirata-rata per bucket
+HISTORY_FETCH_POINTS = 20000  # Untuk tampilan: bucket halus dari SQLite, lalu LTTB ke PLOT_POINT_BUDGET
+HISTORY_WINDOWS = [
+    # (label, detik)
+    ("15 menit", 15 * 60),
+    ("1 jam", 3600),
+    ("6 jam", 6 * 3600),
+    ("24 jam", 24 * 3600),
+]
+HISTORY_MAX_HOURS_BACK = 48   # Batas slider geser mundur
+EXPORT_ROUTE = "/export"      # ?format=csv|xlsx|parquet&kit=&start=&end=|window=&offset=|session=
+EXPORT_CHUNK_SIZE = 5000      # Baris per chunk yang dibaca dari storage
+
+# ====== WRITER CONFIG ======
+# Baris ditulis oleh thread terpisah agar callback MQTT tidak menunggu disk
+WRITER_QUEUE_SIZE = 10000
+WRITER_BATCH_SIZE = 100       # Flush jika batch mencapai N baris...
+WRITER_FLUSH_INTERVAL = 1.0   # ...atau setelah N detik
+WRITER_OVERFLOW = "spill"     # "block" | "drop_oldest" | "spill"
+WRITER_SPILL_FILE = "data_suhu.spill.jsonl"
+
+# ====== METRICS ======
+# Format teks Prometheus di /metrics. Kit yang tidak terdaftar (topic liar,
+# registry penuh) digabung ke satu label agar jumlah seri tetap terbatas.
+METRICS_ROUTE = "/metrics"
+METRICS_OTHER_KIT = "_lain"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+metrics = Registry()
+messages_received = metrics.counter(
+    "edukit_messages_received_total", "Pesan MQTT yang diterima", ["kit"])
+messages_rejected = metrics.counter(
+    "edukit_messages_rejected_total", "Pesan MQTT yang ditolak (parse, max_kits, error)", ["kit", "reason"])
+parse_failures = metrics.counter(
+    "edukit_parse_failures_total", "Payload yang gagal di-decode", ["kit"])
+display_lag = metrics.histogram(
+    "edukit_display_lag_seconds", "Jeda dari sampel diterima sampai dikirim ke grafik browser",
+    buckets=LATENCY_BUCKETS)
+display_lag_last = metrics.gauge(
+    "edukit_display_lag_last_seconds", "Jeda ingest-ke-tampilan terakhir per kit", ["kit"])
+storage_write_seconds = metrics.histogram(
+    "edukit_storage_write_seconds", "Durasi tulis storage (append batch SQLite, export xlsx)", ["op"],
+    buckets=LATENCY_BUCKETS)
+storage_rows_written = metrics.counter(
+    "edukit_storage_rows_written_total", "Baris yang ditulis writer ke log SQLite")
+writer_queue_depth = metrics.gauge(
+    "edukit_writer_queue_depth", "Baris di antrean writer yang belum ditulis")
+writer_dropped = metrics.counter(
+    "edukit_writer_dropped_rows_total", "Baris yang dibuang karena antrean writer penuh (drop_oldest)")
+writer_spilled = metrics.counter(
+    "edukit_writer_spilled_rows_total", "Baris yang ditulis ke file spill karena antrean writer penuh")
+buffer_occupancy = metrics.gauge(
+    "edukit_buffer_occupancy_ratio", "Isi ring buffer kit dibanding kapasitasnya", ["kit"])
+render_cache_hits = metrics.counter(
+    "edukit_render_cache_hits_total", "Output callback yang diambil dari render cache")
+render_cache_misses = metrics.counter(
+    "edukit_render_cache_misses_total", "Output callback yang harus dirender")
+callback_seconds = metrics.histogram(
+    "edukit_callback_seconds", "Durasi callback Dash", ["callback"], buckets=LATENCY_BUCKETS)
+
+def metrics_kit_label(kit_id):
+    return kit_id if kits.get(kit_id) is not None else METRICS_OTHER_KIT
+
 # ====== STORAGE HELPERS ======
-def init_excel():
-    """Create Excel file with headers if not exists."""
-    if Workbook is None or load_workbook is None:
-        print("[Excel] openpyxl tidak tersedia. Lewati penyimpanan Excel. Install: pip install openpyxl")
+sample_store = None
+storage_writer = None
+
+def init_storage():
+    """Open the append-only log, importing the old Excel file on first run."""
+    global sample_store, storage_writer
+    if DEPLOY_ROLE == "web":
+        # Worker web hanya membaca riwayat (mode=ro, tanpa migrasi/rollup);
+        # skema dan semua tulisan sampel milik proses ingest
+        sample_store = SampleStore(DB_FILE, STORAGE_HEADERS, tiers=RETENTION_TIERS, read_only=True)
+        print(f"[Storage] Log data (baca saja): {DB_FILE}")
         return
     try:
-        if not os.path.exists(EXCEL_FILE):
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "DataSuhu"
-            ws.append(EXCEL_HEADERS)
-            wb.save(EXCEL_FILE)
-            print(f"[Excel] File baru dibuat: {EXCEL_FILE}")
+        is_new = not os.path.exists(DB_FILE)
+        sample_store = SampleStore(DB_FILE, STORAGE_HEADERS, tiers=RETENTION_TIERS,
+                                   prune_interval=RETENTION_PRUNE_INTERVAL)
+        print(f"[Storage] Log data: {DB_FILE}")
     except Exception as e:
-        print("[Excel] Gagal inisialisasi file:", e)
+        sample_store = None
+        print("[Storage] Gagal inisialisasi log:", e)
+        return
+    append_many = sample_store.append_many
+    def write_rows(rows):
+        with storage_write_seconds.time(op="append"):
+            append_many(rows)
+        storage_rows_written.inc(len(rows))
+    storage_writer = BatchWriter(
+        write_rows,
+        maxsize=WRITER_QUEUE_SIZE,
+        batch_size=WRITER_BATCH_SIZE,
+        flush_interval=WRITER_FLUSH_INTERVAL,
+        overflow=WRITER_OVERFLOW,
+        spill_path=WRITER_SPILL_FILE,
+    ).start()
+    # atexit berjalan LIFO: writer di-flush dulu, baru export Excel
+    atexit.register(storage_writer.close)
+    if is_new:
+        try:
+            imported = sample_store.import_xlsx(EXCEL_FILE, defaults={'kit': DEFAULT_KIT})
+            if imported:
+                print(f"[Storage] {imported} baris diimpor dari {EXCEL_FILE}")
+        except Exception as e:
+            print(f"[Storage] Gagal impor {EXCEL_FILE}:", e)
+
+def append_row_to_storage(row):
+    """Queue one row for the writer thread. Row example: [timestamp, kit, dingin_C, panas_C, campuran_C, epoch]."""
+    if storage_writer is None:
+        return
+    storage_writer.put(row)
+
+def query_history(kit_id, start=None, end=None, resolution=None, session_id=None, max_points=HISTORY_MAX_POINTS):
+    """Stored °C samples of one kit in [start, end) epoch seconds.
+
+    `resolution` = lebar bucket (detik); jika kosong dipilih otomatis agar
+    hasil tidak lebih dari `max_points` titik. Dengan `session_id`,
+    rentang default mengikuti kejadian pertama/terakhir sesi tersebut.
+    """
+    if sample_store is None:
+        return {'ts': [], **{c: [] for c in HISTORY_COLUMNS}, 'tier': 0, 'bucket': None, 'resolution': None}
+    if session_id and (start is None or end is None):
+        span = sample_store.session_span(session_id, kit_id)
+        if span is not None:
+            start = span[0] if start is None else start
+            end = span[1] + 1 if end is None else end
+    end = time.time() if end is None else end
+    start = end - 3600 if start is None else start
+    if resolution is None:
+        resolution = (end - start) / max_points
+        resolution = resolution if resolution > 1 else None
+    result = sample_store.query_range(kit_id, start, end, HISTORY_COLUMNS, bucket=resolution)
+    # Tier rollup bisa lebih kasar dari yang diminta jika data mentah sudah dipangkas
+    result.update(kit=kit_id, start=start, end=end, resolution=result['bucket'])
+    return result
+
+def expand_storage_row(row):
+    """Stored row (Waktu, Kit, °C x3, Ts) -> EXCEL_HEADERS layout with F/K/R derived."""
+    return list(row[:2]) + expand_celsius(row[2:5])
+
+def export_storage_to_excel(path=None):
+    """Build the .xlsx from the whole log (on demand / at session end).
 
-def append_row_to_excel(row):
-    """Append one row to Excel file. Row example: [timestamp, C, F, K, R]."""
-    if Workbook is None or load_workbook is None:
+    Default: file bertanda waktu (EXCEL_EXPORT_FILE), jadi EXCEL_FILE yang
+    menjadi sumber impor tidak tertimpa log yang sudah dipangkas retensi.
+    """
+    if sample_store is None:
         return
+    path = path or datetime.now().strftime(EXCEL_EXPORT_FILE)
     try:
-        if not os.path.exists(EXCEL_FILE):
-            init_excel()
-        wb = load_workbook(EXCEL_FILE)
-        ws = wb.active
-        ws.append(row)
-        wb.save(EXCEL_FILE)
+        with storage_write_seconds.time(op="export_xlsx"):
+            exported = sample_store.export_xlsx(path, headers=EXCEL_HEADERS, row_fn=expand_storage_row)
+        if exported:
+            print(f"[Excel] Riwayat diekspor ke {path}")
     except Exception as e:
-        print("[Excel] Gagal menyimpan baris:", e)
+        print("[Excel] Gagal export riwayat:", e)
 
 # ====== MQTT CALLBACK ======
 def on_message(client, userdata, msg):
+    kit_id = kit_id_from_topic(msg.topic)
     try:
-        payload = json.loads(msg.payload.decode())
-        # Pastikan semua data sensor ada
-        if all(key in payload for key in ("dingin", "panas", "campuran")):
-            dingin = payload["dingin"]
-            panas = payload["panas"]
-            campuran = payload["campuran"]
-            
-            # Validasi data setiap sensor
-            if all(key in dingin for key in ("C", "F", "K", "R")) and \
-               all(key in panas for key in ("C", "F", "K", "R")) and \
-               all(key in campuran for key in ("C", "F", "K", "R")):
-                
-                ts_display = datetime.now().strftime("%H:%M:%S")
-                timestamps.append(ts_display)
-                
-                # Simpan data Air Dingin
-                # Cek status lock
-                if lock_state_global['is_locked']:
-                    val_dingin_c = lock_state_global['locked_dingin']
-                    val_panas_c = lock_state_global['locked_panas']
-                    # Untuk satuan lain, kita bisa hitung manual atau biarkan (karena yang krusial C)
-                    # Untuk simplifikasi visual grafik, kita append nilai locked ke C, 
-                    # tapi F, K, R mungkin akan tetap data sensor asli jika tidak kita konversi juga.
-                    # Agar konsisten "garis lurus", sebaiknya kita konversi juga atau pakai nilai terakhir.
-                    # Namun karena user fokus ke C dan Kalor, kita prioritaskan C.
-                    # Biar rapi, kita pakai data sensor asli untuk F, K, R atau biarkan apa adanya?
-                    # User minta "grafik ... tetap lurus". Jadi semua satuan harus lurus.
-                    # Kita hitung konversi sederhana untuk locked value
-                    val_dingin_f = (val_dingin_c * 9/5) + 32
-                    val_dingin_k = val_dingin_c + 273.15
-                    val_dingin_r = val_dingin_c * 4/5
-                    
-                    val_panas_f = (val_panas_c * 9/5) + 32
-                    val_panas_k = val_panas_c + 273.15
-                    val_panas_r = val_panas_c * 4/5
-                else:
-                    val_dingin_c = dingin["C"]
-                    val_dingin_f = dingin["F"]
-                    val_dingin_k = dingin["K"]
-                    val_dingin_r = dingin["R"]
-                    
-                    val_panas_c = panas["C"]
-                    val_panas_f = panas["F"]
-                    val_panas_k = panas["K"]
-                    val_panas_r = panas["R"]
-
-                data_dingin_c.append(val_dingin_c)
-                data_dingin_f.append(val_dingin_f)
-                data_dingin_k.append(val_dingin_k)
-                data_dingin_r.append(val_dingin_r)
-                
-                # Simpan data Air Panas
-                data_panas_c.append(val_panas_c)
-                data_panas_f.append(val_panas_f)
-                data_panas_k.append(val_panas_k)
-                data_panas_r.append(val_panas_r)
-                
-                # Simpan data Air Campuran
-                # Cek apakah status finished (freeze result)
-                is_finished_global = mixing_state_global.get('is_finished', False)
-                
-                if is_finished_global:
-                    # Gunakan nilai final yang disimpan
-                    val_campuran_c = mixing_state_global.get('final_campuran', 0)
-                    val_campuran_f = (val_campuran_c * 9/5) + 32
-                    val_campuran_k = val_campuran_c + 273.15
-                    val_campuran_r = val_campuran_c * 4/5
-                else:
-                    # Gunakan data real-time
-                    val_campuran_c = campuran["C"]
-                    val_campuran_f = campuran["F"]
-                    val_campuran_k = campuran["K"]
-                    val_campuran_r = campuran["R"]
-                
-                data_campuran_c.append(val_campuran_c)
-                data_campuran_f.append(val_campuran_f)
-                data_campuran_k.append(val_campuran_k)
-                data_campuran_r.append(val_campuran_r)
-                
-                # Hitung dan simpan nilai kalor berdasarkan mode saat ini
-                if mixing_state_global['is_mixing']:
-                    # Mode pencampuran - hitung kalor dan simpan secara permanen
-                    m_dingin = mixing_state_global['massa_dingin']
-                    m_panas = mixing_state_global['massa_panas']
-                    # Gunakan nilai yang (mungkin) sudah di-lock
-                    q_lepas = abs(m_panas * C_AIR * (val_panas_c - val_campuran_c))
-                    q_terima = abs(m_dingin * C_AIR * (val_campuran_c - val_dingin_c))
-                    kalor_lepas_buffer.append(q_lepas)
-                    kalor_terima_buffer.append(q_terima)
-                elif is_finished_global:
-                    # Jika finished, kita tetap append nilai kalor terakhir (atau 0?)
-                    # Biasanya user ingin melihat nilai kalor terakhir yang "valid"
-                    # Ambil nilai terakhir dari buffer jika ada
-                    last_q_lepas = kalor_lepas_buffer[-1] if len(kalor_lepas_buffer) > 0 else 0.0
-                    last_q_terima = kalor_terima_buffer[-1] if len(kalor_terima_buffer) > 0 else 0.0
-                    kalor_lepas_buffer.append(last_q_lepas)
-                    kalor_terima_buffer.append(last_q_terima)
-                else:
-                    # Mode pengukuran awal - simpan 0
-                    kalor_lepas_buffer.append(0.0)
-                    kalor_terima_buffer.append(0.0)
-                
-                # Simpan ke Excel
-                ts_save = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                append_row_to_excel([
-                    ts_save, 
-                    val_dingin_c, val_dingin_f, val_dingin_k, val_dingin_r,
-                    val_panas_c, val_panas_f, val_panas_k, val_panas_r,
-                    campuran["C"], campuran["F"], campuran["K"], campuran["R"]
-                ])
-                print(f"[MQTT] Data diterima: Dingin={val_dingin_c:.2f}°C, Panas={val_panas_c:.2f}°C, Campuran={campuran['C']}°C")
-    except Exception as e:
+        # Satu jalur decode tervalidasi untuk payload biner ringkas maupun JSON lama.
+        # Hanya °C yang dipakai; F/K/R (jika dikirim firmware lama) diturunkan dari °C
+        dingin_c, panas_c, campuran_c = decode_payload(msg.payload)
+    except PayloadError as e:
+        label = metrics_kit_label(kit_id)
+        messages_received.inc(kit=label)
+        parse_failures.inc(kit=label)
+        messages_rejected.inc(kit=label, reason="parse")
         print("Gagal parsing data:", e)
+        return
+    # Lookup kit lewat registry (dict), kit baru dibuat otomatis
+    kit = kits.get_or_create(kit_id)
+    if kit is None:
+        messages_received.inc(kit=METRICS_OTHER_KIT)
+        messages_rejected.inc(kit=METRICS_OTHER_KIT, reason="max_kits")
+        print(f"[MQTT] Jumlah kit maksimum ({MAX_KITS}) tercapai, pesan dari {msg.topic} diabaikan")
+        return
+    messages_received.inc(kit=kit.kit_id)
+    try:
+        now = datetime.now()
+        ts = now.timestamp()
+        # Statistik bergulir + deteksi kesetimbangan, O(1) per sampel
+        stats = analytics.update(kit.kit_id, ts, {'dingin': dingin_c, 'panas': panas_c, 'campuran': campuran_c})
+        # Simpan data mentah; kunci/freeze/kalor diterapkan per sesi saat render
+        # Jam sistem bisa mundur (NTP): cap waktu ring dijaga tidak menurun agar tetap terurut
+        kit.samples.append(
+            ts=max(epoch_ms(now), kit.samples.last('ts', 0)),
+            dingin_c=dingin_c, panas_c=panas_c, campuran_c=campuran_c,
+            **stats,
+        )
+        
+        # Antrekan ke writer thread (tidak menunggu disk)
+        ts_save = now.strftime("%Y-%m-%d %H:%M:%S")
+        append_row_to_storage([ts_save, kit.kit_id, dingin_c, panas_c, campuran_c, ts])
+        kit.last_ingest = ts
+        notifier.notify(kit.kit_id)
+        print(f"[MQTT] [{kit.kit_id}] Data diterima: Dingin={dingin_c:.2f}°C, Panas={panas_c:.2f}°C, Campuran={campuran_c:.2f}°C")
+    except Exception as e:
+        messages_rejected.inc(kit=kit.kit_id, reason="error")
+        print("Gagal memproses data:", e)
 
 # ====== MQTT CLIENT ======
 mqtt_client = mqtt.Client()
 mqtt_client.on_message = on_message
 
-try:
-    # Pastikan file Excel siap
-    init_excel()
-    mqtt_client.connect(MQTT_BROKER, 1883, 60)
-    mqtt_client.subscribe(MQTT_TOPIC)
-    mqtt_client.loop_start()
-    print(f"Terhubung ke MQTT Broker: {MQTT_BROKER}, Topic: {MQTT_TOPIC}")
-except Exception as e:
-    print("Gagal konek MQTT:", e)
+# Pastikan log penyimpanan siap; .xlsx baru dibuat saat sesi selesai (oleh proses penulis log)
+if DEPLOY_ROLE != "web":
+    atexit.register(export_storage_to_excel)
+init_storage()
+
+if MQTT_ENABLED:
+    try:
+        mqtt_client.connect(MQTT_BROKER, MQTT_PORT, 60)
+        mqtt_client.subscribe([(MQTT_TOPIC_KITS, 0), (MQTT_TOPIC_LEGACY, 0)])
+        mqtt_client.loop_start()
+        print(f"Terhubung ke MQTT Broker: {MQTT_BROKER}, Topic: {MQTT_TOPIC_KITS}, {MQTT_TOPIC_LEGACY}")
+    except Exception as e:
+        print("Gagal konek MQTT:", e)
+else:
+    print("[MQTT] Dinonaktifkan (EDUKIT_MQTT=0)")
 
 # ====== DASH APP ======
 app = dash.Dash(__name__)
-app.layout = html.Div([
-    html.H2("🌡️ BlackSense Smart Thermo EduKit Dashboard", style={'textAlign': 'center', 'marginBottom': '5px'}),
-    html.H5("Asas Black Learning - Real-Time Heat Transfer Monitoring (3 Sensor)", style={'textAlign': 'center', 'color': '#666', 'fontWeight': 'normal', 'marginTop': '0', 'marginBottom': '20px'}),
-    html.Div(id='status', style={'textAlign': 'center', 'color': 'gray', 'marginBottom': '20px'}),
-    
-    # ====== TOMBOL PENCAMPURAN & STATUS BADGE ======
-    html.Div([
-        # Tombol Lock Sensor
-        html.Button(
-            id='btn-lock-sensors',
-            children='🔒 Kunci Suhu Awal',
-            n_clicks=0,
-            style={
-                'padding': '15px 30px',
-                'fontSize': '18px',
-                'fontWeight': 'bold',
-                'backgroundColor': '#17a2b8', # Info color
-                'color': 'white',
-                'border': 'none',
-                'borderRadius': '10px',
-                'cursor': 'pointer',
-                'marginRight': '20px'
-            }
-        ),
-        # Tombol Toggle Pencampuran
-        html.Button(
-            id='btn-toggle-mixing',
-            children='🔄 Mulai Pencampuran',
-            n_clicks=0,
-            style={
-                'padding': '15px 30px',
-                'fontSize': '18px',
-                'fontWeight': 'bold',
-                'backgroundColor': '#28a745',
-                'color': 'white',
-                'border': 'none',
-                'borderRadius': '10px',
-                'cursor': 'pointer',
-                'marginRight': '20px'
-            }
-        ),
-        # Status Badge
-        html.Span(
-            id='mixing-status-badge',
-            children='Mode: Pengukuran Awal',
-            style={
-                'padding': '10px 20px',
-                'fontSize': '16px',
-                'fontWeight': 'bold',
-                'backgroundColor': '#6c757d',
-                'color': 'white',
-                'borderRadius': '20px',
-                'display': 'inline-block'
-            }
-        ),
-        # Store untuk menyimpan state pencampuran
-        dcc.Store(id='mixing-state', data={'is_mixing': False, 'start_index': -1}),
-        # Store untuk menyimpan state lock sensor
-        dcc.Store(id='lock-state', data={'is_locked': False, 'locked_temp_dingin': 0, 'locked_temp_panas': 0}),
-    ], style={'textAlign': 'center', 'marginBottom': '20px'}),
-    
-    # Legend Sensor
-    html.Div([
-        html.Span("● Air Dingin", style={'color': COLOR_DINGIN, 'marginRight': '30px', 'fontWeight': 'bold'}),
-        html.Span("● Air Panas", style={'color': COLOR_PANAS, 'marginRight': '30px', 'fontWeight': 'bold'}),
-        html.Span("● Air Campuran", style={'color': COLOR_CAMPURAN, 'fontWeight': 'bold'}),
-    ], style={'textAlign': 'center', 'marginBottom': '20px', 'fontSize': '16px'}),
-    
-    # Kontrol dan Card Section
-    html.Div([
-        # Input Volume untuk masing-masing air
+server = app.server  # WSGI app untuk gunicorn (EDUKIT_ROLE=web)
+def serve_layout():
+    """Layout dibuat per page load agar setiap tab mendapat id sesi baru."""
+    return html.Div([
+        html.H2("🌡️ BlackSense Smart Thermo EduKit Dashboard", style={'textAlign': 'center', 'marginBottom': '5px'}),
+        html.H5("Asas Black Learning - Real-Time Heat Transfer Monitoring (3 Sensor)", style={'textAlign': 'center', 'color': '#666', 'fontWeight': 'normal', 'marginTop': '0', 'marginBottom': '20px'}),
+        html.Div(id='status', style={'textAlign': 'center', 'color': 'gray', 'marginBottom': '20px'}),
+    
+        # ====== PILIH KIT ======
         html.Div([
+            html.Label("Kit:", style={'marginRight': '10px', 'fontWeight': 'bold'}),
+            dcc.Dropdown(
+                id='kit-select',
+                options=[],
+                value=None,
+                clearable=False,
+                placeholder="Menunggu data kit...",
+                style={'width': '300px', 'display': 'inline-block', 'verticalAlign': 'middle', 'textAlign': 'left'}
+            ),
+        ], style={'textAlign': 'center', 'marginBottom': '20px'}),
+    
+        # Grid ringkasan semua kit (tampil jika "Semua Kit" dipilih)
+        html.Div(id='kit-overview', style={'display': 'none'}),
+    
+        # Detail satu kit
+        html.Div(id='kit-detail', children=[
+            # ====== TOMBOL PENCAMPURAN & STATUS BADGE ======
             html.Div([
-                html.Label("Volume Air Dingin (mL):", style={'color': COLOR_DINGIN}),
-                dcc.Input(
-                    id='volume-dingin-input',
-                    type='number',
-                    value=250,
-                    min=0,
-                    step='any',
-                    style={'marginLeft': '10px', 'width': '80px'}
+                # Tombol Lock Sensor
+                html.Button(
+                    id='btn-lock-sensors',
+                    children='🔒 Kunci Suhu Awal',
+                    n_clicks=0,
+                    style={
+                        'padding': '15px 30px',
+                        'fontSize': '18px',
+                        'fontWeight': 'bold',
+                        'backgroundColor': '#17a2b8', # Info color
+                        'color': 'white',
+                        'border': 'none',
+                        'borderRadius': '10px',
+                        'cursor': 'pointer',
+                        'marginRight': '20px'
+                    }
                 ),
-            ], style={'display': 'inline-block', 'marginRight': '30px'}),
-            
-            html.Div([
-                html.Label("Volume Air Panas (mL):", style={'color': COLOR_PANAS}),
-                dcc.Input(
-                    id='volume-panas-input',
-                    type='number',
-                    value=250,
-                    min=0,
-                    step='any',
-                    style={'marginLeft': '10px', 'width': '80px'}
+                # Tombol Toggle Pencampuran
+                html.Button(
+                    id='btn-toggle-mixing',
+                    children='🔄 Mulai Pencampuran',
+                    n_clicks=0,
+                    style={
+                        'padding': '15px 30px',
+                        'fontSize': '18px',
+                        'fontWeight': 'bold',
+                        'backgroundColor': '#28a745',
+                        'color': 'white',
+                        'border': 'none',
+                        'borderRadius': '10px',
+                        'cursor': 'pointer',
+                        'marginRight': '20px'
+                    }
                 ),
-            ], style={'display': 'inline-block', 'marginRight': '30px'}),
-        ], style={'marginBottom': '20px'}),
-
-        # Card Kalor - untuk menampilkan kalor yang dipindahkan
-        html.Div([
+                # Status Badge
+                html.Span(
+                    id='mixing-status-badge',
+                    children='Mode: Pengukuran Awal',
+                    style={
+                        'padding': '10px 20px',
+                        'fontSize': '16px',
+                        'fontWeight': 'bold',
+                        'backgroundColor': '#6c757d',
+                        'color': 'white',
+                        'borderRadius': '20px',
+                        'display': 'inline-block'
+                    }
+                ),
+                # Store untuk menyimpan state pencampuran
+                dcc.Store(id='mixing-state', data={'is_mixing': False, 'start_index': -1}),
+                # Store untuk menyimpan state lock sensor
+                dcc.Store(id='lock-state', data={'is_locked': False, 'locked_temp_dingin': 0, 'locked_temp_panas': 0}),
+            ], style={'textAlign': 'center', 'marginBottom': '20px'}),
+    
+            # Legend Sensor
             html.Div([
-                html.H4("Kalor Dilepas Air Panas", style={'textAlign': 'center', 'color': COLOR_PANAS}),
-                html.Div(id='kalor-dilepas-output', style={'fontSize': '24px', 'textAlign': 'center', 'fontWeight': 'bold', 'color': COLOR_PANAS})
-            ], style={'border': f'2px solid {COLOR_PANAS}', 'padding': '20px', 'width': '30%', 'display': 'inline-block', 'margin': '10px', 'borderRadius': '10px'}),
-            
+                html.Span("● Air Dingin", style={'color': COLOR_DINGIN, 'marginRight': '30px', 'fontWeight': 'bold'}),
+                html.Span("● Air Panas", style={'color': COLOR_PANAS, 'marginRight': '30px', 'fontWeight': 'bold'}),
+                html.Span("● Air Campuran", style={'color': COLOR_CAMPURAN, 'fontWeight': 'bold'}),
+            ], style={'textAlign': 'center', 'marginBottom': '20px', 'fontSize': '16px'}),
+    
+            # Kontrol dan Card Section
             html.Div([
-                html.H4("Kalor Diterima Air Dingin", style={'textAlign': 'center', 'color': COLOR_DINGIN}),
-                html.Div(id='kalor-diterima-output', style={'fontSize': '24px', 'textAlign': 'center', 'fontWeight': 'bold', 'color': COLOR_DINGIN})
-            ], style={'border': f'2px solid {COLOR_DINGIN}', 'padding': '20px', 'width': '30%', 'display': 'inline-block', 'margin': '10px', 'borderRadius': '10px'}),
+                # Input Volume untuk masing-masing air
+                html.Div([
+                    html.Div([
+                        html.Label("Volume Air Dingin (mL):", style={'color': COLOR_DINGIN}),
+                        dcc.Input(
+                            id='volume-dingin-input',
+                            type='number',
+                            value=250,
+                            min=0,
+                            step='any',
+                            style={'marginLeft': '10px', 'width': '80px'}
+                        ),
+                    ], style={'display': 'inline-block', 'marginRight': '30px'}),
+            
+                    html.Div([
+                        html.Label("Volume Air Panas (mL):", style={'color': COLOR_PANAS}),
+                        dcc.Input(
+                            id='volume-panas-input',
+                            type='number',
+                            value=250,
+                            min=0,
+                            step='any',
+                            style={'marginLeft': '10px', 'width': '80px'}
+                        ),
+                    ], style={'display': 'inline-block', 'marginRight': '30px'}),
+                ], style={'marginBottom': '20px'}),
+
+                # Card Kalor - untuk menampilkan kalor yang dipindahkan
+                html.Div([
+                    html.Div([
+                        html.H4("Kalor Dilepas Air Panas", style={'textAlign': 'center', 'color': COLOR_PANAS}),
+                        html.Div(id='kalor-dilepas-output', style={'fontSize': '24px', 'textAlign': 'center', 'fontWeight': 'bold', 'color': COLOR_PANAS})
+                    ], style={'border': f'2px solid {COLOR_PANAS}', 'padding': '20px', 'width': '30%', 'display': 'inline-block', 'margin': '10px', 'borderRadius': '10px'}),
             
+                    html.Div([
+                        html.H4("Kalor Diterima Air Dingin", style={'textAlign': 'center', 'color': COLOR_DINGIN}),
+                        html.Div(id='kalor-diterima-output', style={'fontSize': '24px', 'textAlign': 'center', 'fontWeight': 'bold', 'color': COLOR_DINGIN})
+                    ], style={'border': f'2px solid {COLOR_DINGIN}', 'padding': '20px', 'width': '30%', 'display': 'inline-block', 'margin': '10px', 'borderRadius': '10px'}),
+            
+                    html.Div([
+                        html.H4("Suhu Keseimbangan", style={'textAlign': 'center', 'color': COLOR_CAMPURAN}),
+                        html.Div(id='suhu-campuran-output', style={'fontSize': '24px', 'textAlign': 'center', 'fontWeight': 'bold', 'color': COLOR_CAMPURAN})
+                    ], style={'border': f'2px solid {COLOR_CAMPURAN}', 'padding': '20px', 'width': '30%', 'display': 'inline-block', 'margin': '10px', 'borderRadius': '10px'})
+                ])
+            ], style={'textAlign': 'center', 'marginBottom': '30px', 'border': '1px solid #eee', 'padding': '20px', 'width': '90%', 'margin': 'auto', 'borderRadius': '10px'}),
+    
+            # Grafik Suhu - 2 kolom
             html.Div([
-                html.H4("Suhu Keseimbangan", style={'textAlign': 'center', 'color': COLOR_CAMPURAN}),
-                html.Div(id='suhu-campuran-output', style={'fontSize': '24px', 'textAlign': 'center', 'fontWeight': 'bold', 'color': COLOR_CAMPURAN})
-            ], style={'border': f'2px solid {COLOR_CAMPURAN}', 'padding': '20px', 'width': '30%', 'display': 'inline-block', 'margin': '10px', 'borderRadius': '10px'})
-        ])
-    ], style={'textAlign': 'center', 'marginBottom': '30px', 'border': '1px solid #eee', 'padding': '20px', 'width': '90%', 'margin': 'auto', 'borderRadius': '10px'}),
-    
-    # Grafik Suhu - 2 kolom
-    html.Div([
-        html.Div([
-            dcc.Graph(id='graph-celsius')
-        ], style={'width': '48%', 'display': 'inline-block', 'padding': '10px'}),
+                html.Div([
+                    dcc.Graph(id='graph-celsius')
+                ], style={'width': '48%', 'display': 'inline-block', 'padding': '10px'}),
         
-        html.Div([
-            dcc.Graph(id='graph-fahrenheit')
-        ], style={'width': '48%', 'display': 'inline-block', 'padding': '10px'})
-    ]),
+                html.Div([
+                    dcc.Graph(id='graph-fahrenheit')
+                ], style={'width': '48%', 'display': 'inline-block', 'padding': '10px'})
+            ]),
     
-    html.Div([
-        html.Div([
-            dcc.Graph(id='graph-kelvin')
-        ], style={'width': '48%', 'display': 'inline-block', 'padding': '10px'}),
+            html.Div([
+                html.Div([
+                    dcc.Graph(id='graph-kelvin')
+                ], style={'width': '48%', 'display': 'inline-block', 'padding': '10px'}),
         
-        html.Div([
-            dcc.Graph(id='graph-reamur')
-        ], style={'width': '48%', 'display': 'inline-block', 'padding': '10px'})
-    ]),
-    
-    html.H4("Tabel Data Real-Time (3 Sensor)", style={'textAlign': 'center', 'marginTop': '40px'}),
-    dash_table.DataTable(
-        id='live-table',
-        columns=[
-            # Kolom Waktu
-            {'name': ['', 'Waktu'], 'id': 'waktu'},
-            # Kolom Air Dingin (4 satuan)
-            {'name': ['Air Dingin', '°C'], 'id': 'dingin_c'},
-            {'name': ['Air Dingin', '°F'], 'id': 'dingin_f'},
-            {'name': ['Air Dingin', 'K'], 'id': 'dingin_k'},
-            {'name': ['Air Dingin', '°R'], 'id': 'dingin_r'},
-            # Kolom Air Panas (4 satuan)
-            {'name': ['Air Panas', '°C'], 'id': 'panas_c'},
-            {'name': ['Air Panas', '°F'], 'id': 'panas_f'},
-            {'name': ['Air Panas', 'K'], 'id': 'panas_k'},
-            {'name': ['Air Panas', '°R'], 'id': 'panas_r'},
-            # Kolom Air Campuran (4 satuan)
-            {'name': ['Air Campuran', '°C'], 'id': 'campuran_c'},
-            {'name': ['Air Campuran', '°F'], 'id': 'campuran_f'},
-            {'name': ['Air Campuran', 'K'], 'id': 'campuran_k'},
-            {'name': ['Air Campuran', '°R'], 'id': 'campuran_r'},
-            # Kolom Kalor
-            {'name': ['Kalor', 'Q Lepas (J)'], 'id': 'kalor_lepas'},
-            {'name': ['Kalor', 'Q Terima (J)'], 'id': 'kalor_terima'},
-        ],
-        merge_duplicate_headers=True,
-        page_size=15,
-        style_cell={
-            'textAlign': 'center', 
-            'padding': '8px',
-            'minWidth': '60px',
-            'maxWidth': '100px',
-            'whiteSpace': 'normal'
-        },
-        style_header={
-            'backgroundColor': '#f8f9fa',
-            'fontWeight': 'bold',
-            'border': '1px solid #dee2e6',
-            'textAlign': 'center'
-        },
-        style_data_conditional=[
-            # Alternating row colors
-            {
-                'if': {'row_index': 'odd'},
-                'backgroundColor': 'rgb(248, 248, 248)'
-            },
-            # Air Dingin columns - Biru
-            {'if': {'column_id': 'dingin_c'}, 'color': COLOR_DINGIN, 'fontWeight': 'bold'},
-            {'if': {'column_id': 'dingin_f'}, 'color': COLOR_DINGIN},
-            {'if': {'column_id': 'dingin_k'}, 'color': COLOR_DINGIN},
-            {'if': {'column_id': 'dingin_r'}, 'color': COLOR_DINGIN},
-            # Air Panas columns - Merah
-            {'if': {'column_id': 'panas_c'}, 'color': COLOR_PANAS, 'fontWeight': 'bold'},
-            {'if': {'column_id': 'panas_f'}, 'color': COLOR_PANAS},
-            {'if': {'column_id': 'panas_k'}, 'color': COLOR_PANAS},
-            {'if': {'column_id': 'panas_r'}, 'color': COLOR_PANAS},
-            # Air Campuran columns - Hijau
-            {'if': {'column_id': 'campuran_c'}, 'color': COLOR_CAMPURAN, 'fontWeight': 'bold'},
-            {'if': {'column_id': 'campuran_f'}, 'color': COLOR_CAMPURAN},
-            {'if': {'column_id': 'campuran_k'}, 'color': COLOR_CAMPURAN},
-            {'if': {'column_id': 'campuran_r'}, 'color': COLOR_CAMPURAN},
-        ],
-        style_header_conditional=[
-            # Header Air Dingin - background biru muda
-            {'if': {'column_id': ['dingin_c', 'dingin_f', 'dingin_k', 'dingin_r'], 'header_index': 0},
-             'backgroundColor': '#E6F3FF', 'color': COLOR_DINGIN},
-            {'if': {'column_id': ['dingin_c', 'dingin_f', 'dingin_k', 'dingin_r'], 'header_index': 1},
-             'backgroundColor': '#E6F3FF', 'color': COLOR_DINGIN},
-            # Header Air Panas - background merah muda
-            {'if': {'column_id': ['panas_c', 'panas_f', 'panas_k', 'panas_r'], 'header_index': 0},
-             'backgroundColor': '#FFE6E0', 'color': COLOR_PANAS},
-            {'if': {'column_id': ['panas_c', 'panas_f', 'panas_k', 'panas_r'], 'header_index': 1},
-             'backgroundColor': '#FFE6E0', 'color': COLOR_PANAS},
-            # Header Air Campuran - background hijau muda
-            {'if': {'column_id': ['campuran_c', 'campuran_f', 'campuran_k', 'campuran_r'], 'header_index': 0},
-             'backgroundColor': '#E6FFE6', 'color': COLOR_CAMPURAN},
-            {'if': {'column_id': ['campuran_c', 'campuran_f', 'campuran_k', 'campuran_r'], 'header_index': 1},
-             'backgroundColor': '#E6FFE6', 'color': COLOR_CAMPURAN},
-            # Header Kalor - background kuning muda
-            {'if': {'column_id': ['kalor_lepas', 'kalor_terima'], 'header_index': 0},
-             'backgroundColor': '#FFF9E6', 'color': '#856404'},
-            {'if': {'column_id': ['kalor_lepas', 'kalor_terima'], 'header_index': 1},
-             'backgroundColor': '#FFF9E6', 'color': '#856404'},
-        ],
-        style_table={'overflowX': 'auto', 'width': '95%', 'margin': 'auto'}
-    ),
-    html.Button("Export ke Excel", id="btn-export-excel", style={'marginTop': '10px', 'display': 'block', 'margin': 'auto'}),
-    dcc.Download(id="download-excel"),
-    
-    dcc.Interval(id='update', interval=2000, n_intervals=0)
-])
+                html.Div([
+                    dcc.Graph(id='graph-reamur')
+                ], style={'width': '48%', 'display': 'inline-block', 'padding': '10px'})
+            ]),
+    
+            html.H4("Tabel Data Real-Time (3 Sensor)", style={'textAlign': 'center', 'marginTop': '40px'}),
+            dash_table.DataTable(
+                id='live-table',
+                columns=[
+                    # Kolom Waktu
+                    {'name': ['', 'Waktu'], 'id': 'waktu'},
+                    # Kolom Air Dingin (4 satuan)
+                    {'name': ['Air Dingin', '°C'], 'id': 'dingin_c'},
+                    {'name': ['Air Dingin', '°F'], 'id': 'dingin_f'},
+                    {'name': ['Air Dingin', 'K'], 'id': 'dingin_k'},
+                    {'name': ['Air Dingin', '°R'], 'id': 'dingin_r'},
+                    # Kolom Air Panas (4 satuan)
+                    {'name': ['Air Panas', '°C'], 'id': 'panas_c'},
+                    {'name': ['Air Panas', '°F'], 'id': 'panas_f'},
+                    {'name': ['Air Panas', 'K'], 'id': 'panas_k'},
+                    {'name': ['Air Panas', '°R'], 'id': 'panas_r'},
+                    # Kolom Air Campuran (4 satuan)
+                    {'name': ['Air Campuran', '°C'], 'id': 'campuran_c'},
+                    {'name': ['Air Campuran', '°F'], 'id': 'campuran_f'},
+                    {'name': ['Air Campuran', 'K'], 'id': 'campuran_k'},
+                    {'name': ['Air Campuran', '°R'], 'id': 'campuran_r'},
+                    # Kolom Kalor
+                    {'name': ['Kalor', 'Q Lepas (J)'], 'id': 'kalor_lepas'},
+                    {'name': ['Kalor', 'Q Terima (J)'], 'id': 'kalor_terima'},
+                ],
+                merge_duplicate_headers=True,
+                # Paginasi di server: callback hanya mengirim baris halaman ini
+                page_action='custom',
+                page_current=0,
+                page_size=TABLE_PAGE_SIZE,
+                page_count=1,
+                style_cell={
+                    'textAlign': 'center', 
+                    'padding': '8px',
+                    'minWidth': '60px',
+                    'maxWidth': '100px',
+                    'whiteSpace': 'normal'
+                },
+                style_header={
+                    'backgroundColor': '#f8f9fa',
+                    'fontWeight': 'bold',
+                    'border': '1px solid #dee2e6',
+                    'textAlign': 'center'
+                },
+                style_data_conditional=[
+                    # Alternating row colors
+                    {
+                        'if': {'row_index': 'odd'},
+                        'backgroundColor': 'rgb(248, 248, 248)'
+                    },
+                    # Air Dingin columns - Biru
+                    {'if': {'column_id': 'dingin_c'}, 'color': COLOR_DINGIN, 'fontWeight': 'bold'},
+                    {'if': {'column_id': 'dingin_f'}, 'color': COLOR_DINGIN},
+                    {'if': {'column_id': 'dingin_k'}, 'color': COLOR_DINGIN},
+                    {'if': {'column_id': 'dingin_r'}, 'color': COLOR_DINGIN},
+                    # Air Panas columns - Merah
+                    {'if': {'column_id': 'panas_c'}, 'color': COLOR_PANAS, 'fontWeight': 'bold'},
+                    {'if': {'column_id': 'panas_f'}, 'color': COLOR_PANAS},
+                    {'if': {'column_id': 'panas_k'}, 'color': COLOR_PANAS},
+                    {'if': {'column_id': 'panas_r'}, 'color': COLOR_PANAS},
+                    # Air Campuran columns - Hijau
+                    {'if': {'column_id': 'campuran_c'}, 'color': COLOR_CAMPURAN, 'fontWeight': 'bold'},
+                    {'if': {'column_id': 'campuran_f'}, 'color': COLOR_CAMPURAN},
+                    {'if': {'column_id': 'campuran_k'}, 'color': COLOR_CAMPURAN},
+                    {'if': {'column_id': 'campuran_r'}, 'color': COLOR_CAMPURAN},
+                ],
+                style_header_conditional=[
+                    # Header Air Dingin - background biru muda
+                    {'if': {'column_id': ['dingin_c', 'dingin_f', 'dingin_k', 'dingin_r'], 'header_index': 0},
+                     'backgroundColor': '#E6F3FF', 'color': COLOR_DINGIN},
+                    {'if': {'column_id': ['dingin_c', 'dingin_f', 'dingin_k', 'dingin_r'], 'header_index': 1},
+                     'backgroundColor': '#E6F3FF', 'color': COLOR_DINGIN},
+                    # Header Air Panas - background merah muda
+                    {'if': {'column_id': ['panas_c', 'panas_f', 'panas_k', 'panas_r'], 'header_index': 0},
+                     'backgroundColor': '#FFE6E0', 'color': COLOR_PANAS},
+                    {'if': {'column_id': ['panas_c', 'panas_f', 'panas_k', 'panas_r'], 'header_index': 1},
+                     'backgroundColor': '#FFE6E0', 'color': COLOR_PANAS},
+                    # Header Air Campuran - background hijau muda
+                    {'if': {'column_id': ['campuran_c', 'campuran_f', 'campuran_k', 'campuran_r'], 'header_index': 0},
+                     'backgroundColor': '#E6FFE6', 'color': COLOR_CAMPURAN},
+                    {'if': {'column_id': ['campuran_c', 'campuran_f', 'campuran_k', 'campuran_r'], 'header_index': 1},
+                     'backgroundColor': '#E6FFE6', 'color': COLOR_CAMPURAN},
+                    # Header Kalor - background kuning muda
+                    {'if': {'column_id': ['kalor_lepas', 'kalor_terima'], 'header_index': 0},
+                     'backgroundColor': '#FFF9E6', 'color': '#856404'},
+                    {'if': {'column_id': ['kalor_lepas', 'kalor_terima'], 'header_index': 1},
+                     'backgroundColor': '#FFF9E6', 'color': '#856404'},
+                ],
+                style_table={'overflowX': 'auto', 'width': '95%', 'margin': 'auto'}
+            ),
+            html.Button("Export ke Excel", id="btn-export-excel", style={'marginTop': '10px', 'display': 'block', 'margin': 'auto'}),
+            dcc.Download(id="download-excel"),
+            
+            # ====== RIWAYAT (DARI STORAGE) ======
+            html.Div([
+                html.H3("📜 Riwayat Suhu", style={'textAlign': 'center'}),
+                html.Div([
+                    html.Label("Rentang:", style={'marginRight': '10px'}),
+                    dcc.Dropdown(
+                        id='history-window',
+                        options=[{'label': label, 'value': seconds} for label, seconds in HISTORY_WINDOWS],
+                        value=HISTORY_WINDOWS[1][1],
+                        clearable=False,
+                        style={'width': '150px', 'display': 'inline-block', 'verticalAlign': 'middle'}
+                    ),
+                ], style={'textAlign': 'center', 'marginBottom': '10px'}),
+                html.Label("Geser mundur (jam):"),
+                dcc.Slider(
+                    id='history-offset',
+                    min=0, max=HISTORY_MAX_HOURS_BACK, step=0.25, value=0,
+                    marks={h: str(h) for h in range(0, HISTORY_MAX_HOURS_BACK + 1, 6)},
+                    updatemode='drag'
+                ),
+                dcc.Graph(id='history-graph'),
+                # Export seluruh rentang riwayat di atas langsung dari storage (bukan dari tabel live)
+                html.Div([
+                    dcc.Dropdown(
+                        id='history-export-format',
+                        options=[{'label': fmt.upper(), 'value': fmt} for fmt in export.available_formats()],
+                        value='csv',
+                        clearable=False,
+                        style={'width': '120px', 'display': 'inline-block', 'verticalAlign': 'middle', 'marginRight': '10px'}
+                    ),
+                    html.A("⬇️ Export Riwayat", id='history-export-link', href='', target='_blank',
+                           style={'fontWeight': 'bold'}),
+                ], style={'textAlign': 'center', 'marginTop': '10px'}),
+            ], style={'marginTop': '40px', 'width': '95%', 'margin': '40px auto 0 auto'})
+        ]),
+    
+        # Id sesi eksperimen browser ini (bertahan saat reload di tab yang sama)
+        dcc.Store(id='session-id', storage_type='session', data=uuid.uuid4().hex),
+        # Posisi terakhir data grafik yang sudah dikirim ke browser ini
+        dcc.Store(id='graph-cursor', data=None),
+        # GRAPH_WIRE = "celsius": deret °C terbaru + kerangka figure tiap satuan (sekali per halaman)
+        dcc.Store(id='graph-series', data=None),
+        dcc.Store(id='graph-meta', data=graph_meta() if GRAPH_WIRE == "celsius" else None),
+        # Push mode: Interval mati, n_intervals dinaikkan oleh assets/push.js
+        dcc.Store(id='push-url', data=app.get_relative_path(PUSH_ROUTE)),
+        dcc.Store(id='push-status', data=None),
+        dcc.Interval(id='update', interval=PUSH_POLL_INTERVAL, n_intervals=0, disabled=PUSH_MODE)
+    ])
+
+
+# ====== STYLE TOMBOL & BADGE ======
+def button_style(color):
+    return {
+        'padding': '15px 30px',
+        'fontSize': '18px',
+        'fontWeight': 'bold',
+        'backgroundColor': color,
+        'color': 'white',
+        'border': 'none',
+        'borderRadius': '10px',
+        'cursor': 'pointer',
+        'marginRight': '20px'
+    }
+
+def badge_style(color, pulse=False):
+    style = {
+        'padding': '10px 20px',
+        'fontSize': '16px',
+        'fontWeight': 'bold',
+        'backgroundColor': color,
+        'color': 'white',
+        'borderRadius': '20px',
+        'display': 'inline-block'
+    }
+    if pulse:
+        style['animation'] = 'pulse 1s infinite'
+    return style
+
+def lock_view(session):
+    """Store data, label and style of the lock button for a session."""
+    if session is not None and session.is_locked:
+        return (
+            {'is_locked': True, 'locked_temp_dingin': session.locked_dingin,
+             'locked_temp_panas': session.locked_panas, 'lock_timestamp': session.lock_timestamp},
+            '🔓 Buka Kunci Suhu',
+            button_style('#6c757d') # Grey
+        )
+    return (
+        {'is_locked': False, 'locked_temp_dingin': 0, 'locked_temp_panas': 0, 'lock_timestamp': None},
+        '🔒 Kunci Suhu Awal',
+        button_style('#17a2b8') # Info color
+    )
+
+def mixing_view(session):
+    """Store data, button and badge (label + style) for a session's mixing state."""
+    if session is not None and session.is_mixing:
+        return (
+            {'is_mixing': True, 'is_finished': False, 'final_campuran': 0},
+            '⏹️ Stop & Kunci Hasil', button_style('#dc3545'), # Merah
+            '🔥 Mode: Proses Pencampuran', badge_style('#fd7e14', pulse=True) # Orange
+        )
+    if session is not None and session.is_finished:
+        return (
+            {'is_mixing': False, 'is_finished': True, 'final_campuran': session.final_campuran},
+            '🔄 Reset / Ulangi', button_style('#007bff'), # Biru
+            '❄️ Mode: Hasil Terkunci' + (' (otomatis)' if session.auto_finished else ''),
+            badge_style('#17a2b8') # Cyan
+        )
+    return (
+        {'is_mixing': False, 'is_finished': False, 'final_campuran': 0},
+        '🔄 Mulai Pencampuran', button_style('#28a745'),
+        '📊 Mode: Pengukuran Awal', badge_style('#6c757d')
+    )
+
+def log_session_event(kit, session, event):
+    """Record a session action in the history store (marks the experiment's time span)."""
+    if sample_store is None:
+        return
+    try:
+        sample_store.log_event(time.time(), kit.kit_id, session.session_id, event)
+    except Exception as e:
+        print("[Storage] Gagal mencatat kejadian sesi:", e)
+
+def sync_mixing(kit, session):
+    """Update a mixing session's equilibrium prediction and automatic freeze."""
+    with session.lock:
+        if not session.is_mixing:
+            return
+        # Fit dan deteksi kesetimbangan hanya membaca sampel yang belum mereka proses
+        pending = [seq for seq, enabled in ((session.fit_seq, EQ_PREDICT), (session.steady_seq, AUTO_FREEZE))
+                   if enabled]
+    if not pending:
+        return
+    n_new = kit.samples.seq - min(pending)
+    if n_new <= 0:
+        return
+    samples = kit.samples.snapshot(
+        columns=dict.fromkeys(SENSOR_COLUMNS + ['campuran_slope', 'campuran_mean', 'steady'], n_new))
+    finished = False
+    with session.lock:
+        if EQ_PREDICT:
+            session.sync_prediction(samples, AUTO_FREEZE_RISE_SLOPE)
+        if AUTO_FREEZE:
+            finished = session.auto_finish(samples, AUTO_FREEZE_MIN_SAMPLES, AUTO_FREEZE_RISE_SLOPE)
+    if finished:
+        log_session_event(kit, session, 'mix_auto_finish')
+        print(f"[Analitik] [{kit.kit_id}] Kesetimbangan terdeteksi, hasil dibekukan: {session.final_campuran:.2f}°C")
+
+def get_session(session_id, kit_id):
+    """(kit, session) for the selected kit, or (None, None) if not available yet."""
+    kit = kits.get(kit_id)
+    if kit is None or not session_id:
+        return None, None
+    return kit, sessions.get(session_id, kit.kit_id)
+
+OVERVIEW = '__overview__'
+
+# ====== PUSH (SERVER-SENT EVENTS) ======
+@app.server.route(PUSH_ROUTE)
+def push_stream():
+    """SSE stream: one event per batch of new samples for ?kit=<id> (or all kits)."""
+    kit_id = request.args.get('kit')
+    key = None if kit_id in (None, '', OVERVIEW) else kit_id
+    
+    def events():
+        version = notifier.version(key)
+        yield "retry: 2000\n\n"
+        while True:
+            new_version = notifier.wait(key, version, PUSH_KEEPALIVE)
+            if new_version == version:
+                yield ": keepalive\n\n"
+                continue
+            version = new_version
+            yield f"data: {version}\n\n"
+            # Sampel yang tiba selama jeda ini dikirim sebagai satu event
+            time.sleep(PUSH_MIN_INTERVAL)
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+if PUSH_MODE:
+    # (Re)connect EventSource di browser setiap kali kit berganti
+    app.clientside_callback(
+        ClientsideFunction(namespace='blacksense', function_name='connectPush'),
+        Output('push-status', 'data'),
+        Input('kit-select', 'value'),
+        State('push-url', 'data'),
+    )
+
+# ====== METRICS ENDPOINT ======
+# Nilai yang sudah dihitung objek lain dibaca saat scrape
+writer_queue_depth.set_function(lambda: storage_writer.qsize() if storage_writer is not None else 0)
+writer_dropped.set_function(lambda: storage_writer.dropped if storage_writer is not None else 0)
+writer_spilled.set_function(lambda: storage_writer.spilled if storage_writer is not None else 0)
+buffer_occupancy.set_function(lambda: {(kit.kit_id,): len(kit.samples) / kit.samples.capacity for kit in kits})
+render_cache_hits.set_function(lambda: render_cache.hits)
+render_cache_misses.set_function(lambda: render_cache.misses)
+
+@app.server.route(METRICS_ROUTE)
+def metrics_endpoint():
+    """Prometheus text exposition of ingest, storage and callback health."""
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+# ====== CALLBACK UNTUK PILIH KIT ======
+
+@app.callback(
+    [Output('kit-select', 'options'),
+     Output('kit-select', 'value')],
+    [Input('update', 'n_intervals')],
+    [State('kit-select', 'value')]
+)
+def update_kit_options(n, selected):
+    kit_ids = kits.ids()
+    options = [{'label': f"Kit {kit_id}", 'value': kit_id} for kit_id in kit_ids]
+    if len(kit_ids) > 1:
+        options.insert(0, {'label': "📋 Semua Kit (ringkasan)", 'value': OVERVIEW})
+    if selected is None or (selected != OVERVIEW and selected not in kit_ids):
+        selected = kit_ids[0] if kit_ids else None
+    return options, selected
+
+@app.callback(
+    [Output('kit-overview', 'children'),
+     Output('kit-overview', 'style'),
+     Output('kit-detail', 'style')],
+    [Input('update', 'n_intervals'),
+     Input('kit-select', 'value')]
+)
+def update_kit_overview(n, selected):
+    if selected != OVERVIEW:
+        return [], {'display': 'none'}, {'display': 'block'}
+    
+    cards = []
+    for kit in kits:
+        samples = kit.samples.snapshot(1)
+        mode = f"👥 {sessions.count_for_kit(kit.kit_id)} sesi"
+        cards.append(html.Div([
+            html.H4(f"Kit {kit.kit_id}", style={'margin': '0 0 10px 0'}),
+            html.Div(f"Terakhir: {format_clock(samples.last('ts', 0))}", style={'color': 'gray'}),
+            html.Div(f"Dingin: {samples.last('dingin_c'):.1f}°C", style={'color': COLOR_DINGIN, 'fontWeight': 'bold'}),
+            html.Div(f"Panas: {samples.last('panas_c'):.1f}°C", style={'color': COLOR_PANAS, 'fontWeight': 'bold'}),
+            html.Div(f"Campuran: {samples.last('campuran_c'):.1f}°C", style={'color': COLOR_CAMPURAN, 'fontWeight': 'bold'}),
+            html.Div(mode, style={'marginTop': '10px'}),
+        ], style={'border': '1px solid #dee2e6', 'borderRadius': '10px', 'padding': '15px', 'textAlign': 'center'}))
+    
+    grid_style = {
+        'display': 'grid',
+        'gridTemplateColumns': 'repeat(auto-fill, minmax(200px, 1fr))',
+        'gap': '15px',
+        'width': '90%',
+        'margin': 'auto',
+        'marginBottom': '30px'
+    }
+    return cards, grid_style, {'display': 'none'}
 
 # ====== CALLBACK UNTUK LOCK SENSOR ======
 @app.callback(
     [Output('lock-state', 'data'),
      Output('btn-lock-sensors', 'children'),
      Output('btn-lock-sensors', 'style')],
-    [Input('btn-lock-sensors', 'n_clicks')],
-    [State('lock-state', 'data')]
+    [Input('btn-lock-sensors', 'n_clicks'),
+     Input('kit-select', 'value')],
+    [State('session-id', 'data')]
 )
-def toggle_lock(n_clicks, current_state):
-    if n_clicks == 0:
-        return (
-            {'is_locked': False, 'locked_temp_dingin': 0, 'locked_temp_panas': 0},
-            '🔒 Kunci Suhu Awal',
-            {
-                'padding': '15px 30px',
-                'fontSize': '18px',
-                'fontWeight': 'bold',
-                'backgroundColor': '#17a2b8',
-                'color': 'white',
-                'border': 'none',
-                'borderRadius': '10px',
-                'cursor': 'pointer',
-                'marginRight': '20px'
-            }
-        )
+@callback_seconds.time(callback='toggle_lock')
+def toggle_lock(n_clicks, kit_id, session_id):
+    kit, session = get_session(session_id, kit_id)
+    if session is None:
+        return lock_view(None)
     
-    is_locked = current_state.get('is_locked', False)
+    # Saat ganti kit, cukup tampilkan state sesi pada kit tersebut
+    if dash.ctx.triggered_id == 'btn-lock-sensors' and n_clicks:
+        samples = kit.samples.snapshot()
+        with session.lock:
+            session.toggle_lock(samples)
+            event = 'lock' if session.is_locked else 'unlock'
+        log_session_event(kit, session, event)
     
-    if not is_locked:
-        # Kunci sensor - ambil nilai terakhir dari buffer
-        last_dingin = data_dingin_c[-1] if len(data_dingin_c) > 0 else 0
-        last_panas = data_panas_c[-1] if len(data_panas_c) > 0 else 0
-        
-        # Ambil timestamp saat ini untuk referensi tabel
-        lock_ts = datetime.now().strftime("%H:%M:%S")
-        
-        # Update global state
-        lock_state_global['is_locked'] = True
-        lock_state_global['locked_dingin'] = last_dingin
-        lock_state_global['locked_panas'] = last_panas
-        
-        return (
-            {'is_locked': True, 'locked_temp_dingin': last_dingin, 'locked_temp_panas': last_panas, 'lock_timestamp': lock_ts},
-            '🔓 Buka Kunci Suhu',
-            {
-                'padding': '15px 30px',
-                'fontSize': '18px',
-                'fontWeight': 'bold',
-                'backgroundColor': '#6c757d', # Grey
-                'color': 'white',
-                'border': 'none',
-                'borderRadius': '10px',
-                'cursor': 'pointer',
-                'marginRight': '20px'
-            }
-        )
-    else:
-        # Buka kunci
-        # Update global state
-        lock_state_global['is_locked'] = False
-        lock_state_global['locked_dingin'] = 0.0
-        lock_state_global['locked_panas'] = 0.0
-        
-        return (
-            {'is_locked': False, 'locked_temp_dingin': 0, 'locked_temp_panas': 0, 'lock_timestamp': None},
-            '🔒 Kunci Suhu Awal',
-            {
-                'padding': '15px 30px',
-                'fontSize': '18px',
-                'fontWeight': 'bold',
-                'backgroundColor': '#17a2b8',
-                'color': 'white',
-                'border': 'none',
-                'borderRadius': '10px',
-                'cursor': 'pointer',
-                'marginRight': '20px'
-            }
-        )
+    return lock_view(session)
 
 # ====== CALLBACK UNTUK TOGGLE PENCAMPURAN ======
 @app.callback(
@@ -546,146 +950,218 @@ def toggle_lock(n_clicks, current_state):
      Output('btn-toggle-mixing', 'style'),
      Output('mixing-status-badge', 'children'),
      Output('mixing-status-badge', 'style')],
-    [Input('btn-toggle-mixing', 'n_clicks')],
-    [State('mixing-state', 'data')]
+    [Input('btn-toggle-mixing', 'n_clicks'),
+     Input('kit-select', 'value'),
+     Input('update', 'n_intervals')],
+    [State('session-id', 'data'),
+     State('mixing-state', 'data')]
 )
-def toggle_mixing(n_clicks, current_state):
-    if n_clicks == 0:
-        # Initial state
-        return (
-            {'is_mixing': False, 'is_finished': False, 'final_campuran': 0},
-            '🔄 Mulai Pencampuran',
-            {
-                'padding': '15px 30px',
-                'fontSize': '18px',
-                'fontWeight': 'bold',
-                'backgroundColor': '#28a745',
-                'color': 'white',
-                'border': 'none',
-                'borderRadius': '10px',
-                'cursor': 'pointer',
-                'marginRight': '20px'
-            },
-            '📊 Mode: Pengukuran Awal',
-            {
-                'padding': '10px 20px',
-                'fontSize': '16px',
-                'fontWeight': 'bold',
-                'backgroundColor': '#6c757d',
-                'color': 'white',
-                'borderRadius': '20px',
-                'display': 'inline-block'
-            }
-        )
+@callback_seconds.time(callback='toggle_mixing')
+def toggle_mixing(n_clicks, kit_id, n, session_id, current_state):
+    kit, session = get_session(session_id, kit_id)
+    if session is None:
+        return mixing_view(None)
     
-    is_mixing = current_state.get('is_mixing', False)
-    is_finished = current_state.get('is_finished', False)
+    if dash.ctx.triggered_id == 'update':
+        # Tiap sampel baru: cek kesetimbangan; tombol/badge hanya dikirim jika state berubah
+        sync_mixing(kit, session)
+        view = mixing_view(session)
+        return view if view[0] != current_state else (dash.no_update,) * len(view)
     
-    if not is_mixing and not is_finished:
-        # Tahap 1: Mulai Pencampuran
-        mixing_state_global['is_mixing'] = True
-        return (
-            {'is_mixing': True, 'is_finished': False, 'final_campuran': 0},
-            '⏹️ Stop & Kunci Hasil',
-            {
-                'padding': '15px 30px',
-                'fontSize': '18px',
-                'fontWeight': 'bold',
-                'backgroundColor': '#dc3545', # Merah
-                'color': 'white',
-                'border': 'none',
-                'borderRadius': '10px',
-                'cursor': 'pointer',
-                'marginRight': '20px'
-            },
-            '🔥 Mode: Proses Pencampuran',
-            {
-                'padding': '10px 20px',
-                'fontSize': '16px',
-                'fontWeight': 'bold',
-                'backgroundColor': '#fd7e14', # Orange
-                'color': 'white',
-                'borderRadius': '20px',
-                'display': 'inline-block',
-                'animation': 'pulse 1s infinite'
-            }
-        )
-        
-    elif is_mixing and not is_finished:
-        # Tahap 2: Selesai & Freeze Hasil
-        mixing_state_global['is_mixing'] = False # Stop hitung kalor baru
-        
-        # Ambil suhu campuran terakhir untuk di-freeze
-        last_campuran = data_campuran_c[-1] if len(data_campuran_c) > 0 else 0
-        
-        # Update global state agar on_message tahu harus freeze
-        mixing_state_global['is_finished'] = True
-        mixing_state_global['final_campuran'] = last_campuran
-        
-        return (
-            {'is_mixing': False, 'is_finished': True, 'final_campuran': last_campuran},
-            '🔄 Reset / Ulangi',
-            {
-                'padding': '15px 30px',
-                'fontSize': '18px',
-                'fontWeight': 'bold',
-                'backgroundColor': '#007bff', # Biru
-                'color': 'white',
-                'border': 'none',
-                'borderRadius': '10px',
-                'cursor': 'pointer',
-                'marginRight': '20px'
-            },
-            '❄️ Mode: Hasil Terkunci',
-            {
-                'padding': '10px 20px',
-                'fontSize': '16px',
-                'fontWeight': 'bold',
-                'backgroundColor': '#17a2b8', # Cyan
-                'color': 'white',
-                'borderRadius': '20px',
-                'display': 'inline-block'
-            }
-        )
-        
+    if dash.ctx.triggered_id == 'btn-toggle-mixing' and n_clicks:
+        # Tahap: Mulai -> Stop & Freeze Hasil -> Reset (lihat ExperimentSession.toggle_mixing)
+        samples = kit.samples.snapshot()
+        with session.lock:
+            if EQ_PREDICT:
+                session.sync_prediction(samples, AUTO_FREEZE_RISE_SLOPE)
+            session.toggle_mixing(samples)
+            event = 'mix_start' if session.is_mixing else ('mix_finish' if session.is_finished else 'reset')
+        log_session_event(kit, session, event)
+    
+    return mixing_view(session)
+
+# ====== GRAFIK SUHU (STREAMING) ======
+def observe_display_lag(kit):
+    """Record how long the newest sample took from MQTT to a figure update."""
+    if kit.last_ingest is None:
+        return
+    lag = max(0.0, time.time() - kit.last_ingest)
+    display_lag.observe(lag)
+    display_lag_last.set(lag, kit=kit.kit_id)
+
+def downsample_trace(x, y, positions=None):
+    """(x, y) reduced to PLOT_POINT_BUDGET points; `positions` = numeric x for LTTB."""
+    if len(y) <= PLOT_POINT_BUDGET:
+        return x, y
+    positions = np.arange(len(y)) if positions is None else positions
+    idx = downsample_indices(positions, y, PLOT_POINT_BUDGET, PLOT_DOWNSAMPLE)
+    return np.asarray(x)[idx], np.asarray(y)[idx]
+
+def build_temperature_figure(timestamps, series, suffix, title, y_label):
+    """Full figure for one unit: three sensor traces over the whole buffer.
+
+    `timestamps` = epoch ms waktu lokal (local_ms): sumbu x bertipe tanggal, jadi
+    urutan dan jarak antartitik benar walau melewati tengah malam.
+    """
+    fig = go.Figure()
+    for (prefix, name, color), values in zip(GRAPH_SENSORS, series):
+        x, y = downsample_trace(timestamps, values, timestamps)
+        fig.add_trace(go.Scatter(
+            x=x, y=convert(y, suffix),
+            mode='lines+markers', name=name,
+            line=dict(color=color, width=2),
+            marker=dict(size=6)
+        ))
+    fig.update_layout(
+        title=title,
+        xaxis_title="Waktu",
+        xaxis=dict(type='date', tickformat='%H:%M:%S'),
+        yaxis_title=y_label,
+        template="plotly_white",
+        uirevision=suffix,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+    return fig
+
+def build_temperature_extend(timestamps, series, suffix, max_points):
+    """extendData payload with only the new samples for one unit."""
+    update = {
+        'x': [timestamps for _ in GRAPH_SENSORS],
+        'y': [convert(values, suffix).tolist() for values in series],
+    }
+    return [update, list(range(len(GRAPH_SENSORS))), max_points]
+
+# ---- GRAPH_WIRE = "celsius": satu deret °C untuk keempat grafik ----
+def graph_meta():
+    """Empty figure per unit (layout, template, trace styles) that assets/units.js fills in."""
+    empty = np.empty(0)
+    return {
+        'suffixes': [suffix for _, suffix, _, _ in GRAPH_UNITS],
+        'figures': [build_temperature_figure(empty, (empty,) * len(GRAPH_SENSORS), suffix, title, y_label).to_plotly_json()
+                    for _, suffix, title, y_label in GRAPH_UNITS],
+        'empty_title': "Menunggu data...",
+    }
+
+def build_series_full(timestamps, series):
+    """Celsius payload for a full redraw; x is shared unless downsampling picked different points.
+
+    Array dikirim sebagai list biasa: array NumPy diserialisasi Dash sebagai
+    typed array base64 yang tidak bisa langsung diolah assets/units.js.
+    """
+    traces = [downsample_trace(timestamps, values, timestamps) for values in series]
+    payload = {'kind': 'full', 'y': [np.asarray(y).tolist() for _, y in traces]}
+    if all(len(x) == len(timestamps) for x, _ in traces):
+        payload['x'] = np.asarray(timestamps).tolist()
     else:
-        # Tahap 3: Reset ke Awal
-        mixing_state_global['is_finished'] = False
-        mixing_state_global['final_campuran'] = 0
-        
-        return (
-            {'is_mixing': False, 'is_finished': False, 'final_campuran': 0},
-            '🔄 Mulai Pencampuran',
-            {
-                'padding': '15px 30px',
-                'fontSize': '18px',
-                'fontWeight': 'bold',
-                'backgroundColor': '#28a745',
-                'color': 'white',
-                'border': 'none',
-                'borderRadius': '10px',
-                'cursor': 'pointer',
-                'marginRight': '20px'
-            },
-            '📊 Mode: Pengukuran Awal',
-            {
-                'padding': '10px 20px',
-                'fontSize': '16px',
-                'fontWeight': 'bold',
-                'backgroundColor': '#6c757d',
-                'color': 'white',
-                'borderRadius': '20px',
-                'display': 'inline-block'
-            }
-        )
+        payload['xs'] = [np.asarray(x).tolist() for x, _ in traces]
+    return payload
+
+def build_series_extend(timestamps, series, max_points):
+    """Celsius payload with only the new samples (extendData for every unit in the browser)."""
+    return {'kind': 'extend', 'x': timestamps, 'y': [values.tolist() for values in series], 'max_points': max_points}
+
+if GRAPH_WIRE == "celsius":
+    GRAPH_OUTPUTS = [Output('graph-series', 'data')]
+    app.clientside_callback(
+        ClientsideFunction(namespace='blacksense', function_name='renderSeries'),
+        [Output(graph_id, 'figure') for graph_id, _, _, _ in GRAPH_UNITS] +
+        [Output(graph_id, 'extendData') for graph_id, _, _, _ in GRAPH_UNITS],
+        Input('graph-series', 'data'),
+        State('graph-meta', 'data'),
+    )
+else:
+    GRAPH_OUTPUTS = ([Output(graph_id, 'figure') for graph_id, _, _, _ in GRAPH_UNITS] +
+                     [Output(graph_id, 'extendData') for graph_id, _, _, _ in GRAPH_UNITS])
+
+@app.callback(
+    GRAPH_OUTPUTS + [Output('graph-cursor', 'data')],
+    [Input('update', 'n_intervals'),
+     Input('kit-select', 'value')],
+    [State('graph-cursor', 'data'),
+     State('session-id', 'data')]
+)
+@callback_seconds.time(callback='stream_graphs')
+def stream_graphs(n, kit_id, cursor, session_id):
+    n_units = len(GRAPH_UNITS)
+    celsius_wire = GRAPH_WIRE == "celsius"
+    no_update = [dash.no_update] * (1 if celsius_wire else 2 * n_units)
+    kit, session = get_session(session_id, kit_id)
+    
+    if session is None or len(kit.samples) < 2:
+        if cursor is None:
+            if celsius_wire:
+                return [{'kind': 'empty'}, None]
+            empty_fig = go.Figure()
+            empty_fig.update_layout(title="Menunggu data...")
+            return [empty_fig] * n_units + [dash.no_update] * n_units + [None]
+        return no_update + [dash.no_update]
+    
+    # Versi data dibaca dulu (tanpa salinan); ring hanya disalin saat cache meleset,
+    # tepat sampai seq ini (upto) agar isi render cocok dengan kuncinya
+    ring = kit.samples
+    generation, seq = ring.generation, ring.seq
+    new_cursor = {'kit': kit.kit_id, 'seq': seq, 'generation': generation, 'extended': 0}
+    # Browser menyimpan paling banyak sebanyak budget render, seperti figure penuh
+    max_points = min(ring.capacity, PLOT_POINT_BUDGET)
+    
+    # Figure penuh: pertama kali, ganti kit, setelah reset buffer, atau klien
+    # tertinggal lebih jauh dari kapasitas buffer (mis. tab sempat tidur)
+    needs_full = (
+        not GRAPH_STREAMING
+        or cursor is None
+        or cursor.get('kit') != kit.kit_id
+        or cursor.get('generation') != generation
+        or seq - cursor.get('seq', 0) > ring.capacity
+        or cursor.get('seq', 0) > seq
+        # Figure penuh di-downsample: kirim ulang setelah cukup banyak titik mentah
+        or (len(ring) > PLOT_POINT_BUDGET
+            and cursor.get('extended', 0) + seq - cursor.get('seq', 0) > PLOT_FULL_REFRESH_POINTS)
+    )
+    # Kunci/freeze sesi hanya berlaku untuk sampel sesudah tombol ditekan,
+    # jadi titik yang sudah tergambar tidak pernah berubah -> cukup extend
+    with session.lock:
+        display_key = session.display_key()
+    
+    if needs_full:
+        def render_figures():
+            samples = ring.snapshot(columns=GRAPH_COLUMNS, upto=seq)
+            with session.lock:
+                _, dingin, panas, campuran = session.display(samples)
+            timestamps = local_ms(samples.column('ts'))
+            if celsius_wire:
+                return [build_series_full(timestamps, (dingin, panas, campuran))]
+            return [build_temperature_figure(timestamps, (dingin, panas, campuran), suffix, title, y_label)
+                    for _, suffix, title, y_label in GRAPH_UNITS] + [dash.no_update] * n_units
+        figures = render_cache.get_or_compute(
+            ('figures', GRAPH_WIRE, kit.kit_id, generation, seq, display_key), render_figures)
+        observe_display_lag(kit)
+        return figures + [new_cursor]
+    
+    n_new = seq - cursor['seq']
+    if n_new == 0:
+        return no_update + [dash.no_update]
+    
+    def render_extends():
+        # Hanya baris baru dari kolom yang digambar
+        samples = ring.snapshot(columns=dict.fromkeys(GRAPH_COLUMNS, n_new), upto=seq)
+        with session.lock:
+            _, dingin, panas, campuran = session.display(samples, n_new)
+        timestamps = local_ms(samples.column('ts', n_new)).tolist()
+        if celsius_wire:
+            return [build_series_extend(timestamps, (dingin, panas, campuran), max_points)]
+        return [dash.no_update] * n_units + [
+            build_temperature_extend(timestamps, (dingin, panas, campuran), suffix, max_points)
+            for _, suffix, _, _ in GRAPH_UNITS]
+    extends = render_cache.get_or_compute(
+        ('extend', GRAPH_WIRE, kit.kit_id, generation, seq, n_new, display_key), render_extends)
+    observe_display_lag(kit)
+    new_cursor['extended'] = cursor.get('extended', 0) + n_new
+    return extends + [new_cursor]
 
 @app.callback(
-    [Output('graph-celsius', 'figure'),
-     Output('graph-fahrenheit', 'figure'),
-     Output('graph-kelvin', 'figure'),
-     Output('graph-reamur', 'figure'),
-     Output('status', 'children'),
+    [Output('status', 'children'),
      Output('live-table', 'data'),
+     Output('live-table', 'page_count'),
      Output('kalor-diterima-output', 'children'),
      Output('kalor-dilepas-output', 'children'),
      Output('suhu-campuran-output', 'children')],
@@ -693,9 +1169,16 @@ def toggle_mixing(n_clicks, current_state):
      Input('volume-dingin-input', 'value'),
      Input('volume-panas-input', 'value'),
      Input('mixing-state', 'data'),
-     Input('lock-state', 'data')]
+     Input('lock-state', 'data'),
+     Input('kit-select', 'value'),
+     Input('live-table', 'page_current'),
+     Input('live-table', 'page_size')],
+    [State('session-id', 'data')]
 )
-def update_graph(n, vol_dingin, vol_panas, mixing_state, lock_state):
+@callback_seconds.time(callback='update_graph')
+def update_graph(n, vol_dingin, vol_panas, mixing_state, lock_state, kit_id, page_current, page_size, session_id):
+    kit, session = get_session(session_id, kit_id)
+    
     # Hitung massa dari volume
     # m = rho * V (V dalam m^3) -> V_mL / 1,000,000
     massa_dingin = 0
@@ -703,260 +1186,96 @@ def update_graph(n, vol_dingin, vol_panas, mixing_state, lock_state):
     
     if vol_dingin is not None and vol_dingin > 0:
         massa_dingin = RHO_AIR_DINGIN * (vol_dingin / 1000000)
-        mixing_state_global['massa_dingin'] = massa_dingin
         
     if vol_panas is not None and vol_panas > 0:
         massa_panas = RHO_AIR_PANAS * (vol_panas / 1000000)
-        mixing_state_global['massa_panas'] = massa_panas
         
-    if len(data_dingin_c) < 2 or massa_dingin <= 0 or massa_panas <= 0:
-        empty_fig = go.Figure()
-        empty_fig.update_layout(title="Menunggu data...")
+    if session is None or len(kit.samples) < 2 or massa_dingin <= 0 or massa_panas <= 0:
         status_msg = "Menunggu data dari ESP32 atau masukkan nilai volume yang valid (>0)..."
         kalor_msg = "0 J"
         suhu_msg = "--- °C"
-        return empty_fig, empty_fig, empty_fig, empty_fig, status_msg, [], kalor_msg, kalor_msg, suhu_msg
+        return status_msg, [], 1, kalor_msg, kalor_msg, suhu_msg
     
-    # Ambil status pencampuran
-    is_mixing = mixing_state.get('is_mixing', False) if mixing_state else False
-    is_finished = mixing_state.get('is_finished', False) if mixing_state else False
-    final_campuran_c = mixing_state.get('final_campuran', 0) if mixing_state else 0
-    
-    # Ambil status lock
-    is_locked = lock_state.get('is_locked', False) if lock_state else False
-    lock_timestamp = lock_state.get('lock_timestamp', None) if lock_state else None
+    # Versi data dibaca sebelum render; sampel yang masuk sebelum snapshot
+    # di render_detail hanya membuat hasilnya sedikit lebih baru dari kuncinya
+    generation, seq = kit.samples.generation, kit.samples.seq
+    with session.lock:
+        session.massa_dingin = massa_dingin
+        session.massa_panas = massa_panas
+    sync_mixing(kit, session)
+    with session.lock:
+        render_key = session.render_key()
+    key = ('detail', kit.kit_id, generation, seq, massa_dingin, massa_panas, render_key, page_current, page_size)
+    return render_cache.get_or_compute(
+        key, lambda: render_detail(kit, session, massa_dingin, massa_panas, page_current, page_size))
+
+def render_detail(kit, session, massa_dingin, massa_panas, page_current, page_size):
+    """Status text, visible table page and heat/temperature cards for one kit and session."""
+    # Hanya halaman tabel yang terlihat yang dikirim (data terbaru di atas)
+    page_size = page_size or TABLE_PAGE_SIZE
+    page_count = max(1, -(-len(kit.samples) // page_size))
+    page_current = min(page_current or 0, page_count - 1)
+    start = page_current * page_size
+    # Kalor dihitung ulang hanya untuk baris yang terlihat: semua kolom cukup disalin sampai halaman ini
+    samples = kit.samples.snapshot(columns={**dict.fromkeys(GRAPH_COLUMNS, start + page_size),
+                                            **dict.fromkeys(STAT_COLUMNS, 1)})
+    with session.lock:
+        # Ambil status pencampuran & lock milik sesi ini
+        is_mixing = session.is_mixing
+        is_finished = session.is_finished
+        auto_finished = session.auto_finished
+        final_campuran_c = session.final_campuran
+        is_locked = session.is_locked
+        prediction = session.prediction(EQ_PREDICT_MIN_SAMPLES) if EQ_PREDICT else None
+        
+        # Sampel terakhir dengan kunci suhu awal / freeze hasil sesi ini sudah diterapkan
+        _, data_dingin_c, data_panas_c, plot_campuran_c = session.display(samples, 1)
     
     T_dingin = data_dingin_c[-1]
     T_panas = data_panas_c[-1]
     
     # LOGIKA UTAMA UNTUK POIN 5:
     # Jika is_finished (Selesai & Kunci), gunakan nilai final_campuran yang disimpan
-    # Namun, untuk grafik, kita gunakan data_campuran_c yang sudah dimodifikasi di on_message
-    # (on_message akan append nilai final jika is_finished=True, sehingga history tetap ada)
     if is_finished:
         T_campuran = final_campuran_c
-        # Gunakan data dari buffer yang sudah di-handle oleh on_message
-        plot_campuran_c = list(data_campuran_c)
-        plot_campuran_f = list(data_campuran_f)
-        plot_campuran_k = list(data_campuran_k)
-        plot_campuran_r = list(data_campuran_r)
     else:
         # Jika belum selesai, gunakan data real-time
-        T_campuran = data_campuran_c[-1]
-        plot_campuran_c = list(data_campuran_c)
-        plot_campuran_f = list(data_campuran_f)
-        plot_campuran_k = list(data_campuran_k)
-        plot_campuran_r = list(data_campuran_r)
+        T_campuran = plot_campuran_c[-1]
     
     # Perhitungan Kalor Asas Black - HANYA jika dalam mode pencampuran
     if is_mixing or is_finished:
         # Q lepas (air panas) = m_panas * c * (T_awal_panas - T_campuran)
         # Q terima (air dingin) = m_dingin * c * (T_campuran - T_awal_dingin)
-        # Jika locked, T_awal diambil dari nilai locked (yang sudah di-append ke buffer)
-        # Karena kita sudah memodifikasi on_message untuk append nilai locked jika is_locked=True,
+        # Jika locked, session.display() sudah mengganti T_awal dengan nilai locked,
         # maka T_dingin dan T_panas (data_dingin_c[-1]) sudah pasti nilai locked tersebut.
-        # Jadi rumus ini tetap valid tanpa perubahan.
-        Q_lepas = massa_panas * C_AIR * (T_panas - T_campuran)
-        Q_terima = massa_dingin * C_AIR * (T_campuran - T_dingin)
-        kalor_lepas_str = f"{abs(Q_lepas):.2f} J"
-        kalor_terima_str = f"{abs(Q_terima):.2f} J"
+        Q_lepas, Q_terima = asas_black(T_dingin, T_panas, T_campuran, massa_dingin, massa_panas, C_AIR)
+        kalor_lepas_str = f"{Q_lepas:.2f} J"
+        kalor_terima_str = f"{Q_terima:.2f} J"
     else:
         # Sebelum pencampuran - tampilkan 0
         kalor_lepas_str = "0 J"
         kalor_terima_str = "0 J"
     
     suhu_campuran_str = f"{T_campuran:.2f} °C"
-
-    # ====== GRAFIK CELSIUS (Multi-line) ======
-    fig_c = go.Figure()
-    fig_c.add_trace(go.Scatter(
-        x=list(timestamps), y=list(data_dingin_c), 
-        mode='lines+markers', name='Air Dingin',
-        line=dict(color=COLOR_DINGIN, width=2),
-        marker=dict(size=6)
-    ))
-    fig_c.add_trace(go.Scatter(
-        x=list(timestamps), y=list(data_panas_c), 
-        mode='lines+markers', name='Air Panas',
-        line=dict(color=COLOR_PANAS, width=2),
-        marker=dict(size=6)
-    ))
-    fig_c.add_trace(go.Scatter(
-        x=list(timestamps), y=plot_campuran_c, 
-        mode='lines+markers', name='Air Campuran',
-        line=dict(color=COLOR_CAMPURAN, width=2),
-        marker=dict(size=6)
-    ))
-    fig_c.update_layout(
-        title="Suhu Celsius (°C)",
-        xaxis_title="Waktu",
-        yaxis_title="°C",
-        template="plotly_white",
-        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-    )
-    
-    # ====== GRAFIK FAHRENHEIT (Multi-line) ======
-    fig_f = go.Figure()
-    fig_f.add_trace(go.Scatter(
-        x=list(timestamps), y=list(data_dingin_f), 
-        mode='lines+markers', name='Air Dingin',
-        line=dict(color=COLOR_DINGIN, width=2),
-        marker=dict(size=6)
-    ))
-    fig_f.add_trace(go.Scatter(
-        x=list(timestamps), y=list(data_panas_f), 
-        mode='lines+markers', name='Air Panas',
-        line=dict(color=COLOR_PANAS, width=2),
-        marker=dict(size=6)
-    ))
-    fig_f.add_trace(go.Scatter(
-        x=list(timestamps), y=plot_campuran_f, 
-        mode='lines+markers', name='Air Campuran',
-        line=dict(color=COLOR_CAMPURAN, width=2),
-        marker=dict(size=6)
-    ))
-    fig_f.update_layout(
-        title="Suhu Fahrenheit (°F)",
-        xaxis_title="Waktu",
-        yaxis_title="°F",
-        template="plotly_white",
-        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-    )
-    
-    # ====== GRAFIK KELVIN (Multi-line) ======
-    fig_k = go.Figure()
-    fig_k.add_trace(go.Scatter(
-        x=list(timestamps), y=list(data_dingin_k), 
-        mode='lines+markers', name='Air Dingin',
-        line=dict(color=COLOR_DINGIN, width=2),
-        marker=dict(size=6)
-    ))
-    fig_k.add_trace(go.Scatter(
-        x=list(timestamps), y=list(data_panas_k), 
-        mode='lines+markers', name='Air Panas',
-        line=dict(color=COLOR_PANAS, width=2),
-        marker=dict(size=6)
-    ))
-    fig_k.add_trace(go.Scatter(
-        x=list(timestamps), y=plot_campuran_k, 
-        mode='lines+markers', name='Air Campuran',
-        line=dict(color=COLOR_CAMPURAN, width=2),
-        marker=dict(size=6)
-    ))
-    fig_k.update_layout(
-        title="Suhu Kelvin (K)",
-        xaxis_title="Waktu",
-        yaxis_title="K",
-        template="plotly_white",
-        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-    )
-    
-    # ====== GRAFIK REAMUR (Multi-line) ======
-    fig_r = go.Figure()
-    fig_r.add_trace(go.Scatter(
-        x=list(timestamps), y=list(data_dingin_r), 
-        mode='lines+markers', name='Air Dingin',
-        line=dict(color=COLOR_DINGIN, width=2),
-        marker=dict(size=6)
-    ))
-    fig_r.add_trace(go.Scatter(
-        x=list(timestamps), y=list(data_panas_r), 
-        mode='lines+markers', name='Air Panas',
-        line=dict(color=COLOR_PANAS, width=2),
-        marker=dict(size=6)
-    ))
-    fig_r.add_trace(go.Scatter(
-        x=list(timestamps), y=plot_campuran_r, 
-        mode='lines+markers', name='Air Campuran',
-        line=dict(color=COLOR_CAMPURAN, width=2),
-        marker=dict(size=6)
-    ))
-    fig_r.update_layout(
-        title="Suhu Reamur (°R)",
-        xaxis_title="Waktu",
-        yaxis_title="°R",
-        template="plotly_white",
-        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-    )
     
-    # --- Gunakan riwayat kalor dari buffer yang sudah tersimpan ---
-    # Nilai kalor disimpan permanen saat data diterima, tidak dihitung ulang
-    kalor_lepas_history = list(kalor_lepas_buffer)
-    kalor_terima_history = list(kalor_terima_buffer)
-    
-    # Pastikan panjang buffer kalor sama dengan data lainnya
-    # (untuk handle kasus jika ada data lama sebelum buffer kalor ditambahkan)
-    while len(kalor_lepas_history) < len(data_dingin_c):
-        kalor_lepas_history.insert(0, 0.0)
-        kalor_terima_history.insert(0, 0.0)
-
-    # Siapkan data untuk tabel, data terbaru di atas
-    # Gunakan plot_campuran_* agar nilai yang ditampilkan di tabel juga ikut "beku" saat finish
-    table_data = []
-    
-    # Pastikan semua list memiliki panjang yang sama sebelum zip
-    min_len = min(len(timestamps), len(data_dingin_c), len(plot_campuran_c), len(kalor_lepas_history))
-    
-    data_list = list(zip(
-        list(timestamps)[-min_len:], 
-        list(data_dingin_c)[-min_len:], list(data_dingin_f)[-min_len:], list(data_dingin_k)[-min_len:], list(data_dingin_r)[-min_len:],
-        list(data_panas_c)[-min_len:], list(data_panas_f)[-min_len:], list(data_panas_k)[-min_len:], list(data_panas_r)[-min_len:],
-        plot_campuran_c[-min_len:], plot_campuran_f[-min_len:], plot_campuran_k[-min_len:], plot_campuran_r[-min_len:],
-        kalor_lepas_history[-min_len:], kalor_terima_history[-min_len:]
-    ))
-    
-    for row in reversed(data_list):
-        ts, dc, df, dk, dr, pc, pf, pk, pr, cc, cf, ck, cr, ql, qt = row
-        
-        # Jika locked, tampilkan "-" untuk kolom Air Dingin dan Panas
-        # HANYA jika timestamp row >= lock_timestamp (data setelah dikunci)
-        should_mask = False
-        if is_locked and lock_timestamp:
-            # Bandingkan string waktu "HH:MM:SS"
-            # Asumsi dalam satu hari yang sama
-            if ts >= lock_timestamp:
-                should_mask = True
-        
-        if should_mask:
-            dc_str = "-"
-            df_str = "-"
-            dk_str = "-"
-            dr_str = "-"
-            pc_str = "-"
-            pf_str = "-"
-            pk_str = "-"
-            pr_str = "-"
-        else:
-            dc_str = f"{dc:.2f}"
-            df_str = f"{df:.2f}"
-            dk_str = f"{dk:.2f}"
-            dr_str = f"{dr:.2f}"
-            pc_str = f"{pc:.2f}"
-            pf_str = f"{pf:.2f}"
-            pk_str = f"{pk:.2f}"
-            pr_str = f"{pr:.2f}"
-            
-        table_data.append({
-            'waktu': ts,
-            'dingin_c': dc_str,
-            'dingin_f': df_str,
-            'dingin_k': dk_str,
-            'dingin_r': dr_str,
-            'panas_c': pc_str,
-            'panas_f': pf_str,
-            'panas_k': pk_str,
-            'panas_r': pr_str,
-            'campuran_c': f"{cc:.2f}",
-            'campuran_f': f"{cf:.2f}",
-            'campuran_k': f"{ck:.2f}",
-            'campuran_r': f"{cr:.2f}",
-            'kalor_lepas': f"{ql:.2f}",
-            'kalor_terima': f"{qt:.2f}"
-        })
+    # Prediksi dari fit hukum Newton ditampilkan di bawah nilai terukur; fit awal
+    # atau yang menyimpang (selang lebar) tidak ditunjukkan angkanya ke siswa
+    if prediction is not None and prediction.half_width > EQ_PREDICT_SHOW_CI:
+        kalor_lepas_str = with_prediction(kalor_lepas_str, "belum konvergen")
+        kalor_terima_str = with_prediction(kalor_terima_str, "belum konvergen")
+        suhu_campuran_str = with_prediction(suhu_campuran_str, "belum konvergen")
+    elif prediction is not None:
+        T_eq, ci = prediction.t_eq, prediction.half_width
+        Q_lepas_eq, Q_terima_eq = asas_black(T_dingin, T_panas, T_eq, massa_dingin, massa_panas, C_AIR)
+        kalor_lepas_str = with_prediction(kalor_lepas_str, f"{Q_lepas_eq:.2f} ± {massa_panas * C_AIR * ci:.2f} J")
+        kalor_terima_str = with_prediction(kalor_terima_str, f"{Q_terima_eq:.2f} ± {massa_dingin * C_AIR * ci:.2f} J")
+        suhu_campuran_str = with_prediction(suhu_campuran_str, f"{T_eq:.2f} ± {ci:.2f} °C")
+
+    table_data = table_rows(samples, session, start, start + page_size)
     
     # Status text dengan indikator mode
     if is_finished:
-        mode_indicator = "🏁 SELESAI (HASIL DIKUNCI)"
+        mode_indicator = "🏁 SELESAI (KESETIMBANGAN OTOMATIS)" if auto_finished else "🏁 SELESAI (HASIL DIKUNCI)"
     elif is_mixing:
         mode_indicator = "⚗️ PENCAMPURAN BERLANGSUNG"
     else:
@@ -964,16 +1283,165 @@ def update_graph(n, vol_dingin, vol_panas, mixing_state, lock_state):
         
     lock_indicator = "🔒 SENSOR AWAL TERKUNCI" if is_locked else "🔓 SENSOR AWAL LIVE"
     
-    status_text = f"📡 {MQTT_TOPIC} | {mode_indicator} | {lock_indicator} | Terakhir: {timestamps[-1]} | Dingin: {T_dingin:.1f}°C | Panas: {T_panas:.1f}°C | Campuran: {T_campuran:.1f}°C"
-    return fig_c, fig_f, fig_k, fig_r, status_text, table_data, kalor_terima_str, kalor_lepas_str, suhu_campuran_str
+    topic = MQTT_TOPIC_LEGACY if kit.kit_id == DEFAULT_KIT else MQTT_TOPIC_KITS.replace('+', kit.kit_id)
+    # Statistik streaming dari ingest: tidak dihitung ulang di sini
+    trend = f"📈 Campuran: {samples.last('campuran_slope') * 60:+.2f} °C/menit, σ {samples.last('campuran_std'):.2f} °C"
+    if samples.last('steady', False):
+        trend += " ⚖️ SETIMBANG"
+    if is_mixing and prediction is not None and prediction.half_width <= EQ_PREDICT_READY_CI:
+        trend += f" 🎯 Prediksi stabil ({prediction.t_eq:.2f} ± {prediction.half_width:.2f} °C), run boleh dihentikan"
+    status_text = f"📡 {topic} | {mode_indicator} | {lock_indicator} | Terakhir: {format_clock(samples.last('ts', 0))} | Dingin: {T_dingin:.1f}°C | Panas: {T_panas:.1f}°C | Campuran: {T_campuran:.1f}°C | {trend}"
+    return status_text, table_data, page_count, kalor_terima_str, kalor_lepas_str, suhu_campuran_str
+
+def with_prediction(measured, predicted):
+    """Card content: the measured value with the predicted one in small text below it."""
+    return [measured, html.Div(f"Prediksi: {predicted}", style={'fontSize': '14px', 'fontWeight': 'normal', 'color': '#555'})]
+
+def table_rows(samples, session, start, stop):
+    """Table rows start..stop (0 = newest) of a ring snapshot with this session's lock, freeze and Q applied.
+
+    Sel suhu dan jam hanya diformat untuk baris yang tampil (hasilnya di-cache
+    render_cache per halaman); kolom snapshot cukup berisi `stop` sampel terbaru.
+    """
+    n = len(samples)
+    first_seq = samples.seq - n
+    timestamps = samples.column('ts')
+    sensors = [samples.column(col) for col in SENSOR_COLUMNS]
+    rows = []
+    with session.lock:
+        # Q seluruh halaman dihitung ulang sekaligus dengan massa saat ini
+        _, q_lepas, q_terima = session.heat(samples, min(stop, n))
+        for r in range(max(start, 0), min(stop, n)):
+            i = n - 1 - r
+            seq = first_seq + i
+            row = {'waktu': format_clock(timestamps[-1 - r].item())}
+            dingin, panas, campuran, masked = session.overrides(seq)
+            dingin, panas, campuran = (live[-1 - r].item() if value is None else value
+                                       for live, value in zip(sensors, (dingin, panas, campuran)))
+            if masked:
+                # Kunci aktif: tampilkan "-" untuk kolom Air Dingin dan Panas
+                row.update(dict.fromkeys(TABLE_TEMP_COLUMNS[:8], "-"))
+            else:
+                row.update(zip(TABLE_TEMP_COLUMNS[0:4], format_celsius(dingin)))
+                row.update(zip(TABLE_TEMP_COLUMNS[4:8], format_celsius(panas)))
+            row.update(zip(TABLE_TEMP_COLUMNS[8:12], format_celsius(campuran)))
+            row['kalor_lepas'] = f"{q_lepas[-1 - r]:.2f}"
+            row['kalor_terima'] = f"{q_terima[-1 - r]:.2f}"
+            rows.append(row)
+    return rows
+
+# ====== RIWAYAT ======
+@app.server.route(HISTORY_ROUTE)
+def history_api():
+    """JSON range query: ?kit=&start=&end=&resolution=&session= (epoch seconds)."""
+    args = request.args
+    kit_id = args.get('kit', DEFAULT_KIT)
+    try:
+        start, end, resolution = (float(args[k]) if args.get(k) else None for k in ('start', 'end', 'resolution'))
+    except ValueError:
+        return jsonify(error="start/end/resolution harus angka (epoch detik)"), 400
+    return jsonify(query_history(kit_id, start, end, resolution, args.get('session')))
+
+@app.server.route(EXPORT_ROUTE)
+def export_history():
+    """Stream stored history as CSV/xlsx/Parquet for a kit, time range or session."""
+    if sample_store is None:
+        return jsonify(error="storage tidak tersedia"), 503
+    args = request.args
+    fmt = args.get('format', 'csv')
+    if fmt not in export.available_formats():
+        return jsonify(error=f"format harus salah satu dari {export.available_formats()}"), 400
+    kit_id = args.get('kit') or None
+    try:
+        start, end, window, offset = (float(args[k]) if args.get(k) else None
+                                      for k in ('start', 'end', 'window', 'offset'))
+    except ValueError:
+        return jsonify(error="start/end/window/offset harus angka (detik)"), 400
+    if window is not None:
+        # Rentang relatif dihitung saat unduhan dimulai: [now - offset - window, now - offset)
+        end = time.time() - (offset or 0)
+        start = end - window
+    if args.get('session') and kit_id:
+        span = sample_store.session_span(args['session'], kit_id)
+        if span is not None:
+            start, end = span[0], span[1] + 1
+    
+    chunks = sample_store.iter_range(kit_id, start, end, chunk_size=EXPORT_CHUNK_SIZE)
+    mimetype, ext = export.FORMATS[fmt]
+    filename = f"riwayat_{kit_id or 'semua'}_{datetime.now().strftime('%Y%m%d-%H%M%S')}.{ext}"
+    if fmt == 'csv':
+        # CSV dialirkan per chunk langsung ke browser
+        return Response(stream_with_context(export.iter_csv(chunks, EXCEL_HEADERS, expand_storage_row)),
+                        mimetype=mimetype,
+                        headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+    # xlsx/Parquet butuh file utuh: ditulis streaming ke file sementara, dihapus setelah terkirim
+    tmp = tempfile.TemporaryFile()
+    try:
+        writer = export.write_xlsx if fmt == 'xlsx' else export.write_parquet
+        writer(tmp, chunks, EXCEL_HEADERS, expand_storage_row)
+        tmp.seek(0)
+    except Exception as e:
+        tmp.close()
+        print(f"[Export] Gagal export {fmt}:", e)
+        return jsonify(error=str(e)), 500
+    return send_file(tmp, mimetype=mimetype, as_attachment=True, download_name=filename)
+
+@app.callback(
+    Output('history-export-link', 'href'),
+    [Input('kit-select', 'value'),
+     Input('history-window', 'value'),
+     Input('history-offset', 'value'),
+     Input('history-export-format', 'value')]
+)
+def update_export_link(kit_id, window, offset_hours, fmt):
+    if kit_id in (None, OVERVIEW):
+        return dash.no_update
+    query = f"format={fmt}&kit={kit_id}&window={window}&offset={(offset_hours or 0) * 3600:g}"
+    return app.get_relative_path(EXPORT_ROUTE) + "?" + query
+
+@app.callback(
+    Output('history-graph', 'figure'),
+    [Input('kit-select', 'value'),
+     Input('history-window', 'value'),
+     Input('history-offset', 'value')]
+)
+def update_history(kit_id, window, offset_hours):
+    if kit_id in (None, OVERVIEW):
+        return dash.no_update
+    end = time.time() - (offset_hours or 0) * 3600
+    history = query_history(kit_id, end - window, end, max_points=HISTORY_FETCH_POINTS)
+    ts = np.asarray(history['ts'], dtype=float)
+    x = [datetime.fromtimestamp(t) for t in ts]
+    fig = go.Figure()
+    n_points = 0
+    for (prefix, name, color), column in zip(GRAPH_SENSORS, HISTORY_COLUMNS):
+        # LTTB per trace: payload tetap kecil, puncak (mis. saat pencampuran) tetap terlihat
+        trace_x, trace_y = downsample_trace(x, np.asarray(history[column], dtype=float), ts)
+        n_points = max(n_points, len(trace_y))
+        fig.add_trace(go.Scattergl(x=trace_x, y=trace_y, mode='lines', name=name, line=dict(color=color)))
+    bucket = f"rata-rata per {history['resolution']:g} s" if history['resolution'] else "data mentah"
+    fig.update_layout(
+        title=f"Riwayat kit {kit_id} ({n_points} dari {len(x)} titik, {bucket})",
+        xaxis_title="Waktu", yaxis_title="°C",
+        template="plotly_white", height=400,
+        xaxis=dict(range=[datetime.fromtimestamp(end - window), datetime.fromtimestamp(end)])
+    )
+    return fig
 
 @app.callback(
     Output("download-excel", "data"),
     Input("btn-export-excel", "n_clicks"),
-    State("live-table", "data"),
+    State("kit-select", "value"),
+    State("session-id", "data"),
     prevent_initial_call=True,
 )
-def export_table_to_excel(n_clicks, table_data):
+def export_table_to_excel(n_clicks, kit_id, session_id):
+    # Tabel di browser hanya berisi satu halaman; export memakai seluruh buffer
+    kit, session = get_session(session_id, kit_id)
+    if session is None:
+        return
+    samples = kit.samples.snapshot()
+    table_data = table_rows(samples, session, 0, len(samples))
     if not table_data:
         return
     
@@ -988,6 +1456,10 @@ def export_table_to_excel(n_clicks, table_data):
     ]
     return dcc.send_data_frame(df.to_excel, "data_tabel.xlsx", sheet_name="DataSuhu", index=False)
 
+# Layout dipasang terakhir: Dash langsung memanggil serve_layout, yang memakai
+# fungsi yang didefinisikan setelahnya (mis. graph_meta)
+app.layout = serve_layout
+
 if __name__ == "__main__":
     print("Menjalankan dashboard di http://127.0.0.1:8050")
     app.run(debug=True)
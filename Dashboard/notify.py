@@ -0,0 +1,63 @@
+import threading
+import time
+
+# ====== NOTIFIKASI DATA BARU ======
+class Notifier:
+    """Version counters per kit that ingest bumps and push streams wait on.
+
+    Pembaca hanya bangun jika versinya berubah, jadi klien yang idle
+    (tanpa data baru) tidak memakan CPU sama sekali.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._versions = {}
+        self._total = 0
+
+    def notify(self, kit_id):
+        with self._cond:
+            self._versions[kit_id] = self._versions.get(kit_id, 0) + 1
+            self._total += 1
+            self._cond.notify_all()
+
+    def version(self, kit_id=None):
+        """Current version of one kit, or of all kits when kit_id is None."""
+        if kit_id is None:
+            return self._total
+        return self._versions.get(kit_id, 0)
+
+    def wait(self, kit_id, since, timeout=None):
+        """Block until the version differs from `since` (or timeout); return it."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.version(kit_id) != since, timeout)
+            return self.version(kit_id)
+
+
+class SeqNotifier:
+    """Notifier for web workers that read kits from another process.
+
+    Ingest berjalan di proses lain sehingga notify() tidak pernah dipanggil
+    di sini; versi = seq ring buffer kit di shared memory, diperiksa setiap
+    `poll_interval` detik selama wait().
+    """
+
+    def __init__(self, registry, poll_interval=0.1):
+        self.registry = registry
+        self.poll_interval = poll_interval
+
+    def notify(self, kit_id):
+        pass
+
+    def version(self, kit_id=None):
+        if kit_id is None:
+            return sum(kit.samples.seq for kit in self.registry)
+        kit = self.registry.get(kit_id)
+        return kit.samples.seq if kit is not None else 0
+
+    def wait(self, kit_id, since, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            version = self.version(kit_id)
+            if version != since or (deadline is not None and time.monotonic() >= deadline):
+                return version
+            time.sleep(self.poll_interval)
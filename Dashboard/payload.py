@@ -0,0 +1,55 @@
+import json
+import math
+import struct
+
+# ====== FORMAT PAYLOAD MQTT ======
+# 1) JSON (firmware lama): {"dingin": {"C": .., "F": ..}, "panas": {..}, "campuran": {..}}
+# 2) Biner ringkas v1: 1 byte versi + 3 float32 little-endian (°C dingin, panas, campuran)
+#    Byte pertama JSON selalu '{' (0x7B), jadi tidak bisa tertukar dengan byte versi.
+BINARY_VERSION = 1
+BINARY_V1 = struct.Struct('<B3f')
+SENSORS = ("dingin", "panas", "campuran")
+# Rentang ukur DS18B20. Di luar rentang = pembacaan gagal, mis. -127 °C
+# (DEVICE_DISCONNECTED_C) saat sensor lepas; ditolak seperti NaN/inf.
+SENSOR_MIN_C = -55.0
+SENSOR_MAX_C = 125.0
+
+
+class PayloadError(ValueError):
+    """Raised when a payload cannot be decoded into three sensor readings."""
+
+
+def decode_payload(raw):
+    """Decode a raw MQTT payload into (dingin_c, panas_c, campuran_c)."""
+    if len(raw) == BINARY_V1.size and raw[0] == BINARY_VERSION:
+        _, dingin_c, panas_c, campuran_c = BINARY_V1.unpack(raw)
+    else:
+        try:
+            data = json.loads(raw)
+            dingin_c, panas_c, campuran_c = (
+                float(data["dingin"]["C"]), float(data["panas"]["C"]), float(data["campuran"]["C"]))
+        except (KeyError, TypeError, ValueError) as e:
+            raise PayloadError(f"payload tidak lengkap atau rusak: {e!r}") from e
+    return _check_range(dingin_c, panas_c, campuran_c)
+
+
+def _check_range(*values):
+    # Satu NaN merusak jumlah berjalan analitik dan tersimpan NULL di SQLite
+    for name, c in zip(SENSORS, values):
+        if not math.isfinite(c):
+            raise PayloadError(f"nilai suhu {name} tidak valid (NaN/inf)")
+        if not SENSOR_MIN_C <= c <= SENSOR_MAX_C:
+            raise PayloadError(f"suhu {name} {c:.2f} °C di luar rentang sensor")
+    return values
+
+
+def encode_binary(dingin_c, panas_c, campuran_c):
+    """Pack three °C readings into the compact v1 binary payload."""
+    return BINARY_V1.pack(BINARY_VERSION, dingin_c, panas_c, campuran_c)
+
+
+def encode_json(dingin_c, panas_c, campuran_c):
+    """Build the JSON payload exactly as sketch_nov2a.ino publishes it."""
+    def sensor(c):
+        return {"C": round(c, 2), "F": round(c * 9 / 5 + 32, 2), "K": round(c + 273.15, 2), "R": round(c * 4 / 5, 2)}
+    return json.dumps({name: sensor(c) for name, c in zip(SENSORS, (dingin_c, panas_c, campuran_c))}).encode()
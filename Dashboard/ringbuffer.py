@@ -0,0 +1,187 @@
+import numpy as np
+
+# Header int64 di awal buffer: [cursor, versi seqlock, generation]
+_COUNT, _VERSION, _GENERATION = range(3)
+_HEADER_BYTES = 64
+_ALIGN = 64
+
+
+def _column_offsets(capacity, columns):
+    """Byte offset of each column in a shared buffer, and the total size."""
+    offsets = {}
+    offset = _HEADER_BYTES
+    for name, dtype in columns.items():
+        dtype = np.dtype(dtype)
+        if dtype.hasobject:
+            raise ValueError(f"Kolom '{name}' bertipe objek tidak bisa diletakkan di shared memory")
+        offsets[name] = offset
+        offset += -(-2 * capacity * dtype.itemsize // _ALIGN) * _ALIGN
+    return offsets, offset
+
+
+# ====== COLUMNAR RING BUFFER ======
+class SampleRing:
+    """Preallocated columnar ring buffer backed by NumPy arrays.
+
+    Setiap kolom dialokasikan 2x kapasitas dan setiap sampel ditulis di
+    slot i dan i + capacity (mirror). Dengan begitu jendela data terurut
+    selalu bersebelahan di memori, sehingga column() bisa mengembalikan
+    view tanpa salinan, berapa pun kapasitasnya.
+
+    Satu penulis (thread MQTT), banyak pembaca tanpa lock: pembaca di
+    thread lain memakai snapshot(), yang menyalin semua kolom dari satu
+    nilai cursor dan membuang sampel yang tertimpa selama penyalinan
+    (pola seqlock). column()/last() langsung hanya aman di thread penulis
+    atau di bawah lock milik pemanggil.
+
+    Dengan `buffer` (mis. multiprocessing.shared_memory), header dan kolom
+    dipetakan ke buffer tersebut, sehingga proses lain yang memetakan
+    buffer yang sama bisa membaca tanpa salinan (lihat kits.SharedKitRegistry).
+    """
+
+    def __init__(self, capacity, columns, buffer=None):
+        self.capacity = int(capacity)
+        if buffer is None:
+            self._state = np.zeros(3, dtype=np.int64)
+            self._cols = {name: np.zeros(2 * self.capacity, dtype=dtype) for name, dtype in columns.items()}
+        else:
+            offsets, _ = _column_offsets(self.capacity, columns)
+            self._state = np.ndarray(3, dtype=np.int64, buffer=buffer)
+            self._cols = {name: np.ndarray(2 * self.capacity, dtype=dtype, buffer=buffer, offset=offsets[name])
+                          for name, dtype in columns.items()}
+
+    @staticmethod
+    def nbytes(capacity, columns):
+        """Size of the shared buffer needed for a ring with these columns."""
+        return _column_offsets(int(capacity), columns)[1]
+
+    @property
+    def columns(self):
+        return tuple(self._cols)
+
+    @property
+    def seq(self):
+        """Total number of samples ever appended (monotonic)."""
+        return int(self._state[_COUNT])
+
+    @property
+    def generation(self):
+        """Bumped by every clear(), so clients know to reset."""
+        return int(self._state[_GENERATION])
+
+    def __len__(self):
+        return min(self.seq, self.capacity)
+
+    def append(self, **values):
+        """Write one complete sample; every column must be given."""
+        state = self._state
+        count = int(state[_COUNT])
+        i = count % self.capacity
+        j = i + self.capacity
+        state[_VERSION] += 1  # Ganjil: penulisan sedang berlangsung
+        for name, arr in self._cols.items():
+            v = values[name]
+            arr[i] = v
+            arr[j] = v
+        # Cursor dinaikkan terakhir, setelah semua kolom tertulis
+        state[_COUNT] = count + 1
+        state[_VERSION] += 1
+
+    def column(self, name, n=None):
+        """Ordered, zero-copy view of the last `n` samples (default: all)."""
+        count = self.seq
+        size = min(count, self.capacity)
+        n = size if n is None else min(n, size)
+        start = (count - n) % self.capacity
+        return self._cols[name][start:start + n]
+
+    def last(self, name, default=0.0):
+        count = self.seq
+        if count == 0:
+            return default
+        value = self._cols[name][(count - 1) % self.capacity]
+        return value.item() if value.ndim == 0 else value.tolist()
+
+    def snapshot(self, n=None, columns=None, upto=None):
+        """Consistent copy of the last `n` samples (default: all), safe from any thread.
+
+        Semua kolom berasal dari satu nilai cursor. Sampel tertua yang
+        tertimpa penulis selama penyalinan dibuang dari depan, jadi
+        snapshot bisa sedikit lebih pendek dari `n` tetapi tidak pernah
+        berisi sampel setengah tertulis.
+
+        `columns` bisa berupa dict {kolom: k}: kolom dengan k bukan None
+        hanya disalin k sampel terbaru (mis. kolom suhu untuk satu halaman tabel).
+
+        `upto`: salin jendela yang berakhir di seq tersebut, walaupun penulis
+        sudah lebih jauh; hasilnya cocok dengan seq yang dibaca lebih dulu
+        (mis. kunci cache render yang diperiksa sebelum menyalin).
+        """
+        if columns is None:
+            columns = dict.fromkeys(self.columns)
+        elif not isinstance(columns, dict):
+            columns = dict.fromkeys(columns)
+        while True:
+            generation = self.generation
+            count = self.seq if upto is None else min(self.seq, upto)
+            size = min(count, self.capacity)
+            n_copy = size if n is None else min(n, size)
+            rows = {name: n_copy if k is None else min(k, n_copy) for name, k in columns.items()}
+            data = {}
+            for name, k in rows.items():
+                start = (count - k) % self.capacity
+                data[name] = self._cols[name][start:start + k].copy()
+            # Baca versi sebelum cursor: append yang sedang berjalan ikut dihitung
+            writing = int(self._state[_VERSION]) & 1
+            last_written = self.seq - 1 + writing
+            if self.generation != generation:
+                continue  # clear() di tengah penyalinan; ulangi
+            # Seq s menimpa slot milik seq s - capacity
+            overwritten = last_written - self.capacity + 1
+            for name, k in rows.items():
+                torn = max(0, overwritten - (count - k))
+                if torn:
+                    data[name] = data[name][torn:]
+            length = max(0, n_copy - max(0, overwritten - (count - n_copy)))
+            return RingSnapshot(self.capacity, generation, count, data, length)
+
+    def clear(self):
+        state = self._state
+        state[_VERSION] += 1
+        state[_COUNT] = 0
+        state[_GENERATION] += 1
+        state[_VERSION] += 1
+
+
+class RingSnapshot:
+    """Immutable copy of a SampleRing window with the same read API.
+
+    Bisa diberikan ke kode yang membaca SampleRing (seq, len, column,
+    last), mis. ExperimentSession.display() dan heat().
+    """
+
+    def __init__(self, capacity, generation, seq, data, length):
+        self.capacity = capacity
+        self.generation = generation
+        self.seq = seq
+        self._cols = data
+        self._len = length
+
+    @property
+    def columns(self):
+        return tuple(self._cols)
+
+    def __len__(self):
+        return self._len
+
+    def column(self, name, n=None):
+        """Last `n` samples of a column; columns copied with k rows hold at most k."""
+        arr = self._cols[name]
+        n = len(arr) if n is None else min(n, len(arr))
+        return arr[len(arr) - n:]
+
+    def last(self, name, default=0.0):
+        if self._len == 0:
+            return default
+        value = self._cols[name][-1]
+        return value.item() if value.ndim == 0 else value.tolist()
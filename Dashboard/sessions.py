@@ -0,0 +1,296 @@
+import threading
+import time
+
+import numpy as np
+
+from equilibrium import NewtonFit
+from heat import heat_series
+from timeindex import index_slice
+
+
+# ====== SESI EKSPERIMEN ======
+class ExperimentSession:
+    """Lock, mixing and finish state of one browser session on one kit.
+
+    Data sensor di ring buffer kit selalu mentah. Kunci suhu awal dan
+    pembekuan hasil disimpan sebagai rentang nomor urut sampel (seq) dan
+    diterapkan saat render, sehingga beberapa browser bisa menjalankan
+    eksperimen paralel pada kit yang sama tanpa saling mengganggu.
+    Kalor per sampel dihitung ulang dari rentang ini dengan massa saat ini (heat.py).
+    """
+
+    def __init__(self, session_id, kit_id, c_air):
+        self.session_id = session_id
+        self.kit_id = kit_id
+        self.c_air = c_air
+        self.lock = threading.Lock()
+        self.last_seen = time.monotonic()
+        # Kunci suhu awal
+        self.is_locked = False
+        self.locked_dingin = 0.0
+        self.locked_panas = 0.0
+        self.lock_timestamp = None  # Epoch ms sampel terakhir saat dikunci
+        # Pencampuran
+        self.is_mixing = False
+        self.is_finished = False
+        self.auto_finished = False  # True jika hasil dibekukan otomatis (kesetimbangan terdeteksi)
+        self.final_campuran = 0.0
+        self.massa_dingin = 1.0
+        self.massa_panas = 1.0
+        # Rentang seq [start, end) ; end None = masih berlangsung
+        self.lock_ranges = []    # [start, end, dingin, panas]
+        self.mix_ranges = []     # [start, end]
+        self.freeze_ranges = []  # [start, end, campuran, dingin, panas] (suhu saat dihentikan)
+        # Prediksi suhu keseimbangan dari awal kenaikan sensor campuran
+        self.fit = NewtonFit()
+        self.fit_seq = None       # seq kit berikutnya yang belum di-fit
+        self.fit_onset = False    # True setelah sensor campuran mulai bergerak
+        # Deteksi kesetimbangan inkremental (auto_finish): hanya sampel baru yang diperiksa
+        self.steady_seq = None    # seq kit berikutnya yang belum diperiksa
+        self.rise_seq = None      # seq pertama sensor campuran bergerak sejak mulai
+
+    # ---- Aksi dari tombol ----
+    # `samples` = SampleRing atau RingSnapshot; callback memberi snapshot
+    # agar nilai yang dikunci dan seq berasal dari sampel yang sama
+    def toggle_lock(self, samples):
+        seq = samples.seq
+        if not self.is_locked:
+            # Kunci sensor - ambil nilai terakhir dari buffer
+            self.locked_dingin = samples.last('dingin_c', 0)
+            self.locked_panas = samples.last('panas_c', 0)
+            self.lock_timestamp = samples.last('ts', None)
+            self.lock_ranges.append([seq, None, self.locked_dingin, self.locked_panas])
+            self.is_locked = True
+        else:
+            # Buka kunci; titik yang sudah terkunci tetap lurus di grafik
+            self.lock_ranges[-1][1] = seq
+            self.is_locked = False
+            self.locked_dingin = 0.0
+            self.locked_panas = 0.0
+            self.lock_timestamp = None
+
+    def toggle_mixing(self, samples):
+        seq = samples.seq
+        if not self.is_mixing and not self.is_finished:
+            # Tahap 1: Mulai Pencampuran
+            self.mix_ranges.append([seq, None])
+            self.is_mixing = True
+            self.fit.reset()
+            self.fit_seq = seq
+            self.fit_onset = False
+            self.steady_seq = seq
+            self.rise_seq = None
+        elif self.is_mixing:
+            # Tahap 2: Selesai & Freeze Hasil
+            self.finish(samples, samples.last('campuran_c', 0))
+        else:
+            # Tahap 3: Reset ke Awal
+            self.freeze_ranges[-1][1] = seq
+            self.is_finished = False
+            self.final_campuran = 0.0
+
+    def finish(self, samples, campuran):
+        """End mixing at the newest sample and freeze the mixed temperature at `campuran`."""
+        seq = samples.seq
+        # Suhu awal (dengan kunci) saat dihentikan: dasar Q selama hasil beku
+        _, dingin, panas, _ = self.display(samples, 1)
+        start_temps = (dingin[-1].item(), panas[-1].item()) if len(dingin) else (0.0, 0.0)
+        self.final_campuran = campuran
+        self.mix_ranges[-1][1] = seq
+        self.freeze_ranges.append([seq, None, campuran, *start_temps])
+        self.is_mixing = False
+        self.is_finished = True
+        self.auto_finished = False
+
+    def auto_finish(self, samples, min_samples, rise_slope):
+        """Freeze the result once the kit reports steady state after the mixing transient.
+
+        Butuh kolom 'steady', 'campuran_slope' dan 'campuran_mean' dari
+        analytics.KitAnalytics. Kesetimbangan hanya dihitung setelah sensor
+        campuran sempat bergerak (|slope| >= rise_slope) sejak tombol mulai
+        ditekan, agar sensor yang belum dituangi air tidak langsung dibekukan.
+        Nilai beku = rata-rata bergulir terakhir. Return True jika sesi selesai.
+        Setiap sampel diperiksa sekali (steady_seq), jadi `samples` cukup
+        berisi sampel sejak pemeriksaan terakhir.
+        """
+        if not self.is_mixing:
+            return False
+        if min(samples.seq - self.mix_ranges[-1][0], len(samples)) < min_samples:
+            return False
+        start = max(self.steady_seq, samples.seq - len(samples))
+        n = samples.seq - start
+        if n <= 0:
+            return False
+        self.steady_seq = samples.seq
+        if self.rise_seq is None:
+            moved = np.flatnonzero(np.abs(samples.column('campuran_slope', n)) >= rise_slope)
+            if not len(moved):
+                return False
+            self.rise_seq = start + moved[0].item()
+        if not samples.column('steady', samples.seq - max(start, self.rise_seq)).any():
+            return False
+        # Rentang hanya berlaku untuk sampel berikutnya: titik yang sudah tergambar tetap
+        self.finish(samples, samples.last('campuran_mean', 0))
+        self.auto_finished = True
+        return True
+
+    def sync_prediction(self, samples, rise_slope):
+        """Feed the mixed temperature since mixing began into the equilibrium fit.
+
+        Sampel sebelum sensor campuran bergerak (|campuran_slope| < rise_slope,
+        air belum dituang) tidak ikut di-fit karena belum mengikuti kurva
+        eksponensial. Setelah hasil dibekukan, fit berhenti di titik itu.
+        """
+        if not self.is_mixing or self.fit_seq is None:
+            return
+        oldest = samples.seq - len(samples)
+        if self.fit_seq < oldest:
+            # Sampel hilang dari buffer sebelum di-fit: kurva tidak lagi kontinu
+            self.fit.reset()
+            self.fit_seq = oldest
+            self.fit_onset = False
+        n_new = samples.seq - self.fit_seq
+        if n_new <= 0:
+            return
+        campuran = samples.column('campuran_c', n_new)
+        if not self.fit_onset:
+            moved = np.flatnonzero(np.abs(samples.column('campuran_slope', n_new)) >= rise_slope)
+            if len(moved):
+                self.fit_onset = True
+                campuran = campuran[moved[0]:]
+        if self.fit_onset:
+            self.fit.push_many(campuran)
+        self.fit_seq = samples.seq
+
+    def prediction(self, min_samples):
+        """equilibrium.Prediction while mixing or finished, else None."""
+        if not (self.is_mixing or self.is_finished):
+            return None
+        return self.fit.estimate(min_samples)
+
+    # ---- Tampilan data untuk sesi ini ----
+    def display(self, samples, n=None):
+        """Sensor series of the last `n` samples with this session's lock/freeze applied.
+
+        Returns (seqs, dingin_c, panas_c, campuran_c). Tanpa rentang aktif,
+        array yang dikembalikan adalah view ring buffer (tanpa salinan).
+        Batas rentang dicari dengan binary search pada seqs yang terurut,
+        lalu diterapkan sebagai slice.
+        """
+        dingin = samples.column('dingin_c', n)
+        panas = samples.column('panas_c', n)
+        campuran = samples.column('campuran_c', n)
+        first = samples.seq - len(dingin)
+        seqs = np.arange(first, samples.seq)
+        self._prune(samples.seq - len(samples))
+        locked = [(index_slice(seqs, start, end), val_dingin, val_panas)
+                  for start, end, val_dingin, val_panas in self.lock_ranges]
+        locked = [r for r in locked if r[0].start < r[0].stop]
+        if locked:
+            dingin, panas = dingin.copy(), panas.copy()
+            for span, val_dingin, val_panas in locked:
+                dingin[span] = val_dingin
+                panas[span] = val_panas
+        frozen = [(index_slice(seqs, start, end), val_campuran)
+                  for start, end, val_campuran, _, _ in self.freeze_ranges]
+        frozen = [r for r in frozen if r[0].start < r[0].stop]
+        if frozen:
+            campuran = campuran.copy()
+            for span, val_campuran in frozen:
+                campuran[span] = val_campuran
+        return seqs, dingin, panas, campuran
+
+    def render_key(self):
+        """Hashable summary of everything that changes how this session renders.
+
+        Sesi tanpa pencampuran berbagi render yang sama untuk kit yang sama;
+        riwayat kalor milik sesi sendiri, jadi sesi yang pernah mencampur
+        menyertakan id-nya.
+        """
+        heat_owner = self.session_id if (self.mix_ranges or self.freeze_ranges) else None
+        return (
+            self.is_locked, self.is_mixing, self.is_finished, self.auto_finished, self.final_campuran,
+            self.display_key(), heat_owner,
+        )
+
+    def display_key(self):
+        """Hashable summary of the ranges applied by display()."""
+        return tuple(map(tuple, self.lock_ranges)), tuple(map(tuple, self.freeze_ranges))
+
+    def overrides(self, seq):
+        """(dingin, panas, campuran, masked) for one sample; None = raw value.
+
+        `masked` True berarti sampel ada di kunci yang sedang aktif
+        (tabel menampilkan "-" untuk Air Dingin dan Panas).
+        """
+        dingin = panas = campuran = None
+        for start, end, val_dingin, val_panas in self.lock_ranges:
+            if seq >= start and (end is None or seq < end):
+                dingin, panas = val_dingin, val_panas
+        for start, end, val_campuran, _, _ in self.freeze_ranges:
+            if seq >= start and (end is None or seq < end):
+                campuran = val_campuran
+        masked = self.is_locked and seq >= self.lock_ranges[-1][0]
+        return dingin, panas, campuran, masked
+
+    def heat(self, samples, n=None):
+        """(seqs, q_lepas, q_terima) for the last `n` samples at the session's current masses."""
+        seqs, dingin, panas, campuran = self.display(samples, n)
+        q_lepas, q_terima = heat_series(seqs, dingin, panas, campuran, self.mix_ranges, self.freeze_ranges,
+                                        self.massa_dingin, self.massa_panas, self.c_air)
+        return seqs, q_lepas, q_terima
+
+    def _prune(self, first_seq):
+        """Drop ranges that ended before the oldest sample still buffered."""
+        keep = lambda r: r[1] is None or r[1] > first_seq
+        self.lock_ranges = [r for r in self.lock_ranges if keep(r)]
+        self.mix_ranges = [r for r in self.mix_ranges if keep(r)]
+        self.freeze_ranges = [r for r in self.freeze_ranges if keep(r)]
+
+
+
+# ====== REGISTRY SESI ======
+class SessionManager:
+    """Sessions keyed by (session id, kit id), each with its own lock.
+
+    Lookup tidak memakai lock global; lock registry hanya dipakai saat
+    membuat sesi baru atau membuang sesi yang lama tidak aktif.
+    """
+
+    def __init__(self, c_air, max_sessions=500, idle_timeout=6 * 3600):
+        self.c_air = c_air
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id, kit_id):
+        key = (session_id, kit_id)
+        session = self._sessions.get(key)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(key)
+                if session is None:
+                    self._evict()
+                    session = ExperimentSession(session_id, kit_id, self.c_air)
+                    sessions = dict(self._sessions)
+                    sessions[key] = session
+                    self._sessions = sessions
+        session.last_seen = time.monotonic()
+        return session
+
+    def count_for_kit(self, kit_id):
+        return sum(1 for (_, k) in self._sessions if k == kit_id)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _evict(self):
+        now = time.monotonic()
+        alive = {k: s for k, s in self._sessions.items() if now - s.last_seen < self.idle_timeout}
+        if len(alive) >= self.max_sessions:
+            # Buang sesi yang paling lama tidak dilihat
+            oldest = sorted(alive.items(), key=lambda kv: kv[1].last_seen)
+            alive = dict(oldest[len(alive) - self.max_sessions + 1:])
+        if len(alive) != len(self._sessions):
+            self._sessions = alive
@@ -0,0 +1,285 @@
+"""Simulator kit EduKit: generator beban MQTT dan replay riwayat.
+
+Menghasilkan payload 3 sensor dengan skema yang sama seperti sketch_nov2a.ino
+(JSON C/F/K/R atau biner v1), lalu mengirimnya ke:
+  - inproc : main.on_message langsung (tanpa broker, EDUKIT_MQTT=0), atau
+  - broker : broker MQTT (mis. mosquitto lokal) lewat paho.
+
+Contoh (jalankan dari folder Dashboard):
+  python simulator.py generate --kits 20 --rate 2 --duration 60
+  python simulator.py generate --kits 50 --count 100000 --max --quiet
+  python simulator.py generate --target broker --broker localhost --kits 5
+  python simulator.py replay data_suhu.xlsx --max
+  python simulator.py replay data_suhu.db --speed 1 --target broker --broker localhost
+"""
+import argparse
+import contextlib
+import math
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from payload import encode_binary, encode_json
+
+LEGACY_KIT = "default"  # Sama dengan kits.DEFAULT_KIT: dikirim ke topic lama "edukit/suhu"
+DS18B20_STEP = 0.0625   # Resolusi 12-bit DS18B20 (°C)
+
+
+def topic_for(kit_id):
+    return "edukit/suhu" if kit_id == LEGACY_KIT else f"edukit/{kit_id}/suhu"
+
+
+# ====== MODEL SUHU ======
+class KitModel:
+    """One simulated Asas Black run per cycle: cold/hot baths, then mixing.
+
+    Air dingin dan panas perlahan menuju suhu ruang; sensor campuran
+    membaca suhu ruang sampai titik pencampuran, lalu naik eksponensial ke
+    suhu keseimbangan (m1*T1 + m2*T2) / (m1 + m2). Setelah `cycle` detik
+    run baru dimulai dengan suhu awal acak.
+    """
+
+    def __init__(self, rng, cycle=180.0):
+        self.rng = rng
+        self.cycle = cycle
+        self._new_run()
+
+    def _new_run(self):
+        rng = self.rng
+        self.t = 0.0
+        self.ambient = rng.uniform(26.0, 30.0)
+        self.dingin0 = rng.uniform(12.0, 24.0)
+        self.panas0 = rng.uniform(60.0, 85.0)
+        massa_dingin = rng.choice((100, 150, 200, 250)) * 1.0
+        massa_panas = rng.choice((100, 150, 200, 250)) * 0.48
+        self.t_eq = (massa_dingin * self.dingin0 + massa_panas * self.panas0) / (massa_dingin + massa_panas)
+        self.mix_at = self.cycle * rng.uniform(0.3, 0.5)
+
+    def _sensor(self, value):
+        value += self.rng.gauss(0.0, 0.05)
+        return round(value / DS18B20_STEP) * DS18B20_STEP
+
+    def step(self, dt):
+        """Advance `dt` seconds and return (dingin_c, panas_c, campuran_c)."""
+        self.t += dt
+        if self.t >= self.cycle:
+            self._new_run()
+        t, ambient = self.t, self.ambient
+        dingin = ambient + (self.dingin0 - ambient) * math.exp(-t / 1800.0)
+        panas = ambient + (self.panas0 - ambient) * math.exp(-t / 900.0)
+        if t < self.mix_at:
+            campuran = ambient
+        else:
+            campuran = self.t_eq + (ambient - self.t_eq) * math.exp(-(t - self.mix_at) / 6.0)
+        return self._sensor(dingin), self._sensor(panas), self._sensor(campuran)
+
+
+# ====== SUMBER PESAN ======
+# Setiap sumber menghasilkan (detik sejak awal, topic, payload)
+
+def generate(kits, rate, duration=None, count=None, binary=False, seed=None, legacy=False):
+    """Synthetic messages for `kits` kits at `rate` messages/s per kit."""
+    rng = random.Random(seed)
+    kit_ids = [LEGACY_KIT] if legacy else [f"kit{i + 1:02d}" for i in range(kits)]
+    models = {kit_id: KitModel(rng) for kit_id in kit_ids}
+    encode = encode_binary if binary else encode_json
+    dt = 1.0 / rate
+    sent = 0
+    tick = 0
+    while True:
+        t = tick * dt
+        if duration is not None and t >= duration:
+            return
+        for kit_id in kit_ids:
+            if count is not None and sent >= count:
+                return
+            yield t, topic_for(kit_id), encode(*models[kit_id].step(dt))
+            sent += 1
+        tick += 1
+
+
+def _parse_waktu(value):
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return datetime.strptime(str(value), "%Y-%m-%d %H:%M:%S").timestamp()
+
+
+def replay_xlsx(path, binary=False):
+    """Rows of an Excel log (old C/F/K/R layout or current one) as messages."""
+    from openpyxl import load_workbook
+    encode = encode_binary if binary else encode_json
+    wb = load_workbook(path, read_only=True)
+    rows = wb.active.iter_rows(values_only=True)
+    header = [str(h).lower() if h is not None else "" for h in next(rows, ())]
+    idx = {c: header.index(c) for c in ("waktu", "kit", "dingin_c", "panas_c", "campuran_c") if c in header}
+    t0 = None
+    try:
+        for r in rows:
+            if not r or r[0] is None:
+                continue
+            ts = _parse_waktu(r[idx["waktu"]])
+            t0 = ts if t0 is None else t0
+            kit_id = r[idx["kit"]] if "kit" in idx else LEGACY_KIT
+            values = (float(r[idx[c]]) for c in ("dingin_c", "panas_c", "campuran_c"))
+            yield ts - t0, topic_for(kit_id), encode(*values)
+    finally:
+        wb.close()
+
+
+def replay_db(path, binary=False, chunk_size=1000):
+    """Rows of the SQLite log (samples table) as messages, in insertion order."""
+    encode = encode_binary if binary else encode_json
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    columns = {r[1] for r in conn.execute("PRAGMA table_info(samples)")}
+    # ts NULL (impor Excel lama sebelum backfill) diturunkan dari waktu, sama seperti
+    # storage._backfill_ts; baris yang tetap tanpa waktu dilewati
+    waktu_ts = "CAST(strftime('%s', waktu, 'utc') AS REAL)"
+    ts_expr = f"COALESCE(ts, {waktu_ts})" if "ts" in columns else waktu_ts
+    kit_expr = "kit" if "kit" in columns else f"'{LEGACY_KIT}'"
+    cur = conn.execute(
+        f"SELECT {ts_expr}, {kit_expr}, dingin_c, panas_c, campuran_c FROM samples ORDER BY id"
+    )
+    t0 = None
+    try:
+        while True:
+            chunk = cur.fetchmany(chunk_size)
+            if not chunk:
+                return
+            for ts, kit_id, dingin_c, panas_c, campuran_c in chunk:
+                if ts is None:
+                    continue
+                t0 = ts if t0 is None else t0
+                yield ts - t0, topic_for(kit_id), encode(dingin_c, panas_c, campuran_c)
+    finally:
+        conn.close()
+
+
+# ====== TUJUAN PESAN ======
+class FakeMessage:
+    """Minimal stand-in for paho's MQTTMessage (topic + payload)."""
+
+    def __init__(self, topic, payload):
+        self.topic = topic
+        self.payload = payload
+
+
+class InProcessSink:
+    """Feeds messages straight into main.on_message (no broker, no network).
+
+    main diimpor dengan EDUKIT_MQTT=0 di `workdir`, sehingga log SQLite dan
+    file Excel simulasi tidak bercampur dengan data asli.
+    """
+
+    def __init__(self, workdir=None):
+        self.workdir = workdir or tempfile.mkdtemp(prefix="edukit-sim-")
+        os.environ["EDUKIT_MQTT"] = "0"
+        os.chdir(self.workdir)
+        import main
+        self.main = main
+        print(f"[Sim] In-process, data di {self.workdir}")
+
+    def send(self, topic, payload):
+        self.main.on_message(None, None, FakeMessage(topic, payload))
+
+    def close(self):
+        main = self.main
+        writer = main.storage_writer
+        if writer is not None:
+            print(f"[Sim] Antrean writer: {writer.qsize()} baris, drop={writer.dropped}, spill={writer.spilled}")
+            writer.close()
+        print(f"[Sim] Kit terdaftar: {len(main.kits)}")
+
+
+class BrokerSink:
+    """Publishes messages to an MQTT broker via paho (e.g. a local mosquitto)."""
+
+    def __init__(self, host, port=1883):
+        import paho.mqtt.client as mqtt
+        self.client = mqtt.Client()
+        self.client.connect(host, port, 60)
+        self.client.loop_start()
+        print(f"[Sim] Publish ke broker {host}:{port}")
+
+    def send(self, topic, payload):
+        self.client.publish(topic, payload, qos=0)
+
+    def close(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+
+# ====== RUNNER ======
+def run(messages, sink, speed=1.0):
+    """Send messages on their own clock scaled by `speed` (0 = as fast as possible)."""
+    start = time.perf_counter()
+    sent = 0
+    for t, topic, payload in messages:
+        if speed > 0:
+            delay = start + t / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        sink.send(topic, payload)
+        sent += 1
+    elapsed = time.perf_counter() - start
+    return sent, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    gen = sub.add_parser("generate", help="payload sintetis untuk N kit")
+    gen.add_argument("--kits", type=int, default=1)
+    gen.add_argument("--rate", type=float, default=0.5, help="pesan/detik per kit (firmware: 0.5, satu pesan per 2 s)")
+    gen.add_argument("--duration", type=float, help="detik simulasi")
+    gen.add_argument("--count", type=int, help="jumlah pesan total")
+    gen.add_argument("--legacy", action="store_true", help="satu kit di topic lama edukit/suhu")
+    gen.add_argument("--seed", type=int)
+
+    rep = sub.add_parser("replay", help="putar ulang data_suhu.xlsx atau log SQLite")
+    rep.add_argument("source", help="file .xlsx atau .db")
+
+    for p in (gen, rep):
+        p.add_argument("--binary", action="store_true", help="payload biner v1 (default: JSON firmware)")
+        p.add_argument("--target", choices=("inproc", "broker"), default="inproc")
+        p.add_argument("--broker", default="localhost")
+        p.add_argument("--port", type=int, default=1883)
+        p.add_argument("--workdir", help="folder data untuk --target inproc (default: folder sementara)")
+        p.add_argument("--speed", type=float, default=1.0, help="1 = waktu nyata, 10 = 10x lebih cepat")
+        p.add_argument("--max", action="store_true", help="secepat mungkin (sama dengan --speed 0)")
+        p.add_argument("--quiet", action="store_true", help="sembunyikan log per pesan dari main")
+    args = parser.parse_args(argv)
+
+    if args.mode == "generate":
+        if args.duration is None and args.count is None:
+            parser.error("generate butuh --duration atau --count")
+        messages = generate(args.kits, args.rate, args.duration, args.count,
+                            binary=args.binary, seed=args.seed, legacy=args.legacy)
+    elif args.source.endswith(".db"):
+        messages = replay_db(os.path.abspath(args.source), binary=args.binary)
+    else:
+        messages = replay_xlsx(os.path.abspath(args.source), binary=args.binary)
+
+    sink = InProcessSink(args.workdir) if args.target == "inproc" else BrokerSink(args.broker, args.port)
+    speed = 0 if args.max else args.speed
+    quiet = open(os.devnull, "w") if args.quiet else None
+    try:
+        with contextlib.redirect_stdout(quiet) if quiet else contextlib.nullcontext():
+            sent, elapsed = run(messages, sink, speed)
+    except KeyboardInterrupt:
+        sent, elapsed = 0, 0.0
+        print("[Sim] Dihentikan")
+    finally:
+        if quiet:
+            quiet.close()
+        sink.close()
+    if elapsed > 0:
+        print(f"[Sim] {sent:,} pesan dalam {elapsed:.2f} s ({sent / elapsed:,.0f} pesan/s)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,424 @@
+import contextlib
+import os
+import sqlite3
+import threading
+import time
+
+# Optional dependency for Excel writing
+try:
+    from openpyxl import Workbook, load_workbook
+except ImportError:
+    Workbook = None
+    load_workbook = None
+
+
+# ====== APPEND-ONLY STORAGE (SQLite WAL) ======
+class SampleStore:
+    """Append-only log of sensor rows in a SQLite table (WAL mode).
+
+    Setiap baris cukup satu INSERT, sehingga biaya per sampel tetap O(1)
+    berapa pun ukuran riwayatnya. File .xlsx hanya dibuat saat diminta
+    lewat export_xlsx(). Kolom 'ts' (epoch detik) diindeks per kit untuk
+    query rentang waktu lewat query_range().
+
+    `tiers` mengatur retensi bertingkat: [(detik bucket, retensi detik), ...]
+    dengan bucket 0 = data mentah. Setiap tier > 0 adalah tabel rollup
+    (n, sum, min, max per kolom) yang diperbarui secara inkremental di
+    transaksi yang sama dengan insert, dan setiap tier dipangkas sendiri.
+    Retensi None = simpan selamanya.
+
+    `read_only` untuk pembaca di proses lain (worker web): tanpa DDL, migrasi
+    maupun rollup, karena skema disiapkan proses penulis; query memakai
+    koneksi mode=ro dan log_event() satu INSERT lewat koneksi singkat.
+    """
+
+    TABLE = "samples"
+    EVENTS_TABLE = "events"
+    TEXT_COLUMNS = ("waktu", "kit")
+    TS_COLUMN = "ts"
+    BUSY_TIMEOUT = 5.0  # detik menunggu lock tulis proses lain (log_event read_only)
+
+    def __init__(self, path, headers, tiers=None, prune_interval=60, read_only=False):
+        self.path = path
+        self.headers = list(headers)
+        self.columns = [h.lower() for h in self.headers]
+        self.value_columns = [c for c in self.columns if c not in self.TEXT_COLUMNS and c != self.TS_COLUMN]
+        tiers = sorted(tiers or [(0, None)])
+        self.raw_retention = dict(tiers).get(0)
+        self.rollups = [(seconds, retention) for seconds, retention in tiers if seconds > 0]
+        self.prune_interval = prune_interval
+        self._last_prune = 0.0
+        self._rolled_id = 0
+        self._lock = threading.Lock()
+        self._ts_index = self.columns.index(self.TS_COLUMN) if self.TS_COLUMN in self.columns else None
+        self.read_only = read_only
+        if read_only:
+            self._conn = None
+            return
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._retire_old_schema()
+        cols = ", ".join(
+            f"{c} TEXT" if c in self.TEXT_COLUMNS else f"{c} REAL" for c in self.columns
+        )
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.TABLE} (id INTEGER PRIMARY KEY, {cols})"
+        )
+        if "kit" in self.columns:
+            # Partisi per kit: baca riwayat satu kit tanpa memindai kit lain
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{self.TABLE}_kit ON {self.TABLE} (kit, id)"
+            )
+        if self.TS_COLUMN in self.columns:
+            self._backfill_ts()
+            index_cols = "kit, ts" if "kit" in self.columns else "ts"
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{self.TABLE}_ts ON {self.TABLE} ({index_cols})"
+            )
+        self._create_rollups()
+        # Kejadian sesi (kunci, pencampuran, ...) untuk menandai rentang eksperimen
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.EVENTS_TABLE} "
+            "(id INTEGER PRIMARY KEY, ts REAL, kit TEXT, session TEXT, event TEXT)"
+        )
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{self.EVENTS_TABLE}_session "
+            f"ON {self.EVENTS_TABLE} (session, kit, ts)"
+        )
+        self._conn.commit()
+        self._insert_sql = (
+            f"INSERT INTO {self.TABLE} ({', '.join(self.columns)}) "
+            f"VALUES ({', '.join('?' for _ in self.columns)})"
+        )
+
+    def _retire_old_schema(self):
+        """Add new columns in place, or rename the table aside if it is incompatible."""
+        existing = [r[1] for r in self._conn.execute(f"PRAGMA table_info({self.TABLE})")]
+        if not existing or existing[1:] == self.columns:
+            return
+        missing = [c for c in self.columns if c not in existing]
+        if set(existing[1:]) <= set(self.columns) and set(missing) <= {self.TS_COLUMN}:
+            # Log lama tanpa kolom ts: tambahkan, lalu isi dari kolom waktu
+            for c in missing:
+                self._conn.execute(f"ALTER TABLE {self.TABLE} ADD COLUMN {c} REAL")
+            self._conn.commit()
+            print(f"[Storage] Kolom {', '.join(missing)} ditambahkan ke tabel {self.TABLE}")
+            return
+        n = 1
+        tables = {r[0] for r in self._conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        while f"{self.TABLE}_legacy_{n}" in tables:
+            n += 1
+        self._conn.execute(f"ALTER TABLE {self.TABLE} RENAME TO {self.TABLE}_legacy_{n}")
+        self._conn.commit()
+        print(f"[Storage] Skema lama disimpan sebagai tabel {self.TABLE}_legacy_{n}")
+
+    def _backfill_ts(self):
+        """Fill missing epoch timestamps from the local 'YYYY-MM-DD HH:MM:SS' text."""
+        if "waktu" not in self.columns:
+            return
+        with self._lock:
+            filled = self._fill_ts()
+            self._conn.commit()
+        if filled > 0:
+            print(f"[Storage] {filled} baris diberi timestamp epoch")
+
+    def _fill_ts(self, after_id=0):
+        """Set ts from 'waktu' where it is NULL, for rows with id > after_id (caller holds the lock)."""
+        return self._conn.execute(
+            f"UPDATE {self.TABLE} SET ts = CAST(strftime('%s', waktu, 'utc') AS REAL) "
+            f"WHERE id > ? AND ts IS NULL",
+            (after_id,),
+        ).rowcount
+
+    def append(self, row):
+        """Append one row (same order as headers)."""
+        with self._lock:
+            self._conn.execute(self._insert_sql, row)
+            self._conn.commit()
+
+    def append_many(self, rows):
+        """Append a batch of rows (and their rollups) in a single transaction."""
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(self._insert_sql, rows)
+            if self._ts_index is not None and "waktu" in self.columns and any(r[self._ts_index] is None for r in rows):
+                # Baris tanpa ts (mis. impor Excel lama) diisi dulu, sebelum rollup dan retensi
+                self._fill_ts(self._rolled_id)
+            self._roll_up_new()
+            self._conn.commit()
+        self.prune()
+
+    # ---- Rollup & retensi ----
+    def _rollup_table(self, seconds):
+        return f"{self.TABLE}_{seconds}s"
+
+    def _create_rollups(self):
+        """Create missing rollup tables and fill them from the raw rows already stored."""
+        if not self.rollups or self.TS_COLUMN not in self.columns:
+            self.rollups = []
+            return
+        tables = {r[0] for r in self._conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        stats = ", ".join(f"{c}_sum REAL, {c}_min REAL, {c}_max REAL" for c in self.value_columns)
+        rebuild = False
+        for seconds, _ in self.rollups:
+            table = self._rollup_table(seconds)
+            if table in tables:
+                continue
+            rebuild = True
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} (kit TEXT, t REAL, n INTEGER, {stats}, PRIMARY KEY (kit, t))"
+            )
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_t ON {table} (t)")
+        if rebuild:
+            self._rebuild_rollups()
+        else:
+            self._rolled_id = self._last_rollable_id(0)
+
+    def _last_rollable_id(self, after_id, upto_id=None):
+        """Id of the newest row with a timestamp in (after_id, upto_id], or after_id if none."""
+        # Dipindai mundur dari id terbesar; berhenti di baris pertama yang punya ts
+        row = self._conn.execute(
+            f"SELECT id FROM {self.TABLE} WHERE id > ? AND id <= ? AND ts IS NOT NULL "
+            f"ORDER BY id DESC LIMIT 1",
+            (after_id, upto_id if upto_id is not None else 2 ** 63 - 1),
+        ).fetchone()
+        return row[0] if row else after_id
+
+    def _rebuild_rollups(self):
+        """Recompute every rollup tier from the raw rows (after import/backfill)."""
+        for seconds, _ in self.rollups:
+            self._conn.execute(f"DELETE FROM {self._rollup_table(seconds)}")
+        self._rolled_id = 0
+        self._roll_up_new()
+        self._conn.commit()
+
+    def _roll_up_new(self):
+        """Merge raw rows with id > the last rolled id into every tier (caller holds the lock)."""
+        if not self.rollups:
+            return
+        # Watermark hanya maju sampai baris terakhir yang benar-benar teragregasi;
+        # baris tanpa ts tidak masuk rollup dan tidak pernah dipangkas (lihat prune)
+        last_id = self._last_rollable_id(self._rolled_id)
+        if last_id <= self._rolled_id:
+            return
+        cols = self.value_columns
+        stat_names = ", ".join(f"{c}_sum, {c}_min, {c}_max" for c in cols)
+        stat_select = ", ".join(f"SUM({c}), MIN({c}), MAX({c})" for c in cols)
+        stat_merge = ", ".join(
+            f"{c}_sum = {c}_sum + excluded.{c}_sum, "
+            f"{c}_min = MIN({c}_min, excluded.{c}_min), "
+            f"{c}_max = MAX({c}_max, excluded.{c}_max)"
+            for c in cols
+        )
+        for seconds, _ in self.rollups:
+            self._conn.execute(
+                f"INSERT INTO {self._rollup_table(seconds)} (kit, t, n, {stat_names}) "
+                f"SELECT kit, CAST(ts / {seconds} AS INTEGER) * {seconds} AS bucket, COUNT(*), {stat_select} "
+                f"FROM {self.TABLE} WHERE id > ? AND id <= ? AND ts IS NOT NULL GROUP BY kit, bucket "
+                f"ON CONFLICT (kit, t) DO UPDATE SET n = n + excluded.n, {stat_merge}",
+                (self._rolled_id, last_id),
+            )
+        self._rolled_id = last_id
+
+    def prune(self, now=None, force=False):
+        """Evict rows older than each tier's retention (at most once per prune_interval)."""
+        now = time.time() if now is None else now
+        if not force and now - self._last_prune < self.prune_interval:
+            return
+        self._last_prune = now
+        deleted = 0
+        with self._lock:
+            if self.raw_retention is not None and self.TS_COLUMN in self.columns:
+                # Log append-only: baris lama ada di id kecil, cukup cari id pertama yang masih disimpan
+                first = self._conn.execute(
+                    f"SELECT id FROM {self.TABLE} WHERE ts >= ? ORDER BY id LIMIT 1",
+                    (now - self.raw_retention,),
+                ).fetchone()
+                if first is None:
+                    first = self._conn.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {self.TABLE}").fetchone()
+                limit_id = first[0]
+                if self.rollups:
+                    # Jangan hapus baris yang belum masuk rollup, dan sisakan baris
+                    # terakhir agar rowid tidak mulai ulang dari 1 (watermark rollup)
+                    limit_id = min(limit_id, self._rolled_id)
+                # Baris tanpa ts tidak tercakup rollup mana pun: tidak dihapus
+                deleted += self._conn.execute(
+                    f"DELETE FROM {self.TABLE} WHERE id < ? AND ts IS NOT NULL", (limit_id,)
+                ).rowcount
+            for seconds, retention in self.rollups:
+                if retention is not None:
+                    deleted += self._conn.execute(
+                        f"DELETE FROM {self._rollup_table(seconds)} WHERE t < ?", (now - retention,)
+                    ).rowcount
+            self._conn.commit()
+        if deleted:
+            print(f"[Storage] Retensi: {deleted} baris lama dihapus")
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.TABLE}").fetchone()[0]
+
+    def iter_rows(self, chunk_size=1000):
+        """Yield stored rows in insertion order, chunk by chunk."""
+        cur = self._conn.cursor()
+        cur.execute(f"SELECT {', '.join(self.columns)} FROM {self.TABLE} ORDER BY id")
+        while True:
+            with self._lock:
+                chunk = cur.fetchmany(chunk_size)
+            if not chunk:
+                break
+            yield from chunk
+
+    def iter_range(self, kit=None, start=None, end=None, chunk_size=1000):
+        """Yield lists of raw rows (all columns) for an optional kit and epoch range.
+
+        Membaca lewat koneksi read-only per chunk, sehingga export besar tidak
+        menahan lock writer dan memori tetap sebesar satu chunk.
+        """
+        where, params = [], []
+        if kit is not None:
+            where.append("kit = ?")
+            params.append(kit)
+        if start is not None:
+            where.append(f"{self.TS_COLUMN} >= ?")
+            params.append(start)
+        if end is not None:
+            where.append(f"{self.TS_COLUMN} < ?")
+            params.append(end)
+        sql = f"SELECT {', '.join(self.columns)} FROM {self.TABLE}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        # Dengan kit, urutan ts memakai index (kit, ts) tanpa sort tambahan
+        sql += f" ORDER BY {self.TS_COLUMN if kit is not None else 'id'}"
+        with self._reader() as conn:
+            cur = conn.execute(sql, params)
+            while True:
+                chunk = cur.fetchmany(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def import_xlsx(self, path, defaults=None):
+        """Import rows from an existing Excel log (one-time migration).
+
+        Kolom yang tidak ada di file lama diisi dari `defaults`.
+        """
+        defaults = defaults or {}
+        if load_workbook is None or not os.path.exists(path):
+            return 0
+        wb = load_workbook(path, read_only=True)
+        ws = wb.active
+        it = ws.iter_rows(values_only=True)
+        # Pilih kolom berdasarkan nama header, agar file lama (C/F/K/R) tetap bisa diimpor
+        header = [str(h).lower() if h is not None else "" for h in next(it, ())]
+        idx = [header.index(c) if c in header else None for c in self.columns]
+        rows = [
+            [r[i] if i is not None else defaults.get(c) for c, i in zip(self.columns, idx)]
+            for r in it if r and r[0] is not None
+        ]
+        wb.close()
+        # append_many mengisi ts dari kolom waktu sebelum rollup/retensi, jadi baris
+        # yang lebih tua dari retensi mentah tetap tersimpan di tier rollup
+        self.append_many(rows)
+        return len(rows)
+
+    def export_xlsx(self, path, headers=None, row_fn=None):
+        """Write the whole log to .xlsx using a streaming (write_only) workbook.
+
+        `row_fn` can expand each stored row (e.g. derive F/K/R from °C) to
+        match `headers`.
+        """
+        if Workbook is None:
+            print("[Storage] openpyxl tidak tersedia. Lewati export Excel. Install: pip install openpyxl")
+            return False
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("DataSuhu")
+        ws.append(headers or self.headers)
+        for row in self.iter_rows():
+            ws.append(row_fn(row) if row_fn else list(row))
+        wb.save(path)
+        return True
+
+    def log_event(self, ts, kit, session, event):
+        """Record a session event (e.g. 'lock', 'mix_start') at epoch `ts`."""
+        sql = f"INSERT INTO {self.EVENTS_TABLE} (ts, kit, session, event) VALUES (?, ?, ?, ?)"
+        if self.read_only:
+            # mode=rw: tidak membuat file/tabel; tabel events dibuat proses penulis
+            conn = sqlite3.connect(f"file:{self.path}?mode=rw", uri=True, timeout=self.BUSY_TIMEOUT)
+            with contextlib.closing(conn), conn:
+                conn.execute(sql, (ts, kit, session, event))
+            return
+        with self._lock:
+            self._conn.execute(sql, (ts, kit, session, event))
+            self._conn.commit()
+
+    def session_span(self, session, kit):
+        """(first, last) event epoch of a session on a kit, or None."""
+        with self._reader() as conn:
+            span = conn.execute(
+                f"SELECT MIN(ts), MAX(ts) FROM {self.EVENTS_TABLE} WHERE session = ? AND kit = ?",
+                (session, kit),
+            ).fetchone()
+        return None if span[0] is None else span
+
+    def query_range(self, kit, start, end, columns, bucket=None, extrema=False, now=None):
+        """Rows of one kit with start <= ts < end, optionally aggregated per `bucket` seconds.
+
+        Mengembalikan dict {'ts': [...], kolom: [...], 'tier': .., 'bucket': ..}.
+        Tier dipilih otomatis: yang paling kasar tetapi masih <= `bucket`, dan
+        yang retensinya masih mencakup `start`. Hanya baris di rentang yang
+        dibaca (index (kit, ts) / (kit, t)); agregasi dilakukan oleh SQLite.
+        Dengan `extrema`, kolom '<kolom>_min' dan '<kolom>_max' ikut dikembalikan.
+        """
+        tier = self._pick_tier(start, bucket, time.time() if now is None else now)
+        bucket = bucket if bucket and bucket > tier else (tier or None)
+        if tier:
+            table, t = self._rollup_table(tier), "t"
+            aggs = [(f"SUM({c}_sum) / SUM(n)", f"MIN({c}_min)", f"MAX({c}_max)") for c in columns]
+        else:
+            table, t = self.TABLE, "ts"
+            aggs = [(f"AVG({c})", f"MIN({c})", f"MAX({c})") for c in columns]
+        if bucket:
+            exprs = [a if extrema else a[:1] for a in aggs]
+            select = ", ".join(
+                [f"CAST({t} / {float(bucket)} AS INTEGER) * {float(bucket)} AS b"] + [e for a in exprs for e in a]
+            )
+            sql = (f"SELECT {select} FROM {table} WHERE kit = ? AND {t} >= ? AND {t} < ? "
+                   f"GROUP BY b ORDER BY b")
+        else:
+            exprs = [(c, c, c) if extrema else (c,) for c in columns]
+            select = ", ".join([t] + [e for a in exprs for e in a])
+            sql = f"SELECT {select} FROM {table} WHERE kit = ? AND {t} >= ? AND {t} < ? ORDER BY {t}"
+        with self._reader() as conn:
+            rows = conn.execute(sql, (kit, start, end)).fetchall()
+        result = {'ts': [r[0] for r in rows], 'tier': tier, 'bucket': bucket}
+        i = 1
+        for c in columns:
+            names = (c, f"{c}_min", f"{c}_max") if extrema else (c,)
+            for name in names:
+                result[name] = [r[i] for r in rows]
+                i += 1
+        return result
+
+    def _pick_tier(self, start, bucket, now):
+        """Bucket seconds of the tier to read (0 = raw) for a query starting at `start`."""
+        tiers = [(0, self.raw_retention)] + self.rollups
+        covering = [sec for sec, retention in tiers if retention is None or start >= now - retention]
+        if not covering:
+            # Rentang lebih tua dari semua retensi: pakai tier terpanjang yang tersisa
+            covering = [max(tiers, key=lambda tr: tr[1])[0]]
+        fine_enough = [sec for sec in covering if sec <= (bucket or 0)]
+        return max(fine_enough) if fine_enough else min(covering)
+
+    def _reader(self):
+        """Short-lived read-only connection; WAL readers do not block the writer."""
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        return contextlib.closing(conn)
+
+    def close(self):
+        if self._conn is None:
+            return
+        with self._lock:
+            self._conn.close()
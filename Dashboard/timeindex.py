@@ -0,0 +1,50 @@
+# ====== INDEKS WAKTU SAMPEL ======
+# Setiap sampel membawa cap waktu epoch milidetik (int64) yang monoton per kit,
+# sehingga kolom 'ts' ring buffer selalu terurut. Rentang (seq atau waktu)
+# dicari dengan binary search; string jam hanya dibuat untuk baris yang tampil.
+
+from datetime import datetime
+
+import numpy as np
+
+
+def epoch_ms(dt):
+    """datetime -> epoch milliseconds (int)."""
+    return int(dt.timestamp() * 1000)
+
+
+def index_slice(index, start, end=None):
+    """Slice of a sorted index (seq or epoch ms) with start <= value < end, by binary search.
+
+    end None = sampai akhir. Biaya O(log n), lalu rentang diterapkan sebagai
+    slice (view) tanpa membuat mask sepanjang jendela.
+    """
+    lo = int(np.searchsorted(index, start, side='left'))
+    hi = len(index) if end is None else int(np.searchsorted(index, end, side='left'))
+    return slice(lo, max(lo, hi))
+
+
+def _utc_offset_ms(ts_ms):
+    return int(datetime.fromtimestamp(ts_ms / 1000).astimezone().utcoffset().total_seconds() * 1000)
+
+
+def local_ms(ts_ms):
+    """Epoch ms shifted to local wall-clock time, for Plotly date axes (which show UTC).
+
+    Offset zona waktu dihitung sekali untuk jendela; hanya jika awal dan akhir
+    jendela berbeda (pergantian DST) offset dihitung per sampel.
+    """
+    ts_ms = np.asarray(ts_ms, dtype=np.int64)
+    if not len(ts_ms):
+        return ts_ms
+    first, last = _utc_offset_ms(ts_ms[0].item()), _utc_offset_ms(ts_ms[-1].item())
+    if first == last:
+        return ts_ms + first
+    return ts_ms + np.array([_utc_offset_ms(t) for t in ts_ms.tolist()], dtype=np.int64)
+
+
+def format_clock(ts_ms, default='-'):
+    """Epoch ms -> local "HH:MM:SS" (default for None/0 = no sample yet)."""
+    if not ts_ms:
+        return default
+    return datetime.fromtimestamp(ts_ms / 1000).strftime("%H:%M:%S")
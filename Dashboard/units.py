@@ -0,0 +1,31 @@
+# ====== KONVERSI SATUAN SUHU ======
+# Data disimpan dalam °C saja; F/K/R dihitung saat render atau export.
+# Semua fungsi bekerja untuk float maupun array NumPy (vektorisasi).
+
+UNITS = ('c', 'f', 'k', 'r')
+
+
+def convert(celsius, unit):
+    """Convert °C (scalar or NumPy array) to unit 'c', 'f', 'k' or 'r'."""
+    if unit == 'c':
+        return celsius
+    if unit == 'f':
+        return celsius * 9 / 5 + 32
+    if unit == 'k':
+        return celsius + 273.15
+    if unit == 'r':
+        return celsius * 4 / 5
+    raise ValueError(f"Satuan tidak dikenal: {unit}")
+
+
+def expand_celsius(values):
+    """[C1, C2, ...] -> [C1, F1, K1, R1, C2, F2, K2, R2, ...]."""
+    out = []
+    for c in values:
+        out.extend(convert(c, unit) for unit in UNITS)
+    return out
+
+
+def format_celsius(c):
+    """°C -> ("C", "F", "K", "R") strings with 2 decimals, as shown in the table."""
+    return tuple(f"{convert(c, unit):.2f}" for unit in UNITS)
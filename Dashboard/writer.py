@@ -0,0 +1,151 @@
+import json
+import os
+import queue
+import threading
+import time
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "spill")
+
+_STOP = object()
+
+
+# ====== BACKGROUND BATCH WRITER ======
+class BatchWriter:
+    """Dedicated thread that drains a bounded queue into `sink` in batches.
+
+    `sink(rows)` dipanggil saat batch mencapai `batch_size` baris atau
+    setelah `flush_interval` detik, mana yang lebih dulu. Jika antrean
+    penuh, `overflow` menentukan perilaku put():
+      - "block": tunggu sampai ada ruang (backpressure ke pemanggil)
+      - "drop_oldest": buang baris tertua di antrean
+      - "spill": tulis baris ke file JSONL, dimuat ulang saat antrean kosong.
+        Selama file spill belum habis, baris baru ikut ke file (bukan antrean),
+        jadi urutan id di SQLite tetap mengikuti urutan waktu.
+    """
+
+    def __init__(self, sink, maxsize=10000, batch_size=100, flush_interval=1.0,
+                 overflow="block", spill_path=None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow harus salah satu dari {OVERFLOW_POLICIES}")
+        if overflow == "spill" and not spill_path:
+            raise ValueError("overflow='spill' membutuhkan spill_path")
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.spill_path = spill_path
+        self.dropped = 0
+        self.spilled = 0
+        self._queue = queue.Queue(maxsize)
+        self._spill_lock = threading.Lock()
+        # Sisa spill dari proses sebelumnya lebih tua dari baris baru: tulis dulu
+        self._spilling = overflow == "spill" and (
+            os.path.exists(spill_path) or os.path.exists(spill_path + ".draining"))
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="storage-writer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def put(self, row):
+        """Enqueue one row; never touches the disk unless policy is 'spill'."""
+        if self._closed:
+            return
+        if self.overflow == "block":
+            self._queue.put(row)
+            return
+        if self._spilling and self._spill(row, force=False):
+            return
+        try:
+            self._queue.put_nowait(row)
+            return
+        except queue.Full:
+            pass
+        if self.overflow == "drop_oldest":
+            try:
+                self._queue.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(row)
+            except queue.Full:
+                self.dropped += 1
+        else:
+            self._spill(row, force=True)
+
+    def _spill(self, row, force):
+        """Append the row to the spill file; without `force` only while spilling."""
+        with self._spill_lock:
+            if not (force or self._spilling):
+                return False
+            self._spilling = True
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(row) + "\n")
+        self.spilled += 1
+        return True
+
+    def close(self, timeout=10.0):
+        """Flush everything still queued (and spilled) then stop the thread."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                self._flush(batch)
+                self._drain_spill()
+                return
+            if item is not None:
+                batch.append(item)
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+                # Baris di antrean lebih tua dari isi spill: spill ditulis setelah antrean habis
+                if self._spilling and self._queue.empty():
+                    self._drain_spill()
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        try:
+            self.sink(batch)
+        except Exception as e:
+            print(f"[Writer] Gagal menulis {len(batch)} baris:", e)
+
+    def _drain_spill(self):
+        """Write spilled rows in order until the file stays empty, then reopen the queue."""
+        if self.overflow != "spill":
+            return
+        draining = self.spill_path + ".draining"
+        while True:
+            with self._spill_lock:
+                if not os.path.exists(draining):
+                    if not os.path.exists(self.spill_path):
+                        self._spilling = False
+                        return
+                    os.replace(self.spill_path, draining)
+            with open(draining, encoding="utf-8") as f:
+                chunk = []
+                for line in f:
+                    chunk.append(json.loads(line))
+                    if len(chunk) >= self.batch_size:
+                        self._flush(chunk)
+                        chunk = []
+                self._flush(chunk)
+            os.remove(draining)
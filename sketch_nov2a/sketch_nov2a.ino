@@ -8,7 +8,7 @@ const char* ssid = "baksoikan";         // Ganti dengan nama WiFi kamu
 const char* password = "baksoikansalmon";    // Ganti dengan password WiFi sekarang
 const char* mqtt_server = "broker.hivemq.com";
 const int mqtt_port = 1883;
-const char* mqtt_topic = "edukit/suhu";
+const char* mqtt_topic = "edukit/suhu";   // Lab multi-kit: "edukit/<kit_id>/suhu", mis. "edukit/kit07/suhu"
 
 // ====== PIN SENSOR (3 Sensor DS18B20) ======
 // Menggunakan 3 pin terpisah untuk masing-masing sensor
@@ -32,6 +32,12 @@ PubSubClient client(espClient);
 // ====== MODE OFFLINE / ONLINE ======
 bool offlineMode = false; // ubah ke true untuk mode offline (tanpa MQTT)
 
+// ====== FORMAT PAYLOAD ======
+// false: JSON (kompatibel dengan dashboard lama)
+// true : biner ringkas v1 = 1 byte versi + 3 float32 little-endian (°C dingin, panas, campuran)
+bool binaryPayload = false;
+const uint8_t BINARY_PAYLOAD_VERSION = 1;
+
 // ====== KONEKSI WIFI ======
 void setup_wifi() {
   delay(10);
@@ -166,6 +172,19 @@ void loop() {
     if (!client.connected()) reconnect();
     client.loop();
 
+    if (binaryPayload) {
+      // ESP32 little-endian, float IEEE-754: cukup salin byte mentah
+      uint8_t buf[1 + 3 * sizeof(float)];
+      buf[0] = BINARY_PAYLOAD_VERSION;
+      memcpy(buf + 1, &tempC_dingin, sizeof(float));
+      memcpy(buf + 1 + sizeof(float), &tempC_panas, sizeof(float));
+      memcpy(buf + 1 + 2 * sizeof(float), &tempC_campuran, sizeof(float));
+      client.publish(mqtt_topic, buf, sizeof(buf));
+      Serial.println("Data biner terkirim ke MQTT!");
+      delay(2000);
+      return;
+    }
+
     // Format data ke JSON dengan struktur nested untuk 3 sensor
     String payload = "{";
     payload += "\"dingin\":{";